@@ -0,0 +1,187 @@
+"""
+Booking load generator: many accounts book the same class at once against the local
+ `FakeRebornServer`, to measure booking throughput and tail latency under
+ contention, without touching production.
+
+Two modes:
+ - client: each account drives `RebornApiClient` directly (login + book), with its
+   own HTTP session; every booking request is timed;
+ - engine: all accounts go through `BookingEngine` (login + palinsesto + lookup,
+   then all the bookings at once), like the multi-account cron.
+
+Usage:
+    $ python benchmarks/booking_load_benchmark.py --accounts 50 --seats 16
+    $ python benchmarks/booking_load_benchmark.py --mode engine --latency-ms 80 \
+       --jitter-ms 40 --error-rate 0.02
+"""
+
+import argparse
+import math
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+# Make the package importable when run as a script.
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from reborn_automator.clients.reborn_api_client import (  # noqa: E402
+    RebornApiClient,
+    make_http_session,
+)
+from reborn_automator.conf import settings  # noqa: E402
+from reborn_automator.domains.book_class_domain import (  # noqa: E402
+    ClassTarget,
+    FailedBooking,
+)
+from reborn_automator.domains.booking_engine_domain import (  # noqa: E402
+    Account,
+    BookingEngine,
+)
+from reborn_automator.utils import datetime_utils  # noqa: E402
+from reborn_automator.utils.log_utils import logger  # noqa: E402
+from reborn_automator.utils.testutils.fake_reborn_server import (  # noqa: E402
+    FakeRebornServer,
+)
+from reborn_automator.utils.testutils.reborn_testfactories.palinsesto_factory import (  # noqa: E402
+    PalinsestoFactory,
+)
+
+COURSE_NAME = "Calisthenics"
+
+
+def percentile(values: list[float], p: float) -> float:
+    """
+    Nearest-rank percentile.
+    """
+    if not values:
+        return math.nan
+    values = sorted(values)
+    rank = max(math.ceil(p / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def run_client_mode(server: FakeRebornServer, n_accounts: int) -> dict:
+    klass, day = _get_target_class(server)
+    latencies = list()
+    n_booked = 0
+    n_errors = 0
+    lock = threading.Lock()
+    barrier = threading.Barrier(n_accounts)
+
+    def run_account(i: int) -> None:
+        nonlocal n_booked, n_errors
+        client = RebornApiClient(http_session=make_http_session(pool_size=1))
+        try:
+            client.login(f"user{i}@example.com", "pass")
+        except Exception:
+            with lock:
+                n_errors += 1
+            client = None
+        # All the accounts book at the same instant.
+        barrier.wait()
+        if client is None:
+            return
+        start = time.perf_counter()
+        try:
+            data = client.book_class(klass["id_orario_palinsesto"], day)
+        except Exception:
+            with lock:
+                n_errors += 1
+            return
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            n_booked += data.get("status") == 2
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_accounts) as executor:
+        list(executor.map(run_account, range(n_accounts)))
+    return dict(
+        wall_secs=time.perf_counter() - start,
+        latencies=latencies,
+        n_booked=n_booked,
+        n_errors=n_errors,
+    )
+
+
+def run_engine_mode(server: FakeRebornServer, n_accounts: int) -> dict:
+    accounts = [
+        Account(f"user{i}@example.com", "pass", [ClassTarget(COURSE_NAME)])
+        for i in range(n_accounts)
+    ]
+    start = time.perf_counter()
+    reports = BookingEngine(max_workers=n_accounts).run(accounts)
+    return dict(
+        wall_secs=time.perf_counter() - start,
+        # The time from the start of the booking phase to the last response.
+        latencies=[r.booking_secs for r in reports if r.booking_secs is not None],
+        n_booked=sum(r.n_booked for r in reports),
+        # Failed bookings (eg. no seats left) are not errors.
+        n_errors=sum(
+            1
+            for r in reports
+            for result in r.results
+            if result.exception and not isinstance(result.exception, FailedBooking)
+        )
+        + sum(1 for r in reports if r.exception),
+    )
+
+
+def _get_target_class(server: FakeRebornServer) -> tuple[dict, str]:
+    for risultato in server.palinsesto["parametri"]["lista_risultati"]:
+        for giorno in risultato["giorni"]:
+            for klass in giorno["orari_giorno"]:
+                if klass["nome_corso"] == COURSE_NAME:
+                    return klass, giorno["giorno"]
+    raise LookupError(COURSE_NAME)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mode", choices=("client", "engine"), default="client")
+    parser.add_argument("--accounts", type=int, default=50)
+    parser.add_argument("--seats", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    logger.setLevel("WARNING")
+    # No caches: every account must hit the server.
+    settings.IS_TMP_CACHE_ENABLED = False
+    server = FakeRebornServer(
+        palinsesto=PalinsestoFactory.make(
+            start_day=datetime_utils.now().date() + timedelta(days=1),
+            n_seats=args.seats,
+        ),
+        latency_secs=args.latency_ms / 1000,
+        jitter_secs=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    with server:
+        settings.REBORN_BASE_URL = server.base_url
+        if args.mode == "client":
+            result = run_client_mode(server, args.accounts)
+        else:
+            result = run_engine_mode(server, args.accounts)
+
+    latencies_ms = [x * 1000 for x in result["latencies"]]
+    print(f"mode:        {args.mode}")
+    print(f"accounts:    {args.accounts} (seats: {args.seats})")
+    print(f"booked:      {result['n_booked']}")
+    print(f"errors:      {result['n_errors']}")
+    print(f"wall time:   {result['wall_secs']:.3f}s")
+    print(f"throughput:  {args.accounts / result['wall_secs']:.1f} accounts/s")
+    for p in (50, 95, 99):
+        print(f"latency p{p}: {percentile(latencies_ms, p):.1f}ms")
+    print(f"requests:    {dict(server.n_requests_by_endpoint)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""
+Cold-start import-time benchmark for the Lambda handlers in serverless.yml.
+
+Each handler module is imported in a fresh interpreter with `python -X importtime`,
+ many times, and the cumulative import time of the handler module and of the main
+ packages it pulls in (boto3, botocore, powertools, requests, settings) is reported
+ as p50/p95. Results can be compared with a stored baseline, to catch import bloat
+ before deploying.
+
+Usage:
+    $ python benchmarks/import_time_benchmark.py
+    $ python benchmarks/import_time_benchmark.py --runs 50 --save-baseline
+    # Exit code 1 when a handler regressed against the baseline:
+    $ python benchmarks/import_time_benchmark.py --check
+    # Or:
+    $ make benchmark-import-time
+"""
+
+import argparse
+import json
+import math
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+SERVERLESS_YML_PATH = ROOT_DIR / "serverless.yml"
+BASELINE_PATH = Path(__file__).parent / "import_time_baseline.json"
+
+# Label -> module name, as reported by `-X importtime`.
+TRACKED_MODULES = {
+    "boto3": "boto3",
+    "botocore": "botocore",
+    "powertools": "aws_lambda_powertools",
+    "requests": "requests",
+    "settings": "reborn_automator.conf.settings",
+}
+
+# Eg. "import time:       857 |       3042 |   botocore".
+_IMPORTTIME_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+# Eg. "    handler: reborn_automator.views.cron_book_classes_view.lambda_handler".
+_HANDLER_RE = re.compile(r"^\s+handler:\s*([\w.]+)\.\w+\s*$", re.MULTILINE)
+
+
+def get_handler_modules(serverless_yml_path: Path = SERVERLESS_YML_PATH) -> list[str]:
+    """
+    The modules of all the handlers in serverless.yml, eg.
+     ["reborn_automator.views.endpoint_introspection_view", ...].
+    """
+    modules = _HANDLER_RE.findall(serverless_yml_path.read_text())
+    return list(dict.fromkeys(modules))
+
+
+def measure_import(module: str) -> dict[str, float]:
+    """
+    Import the module in a fresh interpreter.
+
+    Returns: the cumulative import time in ms of the module ("total") and of each
+     tracked module (missing if not imported).
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative_by_name = dict()
+    for line in process.stderr.splitlines():
+        match = _IMPORTTIME_LINE_RE.match(line)
+        if not match:
+            continue
+        name = match.group(4)
+        # Only the first import counts, later ones are from `sys.modules`.
+        cumulative_by_name.setdefault(name, int(match.group(2)) / 1000)
+
+    timings = {"total": cumulative_by_name[module]}
+    for label, name in TRACKED_MODULES.items():
+        if name in cumulative_by_name:
+            timings[label] = cumulative_by_name[name]
+    return timings
+
+
+def percentile(values: list[float], p: float) -> float:
+    """
+    Nearest-rank percentile.
+    """
+    values = sorted(values)
+    rank = max(math.ceil(p / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def run_benchmark(modules: list[str], n_runs: int) -> dict[str, dict]:
+    """
+    Returns: a dict like:
+        {
+            "reborn_automator.views.endpoint_introspection_view": {
+                "total": {"p50": 210.3, "p95": 240.1},
+                "powertools": {"p50": 120.5, "p95": 135.0},
+                ...
+            },
+            ...
+        }
+    """
+    results = dict()
+    for module in modules:
+        # Warm-up: compile the .pyc files, so they do not count.
+        measure_import(module)
+        runs = [measure_import(module) for _ in range(n_runs)]
+        labels = ["total"] + [label for label in TRACKED_MODULES if label in runs[0]]
+        results[module] = {
+            label: {
+                "p50": round(percentile([r.get(label, 0) for r in runs], 50), 2),
+                "p95": round(percentile([r.get(label, 0) for r in runs], 95), 2),
+            }
+            for label in labels
+        }
+    return results
+
+
+def find_regressions(
+    results: dict[str, dict],
+    baseline: dict[str, dict],
+    max_ratio: float,
+    min_delta_ms: float,
+) -> list[str]:
+    """
+    A module regressed when its p50 total grew by more than `max_ratio` and by more
+     than `min_delta_ms` (so that noise on tiny values is ignored), or when it now
+     imports a tracked module that it did not import in the baseline.
+    """
+    regressions = list()
+    for module, timings in results.items():
+        if module not in baseline:
+            continue
+        base_p50 = baseline[module]["total"]["p50"]
+        p50 = timings["total"]["p50"]
+        if p50 > base_p50 * max_ratio and p50 - base_p50 > min_delta_ms:
+            regressions.append(f"{module}: p50 {base_p50:.1f}ms -> {p50:.1f}ms")
+        for label in timings:
+            if label not in baseline[module]:
+                regressions.append(f"{module}: now imports {label}")
+    return regressions
+
+
+def print_results(results: dict[str, dict], baseline: dict[str, dict]) -> None:
+    for module, timings in results.items():
+        print(module)
+        for label, values in timings.items():
+            line = f"  {label:<12} p50 {values['p50']:>8.1f}ms  p95 {values['p95']:>8.1f}ms"
+            base = baseline.get(module, {}).get(label)
+            if base:
+                line += f"  (baseline p50 {base['p50']:.1f}ms)"
+            print(line)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="Store the results as baseline."
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Exit with code 1 if any handler regressed against the baseline.",
+    )
+    parser.add_argument("--max-ratio", type=float, default=1.25)
+    parser.add_argument("--min-delta-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    results = run_benchmark(get_handler_modules(), args.runs)
+
+    baseline = dict()
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    regressions = find_regressions(results, baseline, args.max_ratio, args.min_delta_ms)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if args.check and regressions:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
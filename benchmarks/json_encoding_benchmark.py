@@ -0,0 +1,156 @@
+"""
+JSON encoding benchmark: `json_utils.to_json()` against the previous encoder (an
+ `isinstance()` chain in `default()` and a new encoder at every call) on
+ palinsesto-sized payloads, like the responses of the /availability endpoint.
+
+For each payload size (classes) it reports the median time of:
+ - legacy: `json.dumps(data, cls=LegacyJsonEncoder)`;
+ - stdlib: `to_json()` with the stdlib backend;
+ - fast: `to_json()` with the fast backend (orjson), if installed.
+
+Usage:
+    $ python benchmarks/json_encoding_benchmark.py
+    $ python benchmarks/json_encoding_benchmark.py --sizes 56 2400 --repeat 20
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable
+
+# Make the package importable when run as a script.
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from reborn_automator.conf import settings  # noqa: E402
+from reborn_automator.domains.palinsesto_model import Palinsesto  # noqa: E402
+from reborn_automator.domains.seat_availability_domain import (  # noqa: E402
+    scan_availability,
+)
+from reborn_automator.utils import datetime_utils, json_utils  # noqa: E402
+from reborn_automator.utils.testutils.reborn_testfactories.palinsesto_factory import (  # noqa: E402
+    PalinsestoFactory,
+)
+from reborn_automator.utils.testutils.settings_testutils import (  # noqa: E402
+    override_settings,
+)
+
+# 1 week x 8 classes per day (the real palinsesto), up to 10 gyms x 5 weeks x 48.
+DEFAULT_SIZES = (56, 560, 16800)
+
+
+class LegacyJsonEncoder(json.JSONEncoder):
+    """
+    The encoder before the per-type dispatch, for comparison.
+    """
+
+    def default(self, obj):
+        if isinstance(obj, datetime):
+            return obj.isoformat()
+        elif obj.__class__.__name__ == "Decimal":
+            return float(obj)
+        elif obj.__class__.__name__ == "Url":
+            return str(obj)
+        elif hasattr(obj, "to_dict") and callable(obj.to_dict):
+            return obj.to_dict()
+        elif isinstance(obj, uuid.UUID):
+            return str(obj)
+        return json.JSONEncoder.default(self, obj)
+
+
+def make_payload(n_classes: int, start_day: date) -> dict:
+    """
+    An /availability-like response: the classes (objects with `to_dict()` and
+     datetimes) and a few UUIDs and datetimes at the top level.
+    """
+    n_classes_per_day = 8 if n_classes % 8 == 0 else 1
+    data = PalinsestoFactory.make(
+        start_day=start_day,
+        n_days=n_classes // n_classes_per_day,
+        n_classes_per_day=n_classes_per_day,
+    )
+    now = datetime_utils.now_utc()
+    classes = scan_availability(
+        Palinsesto.from_response(data), after=start_day - timedelta(days=1), now=now
+    )
+    return dict(
+        request_id=uuid.uuid4(),
+        generated_at=now,
+        classes=classes,
+        ids=[uuid.uuid4() for _ in range(len(classes))],
+    )
+
+
+def time_median(fn: Callable, n_repeats: int) -> float:
+    """
+    The median time of `fn()` in ms.
+    """
+    timings = list()
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run_size(n_classes: int, n_repeats: int) -> dict:
+    payload = make_payload(n_classes, datetime_utils.now().date() + timedelta(days=1))
+    legacy = json.dumps(payload, cls=LegacyJsonEncoder)
+    with override_settings(settings, IS_JSON_FAST_BACKEND_ENABLED=False):
+        assert json_utils.to_json(payload) == legacy
+        stdlib_ms = time_median(lambda: json_utils.to_json(payload), n_repeats)
+    fast_ms = None
+    if json_utils.orjson is not None:
+        with override_settings(settings, IS_JSON_FAST_BACKEND_ENABLED=True):
+            assert json.loads(json_utils.to_json(payload)) == json.loads(legacy)
+            fast_ms = time_median(lambda: json_utils.to_json(payload), n_repeats)
+    return dict(
+        n_classes=n_classes,
+        size_kb=len(legacy) / 1024,
+        legacy_ms=time_median(
+            lambda: json.dumps(payload, cls=LegacyJsonEncoder), n_repeats
+        ),
+        stdlib_ms=stdlib_ms,
+        fast_ms=fast_ms,
+    )
+
+
+def _format(value: int | float | None) -> str:
+    if isinstance(value, float):
+        return f"{value:>10.2f}"
+    # "None" when the fast backend is not installed.
+    return f"{value!s:>10}"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=DEFAULT_SIZES,
+        help="Number of classes in the payload.",
+    )
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--json", type=Path, help="Also write the results here.")
+    args = parser.parse_args()
+
+    columns = ("n_classes", "size_kb", "legacy_ms", "stdlib_ms", "fast_ms")
+    print(" ".join(f"{name:>10}" for name in columns))
+    results = list()
+    for n_classes in args.sizes:
+        result = run_size(n_classes, args.repeat)
+        results.append(result)
+        print(" ".join(_format(result[name]) for name in columns))
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
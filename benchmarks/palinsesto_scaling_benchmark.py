@@ -0,0 +1,206 @@
+"""
+Palinsesto scaling benchmark: synthetic palinsesto payloads, from one gym-week up to
+ many gyms x many weeks x hundreds of classes per day, to measure how parsing and
+ class lookup scale as data grows.
+
+For each scale (gyms x weeks x classes per day; one palinsesto response per gym) it
+ reports:
+ - size: the size of the JSON responses;
+ - decode: `json.loads()` of the responses;
+ - stream: `PalinsestoStreamParser` over the responses (full read, no early exit);
+ - parse: `Palinsesto.from_response()` (build the model and its indexes);
+ - scan: a lookup by traversing the responses (like before the indexes);
+ - lookup: a lookup with the indexes, through `BookClassDomain.find_class()`;
+ - peak/retained memory of the parse, measured with tracemalloc.
+Timings are the median over the repeats.
+
+Usage:
+    $ python benchmarks/palinsesto_scaling_benchmark.py
+    $ python benchmarks/palinsesto_scaling_benchmark.py --scales 1x1x8 10x8x300 \
+       --repeat 5 --json results.json
+"""
+
+import argparse
+import gc
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable
+
+# Make the package importable when run as a script.
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from reborn_automator.clients.palinsesto_stream_parser import (  # noqa: E402
+    PalinsestoStreamParser,
+)
+from reborn_automator.domains.book_class_domain import (  # noqa: E402
+    BookClassDomain,
+    ClassTarget,
+)
+from reborn_automator.domains.palinsesto_model import (  # noqa: E402
+    Palinsesto,
+    iter_classes,
+)
+from reborn_automator.utils import datetime_utils  # noqa: E402
+from reborn_automator.utils.testutils.reborn_testfactories.palinsesto_factory import (  # noqa: E402
+    DEFAULT_COURSES,
+    PalinsestoFactory,
+)
+
+DEFAULT_SCALES = ("1x1x8", "1x4x50", "5x4x100", "10x8x300")
+# The course looked up: the last one, so the scan has to go through most classes.
+COURSE_NAME = DEFAULT_COURSES[-1]
+# The stream parser is fed chunks of this size, like `iter_palinsesto()`.
+CHUNK_SIZE = 16 * 1024
+
+
+def make_payloads(
+    n_gyms: int, n_weeks: int, n_classes_per_day: int, start_day: date
+) -> list[bytes]:
+    """
+    One palinsesto response per gym, serialized like the real ones.
+    """
+    n_days = 7 * n_weeks
+    return [
+        json.dumps(
+            PalinsestoFactory.make(
+                start_day=start_day,
+                n_days=n_days,
+                n_classes_per_day=n_classes_per_day,
+                first_class_id=1 + i * n_days * n_classes_per_day,
+            )
+        ).encode()
+        for i in range(n_gyms)
+    ]
+
+
+def time_median(fn: Callable, n_repeats: int) -> float:
+    """
+    The median time of `fn()` in ms.
+    """
+    timings = list()
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def measure_memory(fn: Callable) -> tuple[float, float]:
+    """
+    Returns: the (peak, retained) memory allocated by `fn()` in MB; retained is the
+     memory still allocated by the returned object.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = fn()  # noqa: F841 (keep it alive for the retained size).
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 2**20, retained / 2**20
+
+
+def stream_parse(payload: bytes) -> int:
+    parser = PalinsestoStreamParser()
+    n_days = 0
+    for i in range(0, len(payload), CHUNK_SIZE):
+        n_days += len(parser.feed(payload[i : i + CHUNK_SIZE]))
+    parser.close()
+    return n_days
+
+
+def scan_lookup(responses: list[dict], after: date) -> tuple | None:
+    """
+    Find the next class by traversing the responses, with no index.
+    """
+    for data in responses:
+        for klass in iter_classes(data):
+            if klass.course_name == COURSE_NAME and klass.day_date > after:
+                return klass.id, klass.day_date
+    return None
+
+
+def run_scale(scale: str, n_repeats: int) -> dict:
+    n_gyms, n_weeks, n_classes_per_day = (int(x) for x in scale.split("x"))
+    today = datetime_utils.now().date()
+    payloads = make_payloads(
+        n_gyms, n_weeks, n_classes_per_day, start_day=today + timedelta(days=1)
+    )
+    responses = [json.loads(p) for p in payloads]
+    # Look up a class in the last week, the worst case for the scan.
+    after = today + timedelta(days=7 * (n_weeks - 1))
+
+    def parse() -> list[Palinsesto]:
+        return [Palinsesto.from_response(data) for data in responses]
+
+    palinsesti = parse()
+    domains = list()
+    for palinsesto in palinsesti:
+        domain = BookClassDomain(username="bench", password="bench")
+        domain._palinsesto = palinsesto
+        domains.append(domain)
+    target = ClassTarget(COURSE_NAME, day_date=after + timedelta(days=1))
+
+    peak_mb, retained_mb = measure_memory(parse)
+    return dict(
+        scale=scale,
+        n_classes=sum(len(p) for p in palinsesti),
+        size_mb=sum(len(p) for p in payloads) / 2**20,
+        decode_ms=time_median(lambda: [json.loads(p) for p in payloads], n_repeats),
+        stream_ms=time_median(lambda: [stream_parse(p) for p in payloads], n_repeats),
+        parse_ms=time_median(parse, n_repeats),
+        scan_ms=time_median(lambda: scan_lookup(responses, after), n_repeats),
+        lookup_ms=time_median(
+            lambda: [d.find_class(target) for d in domains], n_repeats
+        ),
+        peak_mb=peak_mb,
+        retained_mb=retained_mb,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--scales",
+        nargs="+",
+        default=DEFAULT_SCALES,
+        help="Gyms x weeks x classes per day, eg. 5x4x100.",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", type=Path, help="Also write the results here.")
+    args = parser.parse_args()
+
+    # Column -> format.
+    columns = {
+        "scale": "{:>10}",
+        "n_classes": "{:>10}",
+        "size_mb": "{:>10.2f}",
+        "decode_ms": "{:>10.2f}",
+        "stream_ms": "{:>10.2f}",
+        "parse_ms": "{:>10.2f}",
+        "scan_ms": "{:>10.3f}",
+        "lookup_ms": "{:>10.3f}",
+        "peak_mb": "{:>10.2f}",
+        "retained_mb": "{:>12.2f}",
+    }
+    print(
+        " ".join(f"{name:>{10 if name != 'retained_mb' else 12}}" for name in columns)
+    )
+    results = list()
+    for scale in args.scales:
+        result = run_scale(scale, args.repeat)
+        results.append(result)
+        print(" ".join(fmt.format(result[name]) for name, fmt in columns.items()))
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,159 @@
+import threading
+import time
+from functools import lru_cache
+
 import boto3
 
+from ...conf import settings
+
+# The max number of names in a GetParameters request and the max number of results
+#  in a GetParametersByPath page (AWS limits).
+GET_PARAMETERS_MAX_NAMES = 10
+GET_PARAMETERS_BY_PATH_MAX_RESULTS = 10
+
+
+@lru_cache
+def get_shared_ssm_client():
+    """
+    The process-wide SSM client, created on first use and then shared by all the
+     clients in the same Lambda execution environment.
+    """
+    return boto3.client("ssm")
+
+
+class _ValuesCache:
+    """
+    In-memory TTL cache of the parameter values, shared by all the clients in the
+     process. Decrypted secrets are never written to disk.
+    """
+
+    def __init__(self):
+        # (path, is_decrypted) -> (stored_at, value).
+        self._values: dict[tuple[str, bool], tuple[float, str]] = dict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str, is_decrypted: bool) -> str | None:
+        with self._lock:
+            item = self._values.get((path, is_decrypted))
+        if item is None:
+            return None
+        stored_at, value = item
+        if time.monotonic() - stored_at > settings.PARAMETER_STORE_CACHE_TTL_SECS:
+            return None
+        return value
+
+    def set(self, path: str, is_decrypted: bool, value: str) -> None:
+        with self._lock:
+            self._values[(path, is_decrypted)] = (time.monotonic(), value)
+
+    def delete(self, path: str) -> None:
+        with self._lock:
+            self._values.pop((path, True), None)
+            self._values.pop((path, False), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+values_cache = _ValuesCache()
+
 
 class ParameterStoreClient:
-    def __init__(self) -> None:
-        self.client = boto3.client("ssm")
+    def __init__(self, client=None) -> None:
+        """
+        Args:
+            client: a boto3 SSM client, by default the shared one.
+        """
+        self._client = client
+
+    @property
+    def client(self):
+        # Created lazily, so that a client that only hits the cache never creates it.
+        if self._client is None:
+            self._client = get_shared_ssm_client()
+        return self._client
 
     def get_parameter(self, path: str) -> str:
         # Eg. "/strava-facade-api/production/strava-api-client-id".
-        parameter = self.client.get_parameter(Name=path)
-        return parameter["Parameter"]["Value"]
+        return self._get(path, is_decrypted=False)
 
     def get_secret(self, path: str) -> str:
-        parameter = self.client.get_parameter(Name=path, WithDecryption=True)
-        return parameter["Parameter"]["Value"]
+        return self._get(path, is_decrypted=True)
+
+    def _get(self, path: str, is_decrypted: bool) -> str:
+        value = values_cache.get(path, is_decrypted)
+        if value is None:
+            parameter = self.client.get_parameter(
+                Name=path, WithDecryption=is_decrypted
+            )
+            value = parameter["Parameter"]["Value"]
+            values_cache.set(path, is_decrypted, value)
+        return value
+
+    def get_parameters(
+        self, paths: list[str], is_decrypted: bool = False
+    ) -> dict[str, str]:
+        """
+        Get many parameters, with as few requests as possible: cached values are
+         not fetched again and the others are fetched in chunks of
+         `GET_PARAMETERS_MAX_NAMES`.
+
+        Returns: a dict path -> value; missing parameters are not included.
+        """
+        values = dict()
+        to_fetch = list()
+        for path in dict.fromkeys(paths):
+            value = values_cache.get(path, is_decrypted)
+            if value is None:
+                to_fetch.append(path)
+            else:
+                values[path] = value
+
+        for i in range(0, len(to_fetch), GET_PARAMETERS_MAX_NAMES):
+            response = self.client.get_parameters(
+                Names=to_fetch[i : i + GET_PARAMETERS_MAX_NAMES],
+                WithDecryption=is_decrypted,
+            )
+            for parameter in response["Parameters"]:
+                values[parameter["Name"]] = parameter["Value"]
+                values_cache.set(parameter["Name"], is_decrypted, parameter["Value"])
+        return values
+
+    def get_secrets(self, paths: list[str]) -> dict[str, str]:
+        """
+        Get many secrets, see `get_parameters()`.
+        """
+        return self.get_parameters(paths, is_decrypted=True)
+
+    def get_parameters_by_path(
+        self, path: str, is_decrypted: bool = False, is_recursive: bool = True
+    ) -> dict[str, str]:
+        """
+        Get all the parameters under the given path, eg. "/reborn-automator/production".
+        All the pages are fetched (pages are limited by AWS to
+         `GET_PARAMETERS_BY_PATH_MAX_RESULTS` results) and the values are cached for
+         later `get_parameter()`, `get_secret()` and `get_parameters()` calls.
+
+        Returns: a dict path -> value.
+        """
+        values = dict()
+        kwargs = dict(
+            Path=path,
+            Recursive=is_recursive,
+            WithDecryption=is_decrypted,
+            MaxResults=GET_PARAMETERS_BY_PATH_MAX_RESULTS,
+        )
+        while True:
+            response = self.client.get_parameters_by_path(**kwargs)
+            for parameter in response["Parameters"]:
+                values[parameter["Name"]] = parameter["Value"]
+                values_cache.set(parameter["Name"], is_decrypted, parameter["Value"])
+            next_token = response.get("NextToken")
+            if not next_token:
+                break
+            kwargs["NextToken"] = next_token
+        return values
 
     def put_parameter(self, path: str, value: str, do_overwrite=False) -> None:
         self.client.put_parameter(
@@ -22,6 +163,7 @@ class ParameterStoreClient:
             Type="String",
             Overwrite=do_overwrite,
         )
+        values_cache.delete(path)
 
     def put_secret(self, path: str, value: str, do_overwrite=False) -> None:
         self.client.put_parameter(
@@ -31,3 +173,12 @@ class ParameterStoreClient:
             Type="SecureString",
             Overwrite=do_overwrite,
         )
+        values_cache.delete(path)
+
+
+class ParameterNotFound(Exception):
+    def __init__(self, path: str):
+        self.path = path
+
+    def __str__(self):
+        return self.path
@@ -1,11 +1,30 @@
+from functools import lru_cache
+
 import requests
 
 from ..conf import settings
+from ..utils import asyncio_utils
+
+
+@lru_cache
+def get_shared_http_session() -> requests.Session:
+    """
+    The process-wide session to Botte, so its keep-alive connection survives across
+     messages and warm invocations.
+    """
+    return requests.Session()
 
 
 class BotteApiClient:
     URL = settings.BOTTE_BASE_URL + "/message"
-    DEFAULT_HEADERS = {"Authorization": settings.BOTTE_AUTH_TOKEN}
+
+    def __init__(self, http_session: requests.Session | None = None) -> None:
+        self.http_session = http_session or get_shared_http_session()
+
+    @property
+    def default_headers(self) -> dict:
+        # Read the token only when needed, not at import time.
+        return {"Authorization": settings.BOTTE_AUTH_TOKEN}
 
     def send_telegram_message(self, text) -> dict:
         """
@@ -32,9 +51,29 @@ class BotteApiClient:
                 "text": "Hello World",
             }
         """
-        headers = {**self.DEFAULT_HEADERS}
+        headers = {**self.default_headers}
         payload = {"text": text}
-        response = requests.post(self.URL, headers=headers, json=payload)
+        response = self.http_session.post(
+            self.URL,
+            headers=headers,
+            json=payload,
+            timeout=settings.BOTTE_HTTP_TIMEOUT_SECS,
+        )
         response.raise_for_status()
         data = response.json()
         return data
+
+
+class AsyncBotteApiClient:
+    """
+    Asyncio counterpart of `BotteApiClient`, with the same methods.
+    See `AsyncRebornApiClient`.
+    """
+
+    def __init__(self, client: BotteApiClient | None = None) -> None:
+        self.client = client or BotteApiClient()
+
+    async def send_telegram_message(self, text) -> dict:
+        return await asyncio_utils.run_in_thread(
+            self.client.send_telegram_message, text
+        )
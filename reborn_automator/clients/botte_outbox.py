@@ -0,0 +1,217 @@
+"""
+An outbox in front of `BotteApiClient`: messages are first spooled (to /tmp, so they
+ survive a failed invocation and are sent by the next one in the same execution
+ environment), then flushed with retries over the pooled Botte connection.
+
+All the messages pending at flush time (eg. the results of several classes booked in
+ the same tick, or messages left by a previous invocation) are merged into a single
+ digest message, to cut HTTP calls and Telegram rate-limit pressure.
+
+Usage:
+    outbox = BotteOutbox()
+    outbox.add("Calisthenics class booked for 2024-10-30")
+    outbox.add("Powerlifting class booked for 2024-10-31")
+    # Sent as 1 message.
+    outbox.flush(timeout_secs=3)
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+import requests
+
+from ..conf import settings
+from ..utils.log_utils import logger
+from .botte_api_client import BotteApiClient
+
+# Flushes are serialized, so that a flush left running by a previous (timed out)
+#  invocation and a new one never send the same message twice.
+_flush_lock = threading.Lock()
+
+
+@lru_cache
+def get_background_executor() -> ThreadPoolExecutor:
+    """
+    The thread the flushes run in, separate from the ones used for Reborn requests,
+     so that a slow Botte never delays a booking. A single one: flushes are
+     serialized anyway.
+    """
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="botte")
+
+
+class BotteOutbox:
+    def __init__(self, client: BotteApiClient | None = None):
+        self.client = client or BotteApiClient()
+        # Message id -> {"text": ..., "created_at": ...}, used when the spool
+        #  directory is disabled (see `settings.IS_TMP_CACHE_ENABLED`).
+        self._memory: dict[str, dict] = dict()
+
+    def add(self, text: str) -> None:
+        message = dict(text=text, created_at=time.time())
+        # Ids sort by creation time.
+        message_id = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+        self._memory[message_id] = message
+        if settings.IS_TMP_CACHE_ENABLED:
+            self._write_file(message_id, message)
+
+    def flush(self, timeout_secs: float | None = None) -> bool:
+        """
+        Send all the pending messages, as a digest, in the background and wait at most
+         `timeout_secs`. Messages that could not be sent stay in the spool, for the
+         next flush. Failures are logged, never raised.
+
+        Returns: True if all the pending messages were sent.
+        """
+        future = get_background_executor().submit(self._flush)
+        try:
+            return future.result(timeout=timeout_secs)
+        except futures.TimeoutError:
+            logger.warning(
+                "Botte outbox flush still running after the wait",
+                extra=dict(timeout_secs=timeout_secs),
+            )
+            return False
+        except Exception as exc:
+            # Eg. the spool directory cannot be read.
+            logger.error(
+                "Botte outbox flush failed",
+                extra=dict(exc=f"{exc.__class__.__name__}: {exc}"),
+            )
+            return False
+
+    def _flush(self) -> bool:
+        with _flush_lock:
+            pending = self._get_pending()
+            if not pending:
+                return True
+            is_all_sent = True
+            for ids, text in self._make_digests(pending):
+                if self._send(text):
+                    self._delete(ids)
+                else:
+                    is_all_sent = False
+            return is_all_sent
+
+    def _send(self, text: str) -> bool:
+        for attempt in range(1, settings.BOTTE_OUTBOX_MAX_ATTEMPTS + 1):
+            try:
+                self.client.send_telegram_message(text)
+                return True
+            except requests.RequestException as exc:
+                response = getattr(exc, "response", None)
+                is_retryable = response is None or (
+                    response.status_code >= 500 or response.status_code == 429
+                )
+                logger.warning(
+                    "Botte message failed",
+                    extra=dict(
+                        exc=f"{exc.__class__.__name__}: {exc}",
+                        attempt=attempt,
+                        is_retryable=is_retryable,
+                    ),
+                )
+                if not is_retryable:
+                    return False
+            if attempt < settings.BOTTE_OUTBOX_MAX_ATTEMPTS:
+                time.sleep(
+                    settings.BOTTE_OUTBOX_RETRY_BACKOFF_SECS * 2 ** (attempt - 1)
+                )
+        return False
+
+    def _get_pending(self) -> list[tuple[str, dict]]:
+        """
+        The pending messages, oldest first. Expired ones are dropped.
+        """
+        pending = dict(self._memory)
+        if settings.IS_TMP_CACHE_ENABLED:
+            pending.update(self._read_files())
+
+        now = time.time()
+        expired = [
+            message_id
+            for message_id, message in pending.items()
+            if now - message["created_at"] > settings.BOTTE_OUTBOX_MAX_AGE_SECS
+        ]
+        if expired:
+            logger.warning(
+                "Dropping expired Botte messages", extra=dict(n_expired=len(expired))
+            )
+            self._delete(expired)
+        return sorted(
+            (item for item in pending.items() if item[0] not in expired),
+            key=lambda item: item[0],
+        )
+
+    def _make_digests(self, pending: list[tuple[str, dict]]) -> list[tuple[list, str]]:
+        """
+        Merge the messages into as few texts as possible, each within
+         `settings.BOTTE_OUTBOX_MAX_MESSAGE_LENGTH`. A single message is sent as is.
+
+        Returns: a list of (message ids, text).
+        """
+        max_length = settings.BOTTE_OUTBOX_MAX_MESSAGE_LENGTH
+        digests = list()
+        ids = list()
+        texts = list()
+        length = 0
+        for message_id, message in pending:
+            text = message["text"][:max_length]
+            # +2 for the separator.
+            if texts and length + 2 + len(text) > max_length:
+                digests.append((ids, "\n\n".join(texts)))
+                ids, texts, length = list(), list(), 0
+            ids.append(message_id)
+            texts.append(text)
+            length += len(text) + (2 if len(texts) > 1 else 0)
+        if texts:
+            digests.append((ids, "\n\n".join(texts)))
+        return digests
+
+    def _delete(self, message_ids: list[str]) -> None:
+        for message_id in message_ids:
+            self._memory.pop(message_id, None)
+            self._get_path(message_id).unlink(missing_ok=True)
+
+    def _get_dir_path(self) -> Path:
+        return Path(settings.TMP_CACHE_DIR) / "botte-outbox"
+
+    def _get_path(self, message_id: str) -> Path:
+        return self._get_dir_path() / f"{message_id}.json"
+
+    def _read_files(self) -> dict[str, dict]:
+        messages = dict()
+        dir_path = self._get_dir_path()
+        if not dir_path.is_dir():
+            return messages
+        for path in dir_path.glob("*.json"):
+            try:
+                with open(path) as fin:
+                    messages[path.stem] = json.load(fin)
+            except (OSError, ValueError) as exc:
+                logger.warning(
+                    "Discarding unreadable Botte outbox file",
+                    extra=dict(exc=str(exc), path=str(path)),
+                )
+                path.unlink(missing_ok=True)
+        return messages
+
+    def _write_file(self, message_id: str, message: dict) -> None:
+        path = self._get_path(message_id)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a tmp file and then rename it, so that readers never see
+            #  a partially written file.
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w") as fout:
+                json.dump(message, fout)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            # The message is still in memory: never fail because of the spool.
+            logger.warning("Could not spool Botte message", extra=dict(exc=str(exc)))
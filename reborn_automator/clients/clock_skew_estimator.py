@@ -0,0 +1,141 @@
+"""
+Estimate the offset of the Reborn server clock from the local one, NTP-style, from
+ the `Date` header of the responses to the requests we send anyway (login,
+ palinsesto, bookings): no extra requests.
+
+The `Date` header has a resolution of 1 sec: a response dated D was generated when
+ the server clock was in [D, D + 1), at a local instant between the time the request
+ was sent and the time the response was received. So each sample bounds the offset
+ (server - local) to the interval (D - received, D + 1 - sent), and the intersection
+ of the intervals of many samples, each truncated at a different sub-second phase,
+ narrows it well below 1 sec.
+
+Usage:
+    session.hooks["response"].append(clock_skew_estimator.observe)
+    ...
+    estimate = clock_skew_estimator.get_estimate()
+    estimate.offset_secs, estimate.uncertainty_secs
+"""
+
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from ..conf import settings
+from ..utils import datetime_utils
+from ..utils.log_utils import logger
+
+
+@dataclass
+class SkewEstimate:
+    # Server clock - local clock: the middle of the feasible interval.
+    offset_secs: float
+    # The true offset is within `offset_secs` +- this.
+    uncertainty_secs: float
+    # The fastest round trip among the samples used.
+    min_rtt_secs: float
+    n_samples: int
+
+
+class ClockSkewEstimator:
+    def __init__(
+        self, max_samples: int | None = None, max_age_secs: float | None = None
+    ):
+        """
+        Args:
+            max_samples: keep only the most recent samples (a rolling estimate).
+            max_age_secs: ignore samples older than this (the clocks drift).
+        """
+        self.max_age_secs = max_age_secs or settings.CLOCK_SKEW_MAX_SAMPLE_AGE_SECS
+        # (local sent ts, local received ts, server ts).
+        self._samples: deque[tuple[float, float, float]] = deque(
+            maxlen=max_samples or settings.CLOCK_SKEW_MAX_SAMPLES
+        )
+        self._lock = threading.Lock()
+
+    def observe(self, response: requests.Response, *args, **kwargs) -> None:
+        """
+        A `requests` response hook: add a sample from the response's `Date` header.
+         `response.elapsed` is the time from sending the request to receiving the
+         headers.
+        """
+        received_at = datetime_utils.now_utc()
+        value = response.headers.get("Date")
+        if not value:
+            return
+        try:
+            server_date = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            logger.debug("Invalid Date header", extra=dict(value=value))
+            return
+        self.add_sample(received_at - response.elapsed, received_at, server_date)
+
+    def add_sample(
+        self, sent_at: datetime, received_at: datetime, server_date: datetime
+    ) -> None:
+        with self._lock:
+            self._samples.append(
+                (sent_at.timestamp(), received_at.timestamp(), server_date.timestamp())
+            )
+
+    def get_estimate(self) -> SkewEstimate | None:
+        """
+        The intersection of the intervals of the recent samples, newest first. If an
+         older sample contradicts the newer ones (eg. the clock was adjusted), it and
+         all the older ones are ignored.
+
+        Returns: None if there are no recent samples.
+        """
+        min_ts = datetime_utils.now_utc().timestamp() - self.max_age_secs
+        with self._lock:
+            samples = list(self._samples)
+
+        lower = float("-inf")
+        upper = float("inf")
+        min_rtt = float("inf")
+        n_samples = 0
+        for sent_ts, received_ts, server_ts in reversed(samples):
+            if received_ts < min_ts:
+                break
+            sample_lower = max(lower, server_ts - received_ts)
+            sample_upper = min(upper, server_ts + 1 - sent_ts)
+            if sample_lower > sample_upper:
+                logger.debug(
+                    "Inconsistent clock skew sample, ignoring it and the older ones",
+                    extra=dict(n_ignored=len(samples) - n_samples),
+                )
+                break
+            lower, upper = sample_lower, sample_upper
+            min_rtt = min(min_rtt, received_ts - sent_ts)
+            n_samples += 1
+
+        if not n_samples:
+            return None
+        return SkewEstimate(
+            offset_secs=(lower + upper) / 2,
+            uncertainty_secs=(upper - lower) / 2,
+            min_rtt_secs=min_rtt,
+            n_samples=n_samples,
+        )
+
+    def get_server_now(self) -> datetime:
+        """
+        The current time on the server clock (the local one if there is no estimate).
+        """
+        now = datetime_utils.now_utc()
+        estimate = self.get_estimate()
+        if estimate is None:
+            return now
+        return now + timedelta(seconds=estimate.offset_secs)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+
+# Shared by all the HTTP sessions to the Reborn server (see `make_http_session()`).
+clock_skew_estimator = ClockSkewEstimator()
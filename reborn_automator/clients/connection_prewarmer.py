@@ -0,0 +1,115 @@
+"""
+Pre-warm the connections to the Reborn server, so that the critical requests (the
+ booking at the instant the window opens) never pay for a DNS lookup and a TCP+TLS
+ handshake.
+
+The connections are opened directly in the connection pool of a `requests` session
+ (no HTTP request is sent), and the following requests of the session pick them up.
+ The server closes idle connections after 5 secs, so pre-warm right before using
+ them, and call it again to reopen the ones that were dropped meanwhile: it only
+ reconnects those.
+
+Usage:
+    session = get_shared_http_session()
+    prewarm_connections(session, n_connections=2)
+    ...  # Up to a few secs.
+    prewarm_connections(session, n_connections=2)
+    client.book_class(...)
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import urllib3
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+
+from ..conf import settings
+from ..utils.log_utils import logger
+
+
+def prewarm_connections(
+    http_session: requests.Session,
+    n_connections: int | None = None,
+    url: str | None = None,
+) -> int:
+    """
+    Make sure that the session has `n_connections` open connections to the host of
+     `url` (by default the Reborn API): open (in parallel) the missing or dropped
+     ones, with a DNS lookup and a TCP+TLS handshake each. Failures are logged,
+     never raised.
+
+    Returns: the number of open connections.
+    """
+    url = url or settings.REBORN_BASE_URL
+    n_connections = n_connections or settings.PREWARM_N_CONNECTIONS
+    start = time.perf_counter()
+    try:
+        pool = _get_pool(http_session, url)
+    except (requests.RequestException, ValueError) as exc:
+        logger.warning("Could not pre-warm connections", extra=dict(exc=str(exc)))
+        return 0
+
+    # Take the connections out of the pool, so that each is a different one, and
+    #  put them back when they are connected. New connections are made if the pool
+    #  has fewer.
+    connections = [pool._get_conn() for _ in range(n_connections)]
+    try:
+        # A dedicated executor: the callers (eg. the sniper) may be running in the
+        #  shared one, and waiting there for nested work could deadlock it.
+        with ThreadPoolExecutor(
+            max_workers=n_connections, thread_name_prefix="prewarm"
+        ) as executor:
+            is_reconnected = list(executor.map(_connect, connections))
+    finally:
+        for connection in connections:
+            pool._put_conn(connection)
+
+    n_open = sum(1 for connection in connections if connection.is_connected)
+    logger.info(
+        f"Pre-warmed {n_open} connections",
+        extra=dict(
+            host=pool.host,
+            n_reconnected=sum(1 for x in is_reconnected if x),
+            secs=round(time.perf_counter() - start, 3),
+        ),
+    )
+    return n_open
+
+
+def _get_pool(http_session: requests.Session, url: str) -> HTTPConnectionPool:
+    """
+    The connection pool that the session uses for requests to `url` (the pool
+     depends on the TLS settings too, not only on the host).
+    """
+    request = requests.Request("POST", url).prepare()
+    adapter = http_session.get_adapter(url)
+    return adapter.get_connection_with_tls_context(
+        request,
+        verify=http_session.verify,
+        proxies=http_session.proxies,
+        cert=http_session.cert,
+    )
+
+
+def _connect(connection: HTTPConnection) -> bool:
+    """
+    Connect (TCP and TLS handshake) unless connected already; the pool closes the
+     connections dropped by the server when they are taken out.
+
+    Returns: True if it connected now.
+    """
+    if connection.is_connected:
+        return False
+    connection.timeout = settings.REBORN_HTTP_CONNECT_TIMEOUT_SECS
+    try:
+        connection.connect()
+    except (OSError, urllib3.exceptions.HTTPError) as exc:
+        logger.warning(
+            "Could not pre-warm a connection",
+            extra=dict(exc=f"{exc.__class__.__name__}: {exc}"),
+        )
+        connection.close()
+        return False
+    return True
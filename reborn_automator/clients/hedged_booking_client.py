@@ -0,0 +1,182 @@
+"""
+Hedged booking requests, to cut the tail latency when the booking window opens: if
+ the `prenotazione_new` request has not answered within a percentile of the recent
+ latencies, a duplicate is sent over a separate connection, and the first answer
+ wins.
+
+The duplicate can land after the original one booked the class, so its answer is
+ "Sei già prenotato per questo orario.": see `is_booked_response()`.
+
+The losing request is not cancelled, it runs until it answers or times out. So when
+ all the workers are busy (eg. with the slow answers of the previous sniper
+ attempts), a request is not hedged rather than queued behind them.
+
+Usage:
+    client = HedgedBookingClient(RebornApiClient())
+    client.client.login(username, password)
+    data = client.book_class(class_id=758744, day="2024-10-28")
+"""
+
+import threading
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from functools import lru_cache
+
+import requests
+
+from ..conf import settings
+from ..utils.log_utils import logger
+from .latency_tracker import LatencyTracker, latency_tracker
+from .reborn_api_client import RebornApiClient, make_http_session
+
+BOOK_CLASS_ENDPOINT = "prenotazione_new"
+ALREADY_BOOKED_MESSAGE = "Sei già prenotato per questo orario."
+
+
+@lru_cache
+def get_hedge_http_session() -> requests.Session:
+    """
+    The session for the duplicate requests, with its own connection pool, so that a
+     duplicate never waits behind (or on the same connection as) the original one.
+    """
+    return make_http_session(pool_size=1)
+
+
+@lru_cache
+def get_hedge_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(
+        max_workers=settings.HEDGED_BOOKING_MAX_WORKERS, thread_name_prefix="hedge"
+    )
+
+
+# The requests running in `get_hedge_executor()`, originals and duplicates.
+_n_running = 0
+_n_running_lock = threading.Lock()
+
+
+class HedgedBookingClient:
+    def __init__(
+        self,
+        client: RebornApiClient,
+        hedge_client: RebornApiClient | None = None,
+        tracker: LatencyTracker | None = None,
+    ):
+        """
+        Args:
+            client: the client for the original requests; its login is shared.
+            hedge_client: the client for the duplicates, by default on
+             `get_hedge_http_session()`.
+            tracker: the latencies to hedge on, by default the shared ones.
+        """
+        self.client = client
+        self.hedge_client = hedge_client or RebornApiClient(
+            http_session=get_hedge_http_session()
+        )
+        self.tracker = tracker or latency_tracker
+
+    def get_hedge_delay_secs(self) -> float:
+        """
+        How long to wait for the original request before sending the duplicate:
+         `HEDGED_BOOKING_PERCENTILE` of the recent booking latencies, or a default
+         when there are too few.
+        """
+        delay = self.tracker.get_percentile(
+            BOOK_CLASS_ENDPOINT,
+            settings.HEDGED_BOOKING_PERCENTILE,
+            min_samples=settings.HEDGED_BOOKING_MIN_SAMPLES,
+        )
+        if delay is None:
+            delay = settings.HEDGED_BOOKING_DEFAULT_DELAY_SECS
+        return max(delay, settings.HEDGED_BOOKING_MIN_DELAY_SECS)
+
+    def book_class(
+        self, class_id: int, day: str | date | datetime, sede_id: int = 47
+    ) -> dict:
+        """
+        Like `RebornApiClient.book_class()`, hedged.
+
+        Returns: the first answer; a successful booking is preferred to "already
+         booked" when both answers are available.
+        """
+        self.hedge_client.session_id = self.client.session_id
+        delay_secs = self.get_hedge_delay_secs()
+        original = _submit(self.client.book_class, class_id, day, sede_id)
+        if original is None:
+            logger.info("All hedge workers busy, not hedging")
+            return self.client.book_class(class_id, day, sede_id)
+        try:
+            return original.result(timeout=delay_secs)
+        except futures.TimeoutError:
+            pass
+
+        duplicate = _submit(self.hedge_client.book_class, class_id, day, sede_id)
+        if duplicate is None:
+            logger.info("All hedge workers busy, not hedging")
+            return original.result()
+        logger.info(
+            f"Booking not answered in {delay_secs:.3f} secs, hedging",
+            extra=dict(class_id=class_id),
+        )
+        # Counted as a request of the original client, so that the callers' budgets
+        #  (eg. the waitlist watcher's) include the duplicates.
+        self.client.n_requests += 1
+        return _get_first_answer([original, duplicate])
+
+
+def is_booked_response(data: dict) -> bool:
+    """
+    True if the class is booked: a hedged booking is booked if either request
+     booked it, so "already booked" counts as booked.
+    """
+    return data.get("status") == 2 or data.get("messaggio") == ALREADY_BOOKED_MESSAGE
+
+
+def _submit(fn, *args) -> futures.Future | None:
+    """
+    Run the request in `get_hedge_executor()` if a worker is free.
+
+    Returns: None if all the workers are busy.
+    """
+    global _n_running
+    with _n_running_lock:
+        if _n_running >= settings.HEDGED_BOOKING_MAX_WORKERS:
+            return None
+        _n_running += 1
+    future = get_hedge_executor().submit(fn, *args)
+    future.add_done_callback(_on_done)
+    return future
+
+
+def _on_done(future: futures.Future) -> None:
+    global _n_running
+    with _n_running_lock:
+        _n_running -= 1
+
+
+def _get_first_answer(pending: list[futures.Future]) -> dict:
+    """
+    The first answer among the requests. An "already booked" answer means that the
+     other request booked the class: its answer is returned if already there.
+    Exceptions are raised only if all the requests failed.
+    """
+    pending = set(pending)
+    answer = None
+    exc = None
+    while pending:
+        done, pending = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is not None:
+                exc = exc or future.exception()
+                continue
+            data = future.result()
+            if data.get("messaggio") != ALREADY_BOOKED_MESSAGE:
+                return data
+            answer = data
+        if answer is not None:
+            # Do not wait for the other one.
+            for future in pending:
+                if future.done() and not future.exception():
+                    return future.result()
+            return answer
+    raise exc
@@ -0,0 +1,76 @@
+"""
+Track the recent latencies of the Reborn endpoints, from the responses to the
+ requests we send anyway, to tell when a request is slower than usual (see
+ `HedgedBookingClient`).
+
+Usage:
+    session.hooks["response"].append(latency_tracker.observe)
+    ...
+    latency_tracker.get_percentile("prenotazione_new", 95)
+"""
+
+import math
+import threading
+from collections import deque
+
+import requests
+
+from ..conf import settings
+
+
+class LatencyTracker:
+    def __init__(self, max_samples: int | None = None):
+        """
+        Args:
+            max_samples: keep only the most recent samples of each endpoint.
+        """
+        self.max_samples = max_samples or settings.LATENCY_TRACKER_MAX_SAMPLES
+        # Endpoint -> latencies in secs.
+        self._samples: dict[str, deque[float]] = dict()
+        self._lock = threading.Lock()
+
+    def observe(self, response: requests.Response, *args, **kwargs) -> None:
+        """
+        A `requests` response hook. `response.elapsed` is the time from sending the
+         request to receiving the headers.
+        """
+        self.add_sample(
+            get_endpoint(response.request.url), response.elapsed.total_seconds()
+        )
+
+    def add_sample(self, endpoint: str, latency_secs: float) -> None:
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.max_samples)
+            samples.append(latency_secs)
+
+    def get_percentile(
+        self, endpoint: str, percentile: float, min_samples: int = 1
+    ) -> float | None:
+        """
+        The nearest-rank percentile of the recent latencies of the endpoint, in secs.
+
+        Returns: None if there are less than `min_samples` samples.
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(endpoint, ()))
+        if not samples or len(samples) < min_samples:
+            return None
+        rank = math.ceil(percentile / 100 * len(samples))
+        return samples[max(rank, 1) - 1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+
+def get_endpoint(url: str) -> str:
+    """
+    Eg. "https://reborn.shaggyowl.com/funzioniapp/v407/loginApp" -> "loginApp".
+    """
+    return url.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+
+
+# Shared by all the HTTP sessions to the Reborn server (see `make_http_session()`).
+latency_tracker = LatencyTracker()
@@ -0,0 +1,185 @@
+"""
+Incremental parser for the (large) response of the palinsesto endpoint.
+
+The response is read as a stream of chunks and each day (an item in
+ `parametri.lista_risultati[].giorni[]`) is yielded as soon as it is complete, with
+ only the fields the domain uses. So the whole response is never decoded into
+ a dict tree at once (peak memory is one day) and the consumer can stop as soon as
+ it finds what it is looking for.
+
+Only the skeleton of the response (the root, `parametri`, `lista_risultati` and the
+ `risultato` objects) is scanned in Python; each day object is decoded by the C
+ decoder in `json` with `raw_decode()`.
+
+Usage:
+    parser = PalinsestoStreamParser()
+    for chunk in response.iter_content(chunk_size=16384):
+        for palinsesto_name, giorno in parser.feed(chunk):
+            ...
+    parser.close()
+"""
+
+import codecs
+import json
+import re
+
+# Fields kept for each class in `orari_giorno`.
+CLASS_KEYS = (
+    "id_orario_palinsesto",
+    "nome_corso",
+    "orario_inizio",
+    "orario_fine",
+    "nome_staff",
+)
+# Fields kept in `prenotazioni` of each class.
+PRENOTAZIONI_KEYS = (
+    "numero_posti_disponibili",
+    "numero_utenti_coda",
+    "numero_posti_occupati",
+    "utente_prenotato",
+    "frase",
+    "prenota_coda",
+)
+
+_TOKEN_RE = re.compile(r'["{}\[\]]')
+_STRING_RE = re.compile(r'"(?:[^"\\]|\\.)*"')
+_NON_WHITESPACE_RE = re.compile(r"\S")
+_INT_VALUE_RE = re.compile(r"\s*(-?\d+)\s*[,}]")
+_DECODER = json.JSONDecoder()
+
+# The keys of the containers from the root to a day object, None for the root and
+#  for array items.
+_DAY_PATH = (None, "parametri", "lista_risultati", None, "giorni")
+_RISULTATO_DEPTH = 4
+
+
+class PalinsestoStreamParser:
+    def __init__(self):
+        self.status: int | None = None
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        # The keys of the open containers, see `_DAY_PATH`.
+        self._path: list[str | None] = []
+        # The last key read in the current object.
+        self._key: str | None = None
+        self._palinsesto_name: str | None = None
+        self._is_done = False
+
+    def feed(self, chunk: bytes) -> list[tuple[str | None, dict]]:
+        """
+        Feed a chunk of the response body.
+
+        Returns: the days completed by this chunk, as (nome_palinsesto, slim giorno).
+        """
+        self._buf = self._buf[self._pos :] + self._decoder.decode(chunk)
+        self._pos = 0
+        return self._parse()
+
+    def close(self) -> None:
+        """
+        To be called at the end of the stream: it makes sure the response was
+         complete.
+        """
+        self._buf = self._buf[self._pos :] + self._decoder.decode(b"", final=True)
+        self._pos = 0
+        self._parse()
+        if not self._is_done:
+            raise IncompletePalinsesto(self._buf[:100])
+
+    def _parse(self) -> list[tuple[str | None, dict]]:
+        days = list()
+        buf = self._buf
+        while not self._is_done:
+            match = _TOKEN_RE.search(buf, self._pos)
+            if not match:
+                self._pos = len(buf)
+                break
+            i = match.start()
+            char = buf[i]
+
+            if char == '"':
+                string_match = _STRING_RE.match(buf, i)
+                if not string_match:
+                    # Incomplete string: wait for more data.
+                    self._pos = i
+                    break
+                end = string_match.end()
+                # A string followed by ":" is a key.
+                next_match = _NON_WHITESPACE_RE.search(buf, end)
+                if not next_match:
+                    self._pos = i
+                    break
+                if buf[next_match.start()] == ":":
+                    key = json.loads(string_match.group())
+                    if len(self._path) == 1 and key == "status":
+                        status_match = _INT_VALUE_RE.match(buf, next_match.end())
+                        if not status_match:
+                            self._pos = i
+                            break
+                        self.status = int(status_match.group(1))
+                    self._key = key
+                    self._pos = next_match.end()
+                else:
+                    if (
+                        len(self._path) == _RISULTATO_DEPTH
+                        and self._key == "nome_palinsesto"
+                    ):
+                        self._palinsesto_name = json.loads(string_match.group())
+                    self._pos = end
+                continue
+
+            if char in "{[":
+                if char == "{" and tuple(self._path) == _DAY_PATH:
+                    # A day: decode it all at once, with the C decoder.
+                    try:
+                        giorno, end = _DECODER.raw_decode(buf, i)
+                    except json.JSONDecodeError:
+                        # Incomplete day: wait for more data.
+                        self._pos = i
+                        break
+                    days.append((self._palinsesto_name, _slim_giorno(giorno)))
+                    self._pos = end
+                    continue
+                # The key of a container in an array is None.
+                is_in_object = self._path and self._key is not None
+                self._path.append(self._key if is_in_object else None)
+                self._key = None
+                self._pos = i + 1
+                continue
+
+            # Closing a container: "}" or "]".
+            if len(self._path) == _RISULTATO_DEPTH:
+                self._palinsesto_name = None
+            self._path.pop()
+            self._key = None
+            self._pos = i + 1
+            if not self._path:
+                self._is_done = True
+        return days
+
+
+def _slim_giorno(giorno: dict) -> dict:
+    return {
+        "giorno": giorno.get("giorno"),
+        "orari_giorno": [_slim_class(k) for k in giorno.get("orari_giorno") or []],
+    }
+
+
+def _slim_class(klass: dict) -> dict:
+    slim = {key: klass[key] for key in CLASS_KEYS if key in klass}
+    prenotazioni = klass.get("prenotazioni")
+    if isinstance(prenotazioni, dict):
+        slim["prenotazioni"] = {
+            key: prenotazioni[key] for key in PRENOTAZIONI_KEYS if key in prenotazioni
+        }
+    return slim
+
+
+class BasePalinsestoStreamParserException(Exception):
+    pass
+
+
+class IncompletePalinsesto(BasePalinsestoStreamParserException):
+    def __init__(self, tail: str):
+        self.tail = tail
@@ -1,15 +1,86 @@
 from datetime import date, datetime
+from functools import lru_cache
+from typing import Iterator
 
 import requests
+from requests.adapters import HTTPAdapter
 
+from ..conf import settings
+from ..utils import asyncio_utils
 from ..utils.log_utils import logger
+from .clock_skew_estimator import clock_skew_estimator
+from .latency_tracker import latency_tracker
+from .palinsesto_stream_parser import PalinsestoStreamParser
+
+# The answer to a booking with a stale or invalid `codice_sessione` (and, sadly, to
+#  a booking of a class id that does not exist): see `is_session_valid()`.
+BOOKING_FAILED_MESSAGE = (
+    "Qualcosa è andato storto. Ti ricordiamo che per prenotare devi essere loggato"
+    " alla tua struttura. Controlla la connessione, il tuo stato e riprova."
+)
+# The answer to a booking sent before the booking window opens.
+WINDOW_NOT_OPEN_MESSAGE = "Prenotazioni non aperte."
+
+
+def make_http_session(pool_size: int | None = None) -> requests.Session:
+    """
+    Make a new `requests.Session` with a keep-alive connection pool, so that
+     consecutive requests (login -> palinsesto -> booking) reuse the same TCP+TLS
+     connection instead of paying a DNS lookup and a handshake each time.
+
+    Every response is also a sample of the server clock and of the latency, see
+     `ClockSkewEstimator` and `LatencyTracker`.
+    """
+    pool_size = pool_size or settings.REBORN_HTTP_POOL_SIZE
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(
+        {
+            **RebornApiClient.DEFAULT_HEADERS,
+            "accept-encoding": settings.REBORN_HTTP_ACCEPT_ENCODING,
+        }
+    )
+    session.hooks["response"].append(clock_skew_estimator.observe)
+    session.hooks["response"].append(latency_tracker.observe)
+    return session
+
+
+@lru_cache
+def get_shared_http_session() -> requests.Session:
+    """
+    The process-wide session, shared by all the clients in the same Lambda execution
+     environment, so its connections also survive across warm invocations.
+    """
+    return make_http_session()
 
 
 class RebornApiClient:
     DEFAULT_HEADERS = headers = {"user-agent": "Dart/3.1 (dart:io)"}
 
-    def __init__(self) -> None:
+    def __init__(self, http_session: requests.Session | None = None) -> None:
         self.session_id: str | None = None
+        self.http_session = http_session or get_shared_http_session()
+        # The requests sent, eg. to enforce a request budget.
+        self.n_requests = 0
+
+    def _post(
+        self, url: str, payload: dict, do_stream: bool = False
+    ) -> requests.Response:
+        self.n_requests += 1
+        response = self.http_session.post(
+            url,
+            headers=self.DEFAULT_HEADERS,
+            data=payload,
+            timeout=(
+                settings.REBORN_HTTP_CONNECT_TIMEOUT_SECS,
+                settings.REBORN_HTTP_READ_TIMEOUT_SECS,
+            ),
+            stream=do_stream,
+        )
+        response.raise_for_status()
+        return response
 
     def login(self, username: str, password: str) -> None:
         """
@@ -166,11 +237,9 @@ class RebornApiClient:
             }
         """
         logger.debug("Logging in...")
-        url = "https://reborn.shaggyowl.com/funzioniapp/v407/loginApp"
-        headers = {**self.DEFAULT_HEADERS}
+        url = f"{settings.REBORN_BASE_URL}/loginApp"
         payload = {"mail": username, "pass": password}
-        response = requests.post(url, headers=headers, data=payload)
-        response.raise_for_status()
+        response = self._post(url, payload)
         data = response.json()
 
         self.session_id = (
@@ -350,15 +419,93 @@ class RebornApiClient:
             }
         """
         logger.debug("Getting palinsesto...")
-        url = "https://reborn.shaggyowl.com/funzioniapp/v407/palinsesti"
-        headers = {**self.DEFAULT_HEADERS}
+        url = f"{settings.REBORN_BASE_URL}/palinsesti"
         payload = {"id_sede": sede_id, "codice_sessione": self.session_id}
-        response = requests.post(url, headers=headers, data=payload)
-        response.raise_for_status()
+        response = self._post(url, payload)
         data = response.json()
 
+        # A stale or invalid `codice_sessione` is the only known reason for the
+        #  palinsesto not to be "Tutto bene".
+        if data.get("status") != 2:
+            raise InvalidSession(data)
         return data
 
+    def iter_palinsesto(self, sede_id: int = 47) -> Iterator[tuple[str | None, dict]]:
+        """
+        Streaming version of `get_palinsesto()`: the response body is parsed while
+         it is read, and each day is yielded as soon as it is complete, with only
+         the fields the domain uses (see `palinsesto_stream_parser`).
+
+        The request is sent and the session is validated before returning (so
+         `InvalidSession` is raised here, not while iterating). If the caller stops
+         iterating early, then the rest of the body is read (but not parsed), so
+         that the connection goes back to the keep-alive pool.
+
+        Returns: an iterator of (nome_palinsesto, giorno), eg.:
+            (
+                "Lezioni Collettive",
+                {
+                    "giorno": "2024-10-25",
+                    "orari_giorno": [
+                        {
+                            "id_orario_palinsesto": "758744",
+                            "nome_corso": "Calisthenics",
+                            "orario_inizio": "20:00",
+                            "orario_fine": "21:00",
+                            "nome_staff": "Matteo Artina",
+                            "prenotazioni": {
+                                "numero_posti_disponibili": "0",
+                                "numero_utenti_coda": "0",
+                                "numero_posti_occupati": "16",
+                                "utente_prenotato": "10992911",
+                                "frase": "Sei prenotato per questo orario (16 p.)",
+                                "prenota_coda": "2",
+                            },
+                        },
+                    ],
+                },
+            )
+        """
+        logger.debug("Streaming palinsesto...")
+        url = f"{settings.REBORN_BASE_URL}/palinsesti"
+        payload = {"id_sede": sede_id, "codice_sessione": self.session_id}
+        response = self._post(url, payload, do_stream=True)
+        chunks = response.iter_content(
+            chunk_size=settings.REBORN_HTTP_STREAM_CHUNK_SIZE
+        )
+        parser = PalinsestoStreamParser()
+        days = list()
+        # Read until the status is known.
+        for chunk in chunks:
+            days.extend(parser.feed(chunk))
+            if parser.status is not None:
+                break
+        if parser.status != 2:
+            response.close()
+            raise InvalidSession({"status": parser.status})
+        return self._iter_palinsesto_days(response, chunks, parser, days)
+
+    @staticmethod
+    def _iter_palinsesto_days(
+        response: requests.Response,
+        chunks: Iterator[bytes],
+        parser: PalinsestoStreamParser,
+        days: list[tuple[str | None, dict]],
+    ) -> Iterator[tuple[str | None, dict]]:
+        is_complete = False
+        try:
+            yield from days
+            for chunk in chunks:
+                yield from parser.feed(chunk)
+            parser.close()
+            is_complete = True
+        finally:
+            if not is_complete:
+                # Drain the body, so the connection can be reused.
+                for _ in chunks:
+                    pass
+            response.close()
+
     def book_class(
         self, class_id: int, day: str | date | datetime, sede_id: int = 47
     ) -> dict:
@@ -377,20 +524,83 @@ class RebornApiClient:
             day_str = day.strftime("%Y-%m-%d")
         else:
             raise NotADate(day)
-        url = "https://reborn.shaggyowl.com/funzioniapp/v407/prenotazione_new"
-        headers = {**self.DEFAULT_HEADERS}
+        url = f"{settings.REBORN_BASE_URL}/prenotazione_new"
         payload = {
             "id_sede": sede_id,
             "codice_sessione": self.session_id,
             "id_orario_palinsesto": class_id,
             "data": day_str,
         }
-        response = requests.post(url, headers=headers, data=payload)
-        response.raise_for_status()
+        response = self._post(url, payload)
         data = response.json()
-
         return data
 
+    def is_session_valid(self, sede_id: int = 47) -> bool:
+        """
+        Check the session with the palinsesto endpoint, the only one that tells an
+         invalid session apart: only the status at the head of the response is
+         parsed.
+        """
+        try:
+            days = self.iter_palinsesto(sede_id)
+        except InvalidSession:
+            return False
+        # Start and stop the iteration, so that the rest of the body is read (but
+        #  not parsed) and the connection goes back to the pool.
+        next(days, None)
+        days.close()
+        return True
+
+
+class AsyncRebornApiClient:
+    """
+    Asyncio counterpart of `RebornApiClient`, with the same methods.
+
+    The requests are sent by the sync client in the shared thread pool of
+     `asyncio_utils`, on the same keep-alive connection pool, so the event loop is
+     never blocked and many requests can be awaited together.
+
+    Usage:
+        client = AsyncRebornApiClient()
+        await client.login(username, password)
+        palinsesto1, palinsesto2 = await asyncio.gather(
+            client.get_palinsesto(47), client.get_palinsesto(48)
+        )
+    """
+
+    def __init__(
+        self,
+        http_session: requests.Session | None = None,
+        client: RebornApiClient | None = None,
+    ) -> None:
+        """
+        Args:
+            http_session: the session to use, by default the shared one.
+            client: a sync client to wrap, eg. to share its login.
+        """
+        self.client = client or RebornApiClient(http_session=http_session)
+
+    @property
+    def session_id(self) -> str | None:
+        return self.client.session_id
+
+    @session_id.setter
+    def session_id(self, value: str | None) -> None:
+        self.client.session_id = value
+
+    async def login(self, username: str, password: str) -> None:
+        return await asyncio_utils.run_in_thread(self.client.login, username, password)
+
+    async def get_palinsesto(self, sede_id: int = 47) -> dict:
+        return await asyncio_utils.run_in_thread(self.client.get_palinsesto, sede_id)
+
+    async def book_class(
+        self, class_id: int, day: str | date | datetime, sede_id: int = 47
+    ) -> dict:
+        return await asyncio_utils.run_in_thread(
+            self.client.book_class, class_id, day, sede_id
+        )
+
 
 class BaseRebornApiClientException(Exception):
     pass
@@ -401,6 +611,11 @@ class AuthError(BaseRebornApiClientException):
         self.response_data = response_data
 
 
+class InvalidSession(BaseRebornApiClientException):
+    def __init__(self, response_data: dict):
+        self.response_data = response_data
+
+
 class MissingDay(BaseRebornApiClientException):
     def __init__(self, data: dict):
         self.data = data
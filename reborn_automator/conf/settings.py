@@ -24,33 +24,195 @@ class settings:
     APP_NAME = "Reborn Automator"
     IS_TEST = False
 
+    # Values read from AWS Parameter Store are cached in memory for this long.
+    PARAMETER_STORE_CACHE_TTL_SECS = 60 * 15
+
     # Credentials used in Reborn mobile app.
     # Read the Reborn creds from env vars (when running in AWS Lambda) or from
     #  AWS Param Store (in dev or when recording tests).
-    REBORN_CREDS_USERNAME = settings_utils.get_string_from_env_or_aws_parameter_store(
+    # They are lazy: resolved only when first read, see
+    #  `LazyEnvOrAwsParameterStoreSetting`. A missing parameter raises.
+    REBORN_CREDS_USERNAME = settings_utils.LazyEnvOrAwsParameterStoreSetting(
         env_key="REBORN_CREDS_USERNAME",
         # AWS Param Store used in dev and when recording tests.
         parameter_store_key_path="/reborn-automator/production/reborn-creds-username",
-        default="XXX",
     )
-    REBORN_CREDS_PASSWORD = settings_utils.get_string_from_env_or_aws_parameter_store(
+    REBORN_CREDS_PASSWORD = settings_utils.LazyEnvOrAwsParameterStoreSetting(
         env_key="REBORN_CREDS_PASSWORD",
         # AWS Param Store used in dev and when recording tests.
         parameter_store_key_path="/reborn-automator/production/reborn-creds-password",
-        default="XXX",
     )
+    # Reborn API, the one used by Reborn mobile app (overridden to run against
+    #  `FakeRebornServer`).
+    REBORN_BASE_URL = "https://reborn.shaggyowl.com/funzioniapp/v407"
+    # HTTP transport to Reborn API: a keep-alive connection pool shared by all
+    #  requests in the same Lambda execution environment.
+    REBORN_HTTP_POOL_SIZE = 4
+    REBORN_HTTP_CONNECT_TIMEOUT_SECS = 3.05
+    REBORN_HTTP_READ_TIMEOUT_SECS = 10
+    REBORN_HTTP_ACCEPT_ENCODING = "gzip"
+    # Parse the palinsesto while it is downloaded and stop as soon as the class
+    #  is found, see `RebornApiClient.iter_palinsesto()`.
+    IS_PALINSESTO_STREAMING_ENABLED = False
+    REBORN_HTTP_STREAM_CHUNK_SIZE = 16 * 1024
+    # The palinsesto response is cached and reused across warm invocations, see
+    #  `PalinsestoCache`. Parsed palinsesti are kept in memory, up to a max.
+    PALINSESTO_CACHE_TTL_SECS = 60 * 60
+    PALINSESTO_CACHE_MAX_PARSED = 4
+    # Max number of concurrent blocking HTTP requests run by the async clients.
+    ASYNC_IO_MAX_WORKERS = REBORN_HTTP_POOL_SIZE
+    # The `codice_sessione` returned by the login is cached and reused across warm
+    #  invocations, until the server rejects it or it gets older than this.
+    REBORN_SESSION_CACHE_TTL_SECS = 60 * 60 * 24 * 6
+    # Booking for a class opens 2 days before the class (Rome timezone).
+    REBORN_TIMEZONE = "Europe/Rome"
+    REBORN_BOOKING_WINDOW_OPENS_BEFORE_CLASS_SECS = 60 * 60 * 48
+
+    # Sniper mode: the Lambda is triggered a bit before the booking window opens,
+    #  it logs in and finds the class in advance, then it books the class at the
+    #  exact instant the window opens, retrying until the deadline.
+    IS_SNIPER_MODE_ENABLED = settings_utils.get_bool_from_env(
+        "IS_SNIPER_MODE_ENABLED", default=False
+    )
+    # Max time to wait for the window to open; if it opens later, book immediately.
+    SNIPER_MAX_WAIT_SECS = 75
+    # Keep retrying for this long after the window opened.
+    SNIPER_DEADLINE_SECS = 8
+    SNIPER_RETRY_INTERVAL_SECS = 0.2
+    # Aim the sniper at the Reborn server clock, estimated from the `Date` header of
+    #  its responses (see `ClockSkewEstimator`), rather than at the local clock.
+    IS_CLOCK_SKEW_CORRECTION_ENABLED = True
+    # The estimate is rolling: only the most recent samples are used.
+    CLOCK_SKEW_MAX_SAMPLES = 32
+    CLOCK_SKEW_MAX_SAMPLE_AGE_SECS = 60 * 60
+    # Hedged bookings: if a booking request has not answered within a percentile of
+    #  the recent booking latencies, send a duplicate over a separate connection and
+    #  take the first answer (see `HedgedBookingClient`).
+    IS_HEDGED_BOOKING_ENABLED = settings_utils.get_bool_from_env(
+        "IS_HEDGED_BOOKING_ENABLED", default=False
+    )
+    HEDGED_BOOKING_PERCENTILE = 95
+    # With fewer recent latencies, hedge after the default delay.
+    HEDGED_BOOKING_MIN_SAMPLES = 5
+    HEDGED_BOOKING_DEFAULT_DELAY_SECS = 0.5
+    HEDGED_BOOKING_MIN_DELAY_SECS = 0.05
+    # The originals and the duplicates in flight: when all are busy (eg. with slow
+    #  answers of previous sniper attempts), the bookings are not hedged.
+    HEDGED_BOOKING_MAX_WORKERS = 4
+    # The latencies of each Reborn endpoint are tracked over the last responses.
+    LATENCY_TRACKER_MAX_SAMPLES = 50
+    # Pre-warm the connections to Reborn (DNS, TCP and TLS) at init time and a few
+    #  secs before the sniper fires, see `prewarm_connections()`. The server closes
+    #  idle connections after 5 secs, so they are checked again right before firing.
+    IS_CONNECTION_PREWARM_ENABLED = True
+    # At most `REBORN_HTTP_POOL_SIZE`.
+    PREWARM_N_CONNECTIONS = 2
+    PREWARM_BEFORE_FIRE_SECS = 3
+    PREWARM_CHECK_BEFORE_FIRE_SECS = 0.3
+
+    # Encode JSON with orjson, when installed (the optional extra `fast-json`), see
+    #  `json_utils`. Off by default: its output is not byte-identical to the stdlib
+    #  one (compact, non-ASCII chars not escaped, NaN as null).
+    IS_JSON_FAST_BACKEND_ENABLED = False
+
+    # The seat availability (see `SeatAvailabilityDomain`) is cached this long.
+    SEAT_AVAILABILITY_CACHE_TTL_SECS = 60
+
+    # Max number of concurrent pipelines/requests when booking for many accounts.
+    BOOKING_ENGINE_MAX_WORKERS = 16
+
+    # Waitlist watcher: full classes are polled until a seat frees up, every
+    #  interval between the min and the max (the closer the class, the shorter),
+    #  backing off by the factor at each poll with no changes. Every request (polls,
+    #  bookings and logins) counts against the budget of requests per invocation.
+    #  The max interval is well below the watch duration (a 90 secs Lambda watches
+    #  for about 60 secs), so an invocation polls several times anyway.
+    WAITLIST_MAX_REQUESTS = 60
+    WAITLIST_MIN_INTERVAL_SECS = 3
+    WAITLIST_MAX_INTERVAL_SECS = 8
+    WAITLIST_TIGHTEN_WITHIN_SECS = 60 * 60 * 3
+    WAITLIST_BACKOFF_FACTOR = 1.5
+    # The watcher stops this long before the invocation times out (see
+    #  `context.get_remaining_time_in_millis()`), to leave time for a last poll and
+    #  booking (each up to the Reborn HTTP timeouts) and for the Botte flush.
+    WAITLIST_LAMBDA_TIMEOUT_MARGIN_SECS = 30
+    # When the remaining time is unknown (eg. run locally): the `cron-book-classes`
+    #  Lambda timeout is 90 secs, see serverless.yml.
+    WAITLIST_MAX_DURATION_SECS = 60
+
+    # Booking rules, by rule id: the scheduled events of the `cron-book-classes`
+    #  Lambda carry the ids of the rules to run (see `booking_rules_domain`). Each
+    #  rule books the next class of `course_name`, optionally restricted to a
+    #  `weekday` (0 is Monday), a `start_time` ("HH:MM"), an `instructor` and a
+    #  `sede_id` (the gym, default 47).
+    BOOKING_RULES = {
+        "cali": dict(course_name="Calisthenics"),
+        "power": dict(course_name="Powerlifting"),
+    }
 
     # Botte project (in patatrack monorepo) token to be used to authentic with its
     #  HTTP interface (it's the env var API_AUTHORIZER_TOKEN in Botte).
-    BOTTE_AUTH_TOKEN = settings_utils.get_string_from_env_or_aws_parameter_store(
+    BOTTE_AUTH_TOKEN = settings_utils.LazyEnvOrAwsParameterStoreSetting(
         env_key="BOTTE_AUTH_TOKEN",
         # AWS Param Store used in dev and when recording tests.
         parameter_store_key_path="/patatrack-botte/prod/api-authorizer-token",
-        default="XXX",
     )
+    # The token required in the `Authorization` header of the private endpoints
+    #  (eg. /availability), see `authorizer_view`.
+    API_AUTHORIZER_TOKEN = settings_utils.LazyEnvOrAwsParameterStoreSetting(
+        env_key="API_AUTHORIZER_TOKEN",
+        # AWS Param Store used in dev and when recording tests.
+        parameter_store_key_path="/reborn-automator/production/api-authorizer-token",
+    )
+
     # This url might change if we redeploy Botte.
     BOTTE_BASE_URL = "https://iwjuceybm1.execute-api.eu-south-1.amazonaws.com"
+    BOTTE_HTTP_TIMEOUT_SECS = 5
+    # Botte outbox: messages are spooled to /tmp until sent, retried, and pending
+    #  messages are merged into a single digest message (Telegram max length).
+    # At the end of the handler the flush is waited for, but at most this long.
+    BOTTE_MAX_WAIT_SECS = 3
+    BOTTE_OUTBOX_MAX_ATTEMPTS = 3
+    BOTTE_OUTBOX_RETRY_BACKOFF_SECS = 0.3
+    BOTTE_OUTBOX_MAX_MESSAGE_LENGTH = 4096
+    # Spooled messages older than this are dropped.
+    BOTTE_OUTBOX_MAX_AGE_SECS = 60 * 60 * 24
+
+    # Cache in the execution environment: in-process first, then files in /tmp.
+    IS_TMP_CACHE_ENABLED = True
+    TMP_CACHE_DIR = "/tmp/reborn-automator"
+    # Every fetched palinsesto and every booking attempt are recorded in a SQLite
+    #  file in `TMP_CACHE_DIR`, see `PalinsestoSnapshotStore`. Older records are
+    #  deleted.
+    IS_SNAPSHOT_STORE_ENABLED = True
+    SNAPSHOT_STORE_RETENTION_DAYS = 120
+    # The records are written in the background; at the end of the handler they are
+    #  waited for, but at most this long.
+    SNAPSHOT_STORE_MAX_WAIT_SECS = 1
+    # Fire the sniper when the booking window was observed to open, for each course
+    #  (learned from the booking attempts recorded in the snapshot store), rather
+    #  than at `REBORN_BOOKING_WINDOW_OPENS_BEFORE_CLASS_SECS`.
+    # Off by default: the store is in /tmp, which lives only as long as the Lambda
+    #  execution environment (usually reclaimed after minutes to hours idle), so
+    #  with the weekly schedules the observations are lost between runs and the
+    #  learning never takes effect. Enable it (env var) only when runs are close
+    #  together, or once the store is persisted durably, eg. to S3.
+    IS_BOOKING_WINDOW_LEARNING_ENABLED = settings_utils.get_bool_from_env(
+        "IS_BOOKING_WINDOW_LEARNING_ENABLED", default=False
+    )
+    # Learn only from the attempts of the last days, so that a change of the rules
+    #  is picked up.
+    BOOKING_WINDOW_LEARNING_DAYS = 60
 
 
 class test_settings:
     IS_TEST = True
+    IS_TMP_CACHE_ENABLED = False
+    IS_SNAPSHOT_STORE_ENABLED = False
+    IS_BOOKING_WINDOW_LEARNING_ENABLED = False
+    IS_CLOCK_SKEW_CORRECTION_ENABLED = False
+    IS_HEDGED_BOOKING_ENABLED = False
+    IS_CONNECTION_PREWARM_ENABLED = False
+    IS_JSON_FAST_BACKEND_ENABLED = False
+    IS_SNIPER_MODE_ENABLED = False
+    BOTTE_OUTBOX_RETRY_BACKOFF_SECS = 0
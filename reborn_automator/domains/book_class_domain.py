@@ -1,11 +1,46 @@
+import asyncio
+import time
+from dataclasses import dataclass
 from datetime import date, datetime
+from datetime import time as dt_time
+from datetime import timedelta, timezone
 from enum import StrEnum
-from functools import lru_cache
+from typing import Any, Callable, Iterator
+from zoneinfo import ZoneInfo
 
-from ..clients.reborn_api_client import RebornApiClient
+import requests
+
+from ..clients.clock_skew_estimator import SkewEstimate, clock_skew_estimator
+from ..clients.connection_prewarmer import prewarm_connections
+from ..clients.hedged_booking_client import HedgedBookingClient, is_booked_response
+from ..clients.reborn_api_client import (
+    BOOKING_FAILED_MESSAGE,
+    WINDOW_NOT_OPEN_MESSAGE,
+    InvalidSession,
+    RebornApiClient,
+)
 from ..conf import settings
-from ..utils import datetime_utils
+from ..utils import asyncio_utils, datetime_utils
 from ..utils.log_utils import logger
+from ..utils.tmp_cache_utils import TmpCache
+from .palinsesto_cache import PalinsestoCache
+from .palinsesto_model import (
+    DEFAULT_PALINSESTO_NAME,
+    MissingDay,
+    Palinsesto,
+    PalinsestoClass,
+    iter_day_classes,
+)
+from .palinsesto_snapshot_store import PalinsestoSnapshotStore, WindowEstimate
+
+# Username -> `codice_sessione`, shared by all domains in the execution environment.
+session_cache = TmpCache(
+    "reborn-sessions", ttl_secs=settings.REBORN_SESSION_CACHE_TTL_SECS
+)
+# Palinsesto responses, shared by all domains in the execution environment.
+palinsesto_cache = PalinsestoCache()
+# History of the fetched palinsesti, shared by all domains.
+snapshot_store = PalinsestoSnapshotStore()
 
 
 class ClassNameEnum(StrEnum):
@@ -13,16 +48,138 @@ class ClassNameEnum(StrEnum):
     POWER = "Powerlifting"
 
 
+@dataclass
+class ClassTarget:
+    """
+    A class to book: the next class with the given name, optionally restricted to
+     a day, a weekday, a start time and/or an instructor.
+    """
+
+    class_name: str | ClassNameEnum
+    day_date: date | None = None
+    start_time: dt_time | None = None
+    # 0 is Monday, like `date.weekday()`.
+    weekday: int | None = None
+    instructor: str | None = None
+
+    def matches(self, klass: PalinsestoClass, today: date) -> bool:
+        if klass.course_name != self.class_name:
+            return False
+        if self.day_date and klass.day_date != self.day_date:
+            return False
+        # Make sure the day is tomorrow or later.
+        if not self.day_date and klass.day_date <= today:
+            return False
+        if self.weekday is not None and klass.day_date.weekday() != self.weekday:
+            return False
+        if self.start_time and klass.start_time != self.start_time:
+            return False
+        if self.instructor and klass.instructor != self.instructor:
+            return False
+        return True
+
+
+@dataclass
+class BookingResult:
+    target: ClassTarget
+    class_id: str | None = None
+    day_date: date | None = None
+    response: dict | None = None
+    exception: Exception | None = None
+
+    @property
+    def is_booked(self) -> bool:
+        return self.exception is None and self.response is not None
+
+
 class BookClassDomain:
-    def __init__(self, sede_id: int = 47):
-        self.client = RebornApiClient()
+    def __init__(
+        self,
+        sede_id: int = 47,
+        http_session: requests.Session | None = None,
+        username: str | None = None,
+        password: str | None = None,
+    ):
+        """
+        Args:
+            sede_id: the gym id.
+            http_session: the HTTP session to use, by default the shared one.
+            username, password: the Reborn creds, by default those in settings.
+        """
+        self.client = RebornApiClient(http_session=http_session)
         self.sede_id = sede_id
+        self.username = username or settings.REBORN_CREDS_USERNAME
+        self.password = password or settings.REBORN_CREDS_PASSWORD
+        self._is_session_cached = False
+        self._palinsesto: Palinsesto | None = None
+        self._hedged_client: HedgedBookingClient | None = None
 
-    @lru_cache
-    def _login(self):
-        self.client.login(
-            settings.REBORN_CREDS_USERNAME, settings.REBORN_CREDS_PASSWORD
-        )
+    def _login(self, do_force: bool = False) -> None:
+        """
+        Login, unless already logged in or a cached session is available.
+
+        Args:
+            do_force: True to skip the cache and perform a new login (eg. when the
+             server rejected the cached session).
+        """
+        if self.client.session_id and not do_force:
+            return
+
+        if not do_force:
+            session_id = session_cache.get(self.username)
+            if session_id:
+                logger.debug("Reusing cached session")
+                self.client.session_id = session_id
+                self._is_session_cached = True
+                return
+
+        self.client.login(self.username, self.password)
+        self._is_session_cached = False
+        session_cache.set(self.username, self.client.session_id)
+
+    def _get_palinsesto(self, do_refresh: bool = False) -> tuple[dict, str | None]:
+        """
+        The palinsesto response, from the cache if available.
+
+        Args:
+            do_refresh: True to skip the cache and fetch the palinsesto again.
+
+        Returns: the response and its content hash (see `PalinsestoCache.parse()`).
+        """
+        if not do_refresh:
+            data = palinsesto_cache.get(self.username, self.sede_id)
+            if data is not None:
+                logger.debug("Reusing cached palinsesto")
+                return data, palinsesto_cache.get_content_hash(
+                    self.username, self.sede_id
+                )
+
+        data = self._call_with_session(self.client.get_palinsesto, self.sede_id)
+        content_hash = palinsesto_cache.set(self.username, self.sede_id, data)
+        if settings.IS_SNAPSHOT_STORE_ENABLED:
+            snapshot_store.submit(
+                snapshot_store.record,
+                self.sede_id,
+                palinsesto_cache.parse(data, content_hash),
+            )
+        return data, content_hash
+
+    def _call_with_session(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Call a client method that requires a session (eg. get the palinsesto), which
+         also cheaply validates a cached session: if the server rejects it, then
+         login again and retry once.
+        """
+        self._login()
+        try:
+            return fn(*args, **kwargs)
+        except InvalidSession:
+            if not self._is_session_cached:
+                raise
+            logger.info("Cached session rejected, logging in again")
+            session_cache.delete(self.username)
+            self._login(do_force=True)
+            return fn(*args, **kwargs)
 
     def get_next_calisthenics_class(self):
         return self._get_next_class(class_name=ClassNameEnum.CALI)
@@ -87,72 +244,471 @@ class BookClassDomain:
             )
         """
         logger.debug(f"Getting next {class_name} class...")
+        klass = self.find_class(ClassTarget(class_name))
+        return klass.id, klass.data, klass.day_date
+
+    def get_palinsesto(self, do_refresh: bool = False) -> Palinsesto:
+        """
+        The parsed and indexed palinsesto. It is fetched and parsed only once per
+         domain instance, so several queries can reuse it; and across domain
+         instances it is served by `palinsesto_cache` until it expires.
+        """
+        if self._palinsesto is None or do_refresh:
+            self._palinsesto = palinsesto_cache.parse(
+                *self._get_palinsesto(do_refresh=do_refresh)
+            )
+        return self._palinsesto
+
+    def book_next_calisthenics_class(self, is_sniper: bool = False):
+        return self._book_next_class(ClassNameEnum.CALI, is_sniper=is_sniper)
+
+    def book_next_powerlifting_class(self, is_sniper: bool = False):
+        return self._book_next_class(ClassNameEnum.POWER, is_sniper=is_sniper)
+
+    def _book_next_class(
+        self, class_name: str | ClassNameEnum, is_sniper: bool = False
+    ) -> tuple[dict, date]:
+        """
+        Args:
+            class_name: the name of the class to book.
+            is_sniper: True to login and find the class in advance, then wait for
+             the booking window to open and book the class at that exact instant,
+             retrying until the booking lands or the deadline is reached.
+
+        Returns:
+            {"status": 1, "messaggio": "Prenotazioni non aperte.", "parametri":{}}
+        """
+        logger.debug(f"Booking next {class_name} class...")
         self._login()
-        palinsesto = self.client.get_palinsesto(self.sede_id)
+        klass = self.find_class(ClassTarget(class_name))
+        data = self._book_class(class_name, klass, is_sniper=is_sniper)
+        return data, klass.day_date
+
+    def book_classes(
+        self, targets: list[ClassTarget], is_sniper: bool = False
+    ) -> list[BookingResult]:
+        """
+        Book many classes with one login and one palinsesto fetch, sending all the
+         bookings concurrently.
+
+        Args:
+            targets: the classes to book.
+            is_sniper: True to book every class at the exact instant its booking
+             window opens, see `_book_next_class()`.
+
+        Returns: a result for each target, in the same order. A target that could
+         not be booked has its `exception` set (eg. `NoClassFoundInPalinsesto` or
+         `FailedBooking`), it is never raised.
+        """
+        return asyncio.run(self.abook_classes(targets, is_sniper=is_sniper))
+
+    async def abook_classes(
+        self, targets: list[ClassTarget], is_sniper: bool = False
+    ) -> list[BookingResult]:
+        """
+        Asyncio version of `book_classes()`.
+        """
+        logger.debug(f"Booking {len(targets)} classes...")
+        # Login and fetch the palinsesto once, for all targets.
+        results, to_book = await asyncio_utils.run_in_thread(
+            self.resolve_targets, targets
+        )
+        await asyncio.gather(
+            *(
+                asyncio_utils.run_in_thread(self.book_target, result, klass, is_sniper)
+                for result, klass in to_book
+            )
+        )
+        return results
+
+    def resolve_targets(
+        self, targets: list[ClassTarget]
+    ) -> tuple[list[BookingResult], list[tuple[BookingResult, PalinsestoClass]]]:
+        """
+        Find the class for each target in the palinsesto.
 
-        # Traverse all results.
-        for risultato in palinsesto.get("parametri", {}).get("lista_risultati", []):
-            risultato: dict
-            if risultato.get("nome_palinsesto") != "Lezioni Collettive":
+        Returns: a result for each target, and the (result, class) pairs to book.
+        """
+        results = list()
+        to_book = list()
+        if len(targets) == 1:
+            # A single target is an index lookup.
+            try:
+                classes = [self.find_class(targets[0])]
+            except BaseBookClassDomainException as exc:
+                classes = [exc]
+        else:
+            classes = self._find_classes(targets)
+        for target, klass in zip(targets, classes):
+            result = BookingResult(target)
+            results.append(result)
+            if isinstance(klass, Exception):
+                result.exception = klass
                 continue
+            result.class_id = klass.id
+            result.day_date = klass.day_date
+            to_book.append((result, klass))
+        return results, to_book
+
+    def book_target(
+        self, result: BookingResult, klass: PalinsestoClass, is_sniper: bool = False
+    ) -> None:
+        """
+        Book the class and store the outcome in `result`.
+        """
+        try:
+            # Sniper mode sleeps, this is why it is run in a thread by the callers.
+            result.response = self._book_class(
+                result.target.class_name, klass, is_sniper
+            )
+        except Exception as exc:
+            result.exception = exc
+
+    def find_class(self, target: ClassTarget) -> PalinsestoClass:
+        """
+        The class for the target: the first one in the earliest day that matches it.
+
+        Note: in streaming mode (`settings.IS_PALINSESTO_STREAMING_ENABLED`) the
+         `data` of the returned class has only the fields listed in
+         `palinsesto_stream_parser`.
+        """
+        today = datetime_utils.now().date()
+        stream = None
+        if (
+            settings.IS_PALINSESTO_STREAMING_ENABLED
+            and self._palinsesto is None
+            and palinsesto_cache.get(self.username, self.sede_id) is None
+        ):
+            # Stop parsing as soon as the class is found.
+            classes = stream = self._stream_classes()
+        elif target.day_date:
+            classes = self.get_palinsesto().get_classes(
+                target.class_name, target.day_date
+            )
+        else:
+            classes = self.get_palinsesto().iter_next_classes(
+                target.class_name, after=today
+            )
 
-            # Traverse all days.
-            for giorno in risultato.get("giorni", []):
-                # Make sure the day is tomorrow or later.
-                day_str: str | None = giorno.get("giorno")  # Eg. "2024-10-25".
-                if not day_str:
-                    raise MissingDay(giorno)
-                day_date: date = datetime.strptime(day_str, "%Y-%m-%d").date()
-                if (day_date - datetime_utils.now().date()).days <= 0:
-                    # It's today, yesterday or earlier.
+        try:
+            for klass in classes:
+                if not target.matches(klass, today):
                     continue
+                # Make sure there is a class id.
+                if klass.id is None:
+                    raise MissingIdOrarioPalinsesto(klass.data)
+                return klass
+        finally:
+            if stream is not None:
+                stream.close()
+        raise NoClassFoundInPalinsesto(target.class_name)
+
+    def _find_classes(
+        self, targets: list[ClassTarget]
+    ) -> list["PalinsestoClass | BaseBookClassDomainException"]:
+        """
+        Find the class for each target with a single pass over the palinsesto: for
+         each target, the first class in the earliest day that matches it.
 
-                # Traverse all classes.
-                for klass in giorno.get("orari_giorno"):
-                    klass: dict
-                    # Checking the class name.
-                    if klass.get("nome_corso") != class_name:
+        Returns: a class for each target, in the same order, or the exception for
+         the targets with no class (eg. `NoClassFoundInPalinsesto`).
+        """
+        today = datetime_utils.now().date()
+        found: list[PalinsestoClass | None] = [None] * len(targets)
+        n_found = 0
+        stream = None
+        if (
+            settings.IS_PALINSESTO_STREAMING_ENABLED
+            and self._palinsesto is None
+            and palinsesto_cache.get(self.username, self.sede_id) is None
+        ):
+            classes = stream = self._stream_classes()
+        else:
+            classes = self.get_palinsesto().classes
+
+        try:
+            for klass in classes:
+                for i, target in enumerate(targets):
+                    if found[i] is not None and found[i].day_date <= klass.day_date:
                         continue
-                    # Make sure there is a class id.
-                    klass_id = klass.get("id_orario_palinsesto")
-                    if klass_id is None:
-                        raise MissingIdOrarioPalinsesto(klass)
-                    return klass_id, klass, day_date
-        raise NoClassFoundInPalinsesto(class_name)
+                    if target.matches(klass, today):
+                        n_found += found[i] is None
+                        found[i] = klass
+                # Days are streamed in order: stop as soon as all are found.
+                if stream is not None and n_found == len(targets):
+                    break
+        finally:
+            if stream is not None:
+                stream.close()
 
-    def book_next_calisthenics_class(self):
-        return self._book_next_class(ClassNameEnum.CALI)
+        results = list()
+        for target, klass in zip(targets, found):
+            if klass is None:
+                results.append(NoClassFoundInPalinsesto(target.class_name))
+            elif klass.id is None:
+                results.append(MissingIdOrarioPalinsesto(klass.data))
+            else:
+                results.append(klass)
+        return results
+
+    def _stream_classes(self) -> Iterator[PalinsestoClass]:
+        days = self._call_with_session(self.client.iter_palinsesto, self.sede_id)
+        try:
+            for palinsesto_name, giorno in days:
+                if palinsesto_name != DEFAULT_PALINSESTO_NAME:
+                    continue
+                yield from iter_day_classes(giorno)
+        finally:
+            days.close()
 
-    def book_next_powerlifting_class(self):
-        return self._book_next_class(ClassNameEnum.POWER)
+    def _book_class(
+        self,
+        class_name: str | ClassNameEnum,
+        klass: PalinsestoClass,
+        is_sniper: bool = False,
+    ) -> dict:
+        if is_sniper:
+            data = self._snipe_class(klass.id, klass.data, klass.day_date)
+        else:
+            data = self._send_booking(klass.id, klass.data, klass.day_date)
+        if settings.IS_HEDGED_BOOKING_ENABLED:
+            # A duplicate request finds the class booked by the original one.
+            is_booked = is_booked_response(data)
+        else:
+            is_booked = data.get("status") == 2
+        if not is_booked:
+            raise FailedBooking(data, class_name, klass.id, klass.day_date)
+        # The bookings are part of the palinsesto response, so it is now stale.
+        palinsesto_cache.invalidate(self.username, self.sede_id)
+        return data
 
-    def _book_next_class(self, class_name: str | ClassNameEnum) -> tuple[dict, date]:
+    def _send_booking(self, class_id: int, klass: dict, day_date: date) -> dict:
         """
-        Returns:
-            {"status": 1, "messaggio": "Prenotazioni non aperte.", "parametri":{}}
+        Book the class (logging in again if the cached session is rejected) and
+         record the attempt, with its timing, in the snapshot store (in the
+         background, so a sniper retry never waits for it): the responses
+         teach when the booking window opens (see `_get_window_estimate()`). The
+         timing is on the server clock, when known.
         """
-        logger.debug(f"Booking next {class_name} class...")
-        self._login()
-        try:
-            class_id, _, day_date = self._get_next_class(class_name)
-        except NoClassFoundInPalinsesto:
-            raise
-        day_date: date
-        data = self.client.book_class(
-            class_id=class_id, day=day_date, sede_id=self.sede_id
+        book_class = self._get_booking_client().book_class
+        sent_at = None
+
+        def send(**kwargs) -> dict:
+            nonlocal sent_at
+            # Right before the request: not before a login again.
+            sent_at = datetime_utils.now_utc()
+            data = book_class(**kwargs)
+            # The cached session may have expired (eg. the palinsesto came from its
+            #  cache, so nothing validated it yet), but the same answer is given to
+            #  a class that does not exist: check the session before logging in
+            #  again.
+            if (
+                data.get("messaggio") == BOOKING_FAILED_MESSAGE
+                and self._is_session_cached
+                and not self.client.is_session_valid(self.sede_id)
+            ):
+                raise InvalidSession(data)
+            return data
+
+        data = self._call_with_session(
+            send, class_id=class_id, day=day_date, sede_id=self.sede_id
         )
-        if data.get("status") != 2:
-            raise FailedBooking(data, class_name, class_id, day_date)
-        return data, day_date
+        received_at = datetime_utils.now_utc()
+        if settings.IS_SNAPSHOT_STORE_ENABLED and klass.get("nome_corso"):
+            skew = self._get_clock_skew()
+            offset = timedelta(seconds=skew.offset_secs if skew else 0)
+            snapshot_store.submit(
+                snapshot_store.record_booking_attempt,
+                self.sede_id,
+                class_id,
+                klass["nome_corso"],
+                day_date,
+                starts_at=get_class_starts_at(klass, day_date),
+                sent_at=sent_at + offset,
+                received_at=received_at + offset,
+                response=data,
+            )
+        return data
 
+    def _get_booking_client(self) -> RebornApiClient | HedgedBookingClient:
+        """
+        The client to book with: hedged if `IS_HEDGED_BOOKING_ENABLED`, see
+         `HedgedBookingClient`.
+        """
+        if not settings.IS_HEDGED_BOOKING_ENABLED:
+            return self.client
+        if self._hedged_client is None or self._hedged_client.client is not self.client:
+            self._hedged_client = HedgedBookingClient(self.client)
+        return self._hedged_client
 
-class BaseBookClassDomainException(Exception):
-    pass
+    def _prewarm_connections(self) -> None:
+        """
+        Open the connections the booking requests will use: those of the client
+         and, when hedging, the one of the duplicates.
+        """
+        prewarm_connections(self.client.http_session)
+        booking_client = self._get_booking_client()
+        if isinstance(booking_client, HedgedBookingClient):
+            prewarm_connections(booking_client.hedge_client.http_session, 1)
 
+    def _get_clock_skew(self) -> SkewEstimate | None:
+        """
+        How much the server clock is ahead of the local one, see
+         `ClockSkewEstimator`. None if the correction is disabled or there are no
+         samples yet.
+        """
+        if not settings.IS_CLOCK_SKEW_CORRECTION_ENABLED:
+            return None
+        return clock_skew_estimator.get_estimate()
 
-class MissingDay(BaseBookClassDomainException):
-    def __init__(self, data: dict):
-        self.data = data
+    def _get_window_estimate(self, klass: dict) -> WindowEstimate | None:
+        """
+        When the booking window of the class's course opens, learned from the
+         booking attempts of the last `BOOKING_WINDOW_LEARNING_DAYS`.
+
+        Returns: None if learning is disabled, there are no observations yet or
+         they contradict each other.
+        """
+        if not (
+            settings.IS_SNAPSHOT_STORE_ENABLED
+            and settings.IS_BOOKING_WINDOW_LEARNING_ENABLED
+            and klass.get("nome_corso")
+        ):
+            return None
+        since = datetime_utils.now_utc() - timedelta(
+            days=settings.BOOKING_WINDOW_LEARNING_DAYS
+        )
+        estimate = snapshot_store.get_window_estimate(
+            klass["nome_corso"], self.sede_id, since=since
+        )
+        if estimate and not estimate.is_consistent:
+            logger.warning(
+                "Inconsistent booking window observations, ignoring them",
+                extra=dict(estimate=str(estimate)),
+            )
+            return None
+        return estimate
+
+    def get_booking_window_opens_at(
+        self, klass: dict, day_date: date, estimate: WindowEstimate | None = None
+    ) -> datetime:
+        """
+        The UTC datetime when the booking window for the given class opens: the
+         learned one if an estimate is given, else the configured one.
+        """
+        if estimate is None:
+            return get_booking_window_opens_at(klass, day_date)
+        before_class_secs = estimate.get_fire_before_class_secs(
+            default=settings.REBORN_BOOKING_WINDOW_OPENS_BEFORE_CLASS_SECS
+        )
+        # In UTC: the learned offset is elapsed time, not wall-clock time (they
+        #  differ across a DST change).
+        starts_at = get_class_starts_at(klass, day_date).astimezone(timezone.utc)
+        return starts_at - timedelta(seconds=before_class_secs)
+
+    def _snipe_class(self, class_id: int, klass: dict, day_date: date) -> dict:
+        """
+        Wait for the booking window to open and then book the class, retrying in
+         a tight loop while the response is "Prenotazioni non aperte.".
+
+        Monotonic clocks are used for the waits, so that they are not affected by
+         adjustments to the system clock.
+
+        When the opening of the window was learned from previous attempts, the first
+         attempt is fired at the earliest instant it can open at, and the deadline
+         is extended by the uncertainty of the estimate (at most doubled).
+
+        The window opens on the server clock: when its offset is known, the first
+         attempt is fired at the earliest local instant the server clock can read
+         `opens_at`, and the deadline is extended by the offset's uncertainty.
+
+        The connections are pre-warmed a few secs before firing, and checked (and
+         reopened if dropped) right before it, see `_prewarm_connections()`.
+        """
+        estimate = self._get_window_estimate(klass)
+        opens_at = self.get_booking_window_opens_at(klass, day_date, estimate=estimate)
+        skew = self._get_clock_skew()
+        server_now = datetime_utils.now_utc()
+        if skew:
+            server_now += timedelta(seconds=skew.offset_secs + skew.uncertainty_secs)
+        wait_secs = (opens_at - server_now).total_seconds()
+        if wait_secs > settings.SNIPER_MAX_WAIT_SECS:
+            logger.warning(
+                "Booking window opens too late to wait for it, booking now",
+                extra=dict(opens_at=opens_at.isoformat(), wait_secs=wait_secs),
+            )
+            wait_secs = 0
+        fire_at = time.monotonic() + max(wait_secs, 0)
+        deadline = fire_at + settings.SNIPER_DEADLINE_SECS
+        if estimate and estimate.width_secs:
+            deadline += min(estimate.width_secs, settings.SNIPER_DEADLINE_SECS)
+        if skew:
+            deadline += 2 * skew.uncertainty_secs
+
+        logger.info(
+            f"Sniping class {class_id} in {max(wait_secs, 0):.3f} secs",
+            extra=dict(
+                opens_at=opens_at.isoformat(), estimate=str(estimate), skew=str(skew)
+            ),
+        )
+        if settings.IS_CONNECTION_PREWARM_ENABLED:
+            _sleep_until(fire_at - settings.PREWARM_BEFORE_FIRE_SECS)
+            self._prewarm_connections()
+            _sleep_until(fire_at - settings.PREWARM_CHECK_BEFORE_FIRE_SECS)
+            self._prewarm_connections()
+        _sleep_until(fire_at)
+        n_attempts = 0
+        while True:
+            n_attempts += 1
+            data = self._send_booking(class_id, klass, day_date)
+            if data.get("messaggio") != WINDOW_NOT_OPEN_MESSAGE:
+                break
+            if time.monotonic() + settings.SNIPER_RETRY_INTERVAL_SECS > deadline:
+                logger.info("Sniper deadline reached")
+                break
+            time.sleep(settings.SNIPER_RETRY_INTERVAL_SECS)
+        logger.info(
+            f"Sniper done after {n_attempts} attempts", extra=dict(response=data)
+        )
+        return data
+
+
+def get_booking_window_opens_at(klass: dict, day_date: date) -> datetime:
+    """
+    The UTC datetime when the booking window for the given class opens.
+    Eg. the booking for a Monday 20:00 class opens the previous Saturday at 20:00
+     (Rome timezone).
+    """
+    opens_at = get_class_starts_at(klass, day_date) - timedelta(
+        seconds=settings.REBORN_BOOKING_WINDOW_OPENS_BEFORE_CLASS_SECS
+    )
+    return opens_at.astimezone(timezone.utc)
+
+
+def get_class_starts_at(klass: dict, day_date: date) -> datetime:
+    """
+    When the class starts (Rome timezone).
+    """
+    start_time = datetime.strptime(klass["orario_inizio"], "%H:%M").time()
+    return datetime.combine(
+        day_date, start_time, tzinfo=ZoneInfo(settings.REBORN_TIMEZONE)
+    )
+
+
+def _sleep_until(target: float) -> None:
+    """
+    Sleep until the given `time.monotonic()` value: a coarse sleep first and then
+     a short busy-wait, as `time.sleep()` can oversleep by a few milliseconds.
+    """
+    remaining = target - time.monotonic()
+    if remaining > 0.05:
+        time.sleep(remaining - 0.05)
+    while time.monotonic() < target:
+        pass
+
+
+class BaseBookClassDomainException(Exception):
+    pass
 
 
 class MissingIdOrarioPalinsesto(BaseBookClassDomainException):
@@ -0,0 +1,140 @@
+"""
+Book classes for many accounts (eg. many members of the gym) at once.
+
+Each account gets its own `BookClassDomain`, with its own HTTP session and its own
+ Reborn session, so accounts never share state. All accounts run in 2 phases:
+ 1. prepare: login + palinsesto fetch + class lookup, concurrently for all accounts;
+ 2. book: all the bookings of all the accounts are fired together, so that at the
+    time the booking window opens every account is served within the same second,
+    not one after another.
+
+Usage:
+    engine = BookingEngine(max_workers=8)
+    reports = engine.run([
+        Account("rossi@gmail.com", "pass1", [ClassTarget(ClassNameEnum.CALI)]),
+        Account("bianchi@gmail.com", "pass2", [ClassTarget(ClassNameEnum.POWER)]),
+    ])
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from ..clients import reborn_api_client
+from ..conf import settings
+from ..utils.log_utils import logger
+from .book_class_domain import BookClassDomain, BookingResult, ClassTarget
+from .palinsesto_model import PalinsestoClass
+
+
+@dataclass
+class Account:
+    username: str
+    password: str = field(repr=False)
+    targets: list[ClassTarget]
+    sede_id: int = 47
+
+
+@dataclass
+class AccountReport:
+    username: str
+    results: list[BookingResult] = field(default_factory=list)
+    # Set when the prepare phase failed (eg. `AuthError`).
+    exception: Exception | None = None
+    # Login + palinsesto fetch + class lookup.
+    prepare_secs: float | None = None
+    # From the start of the booking phase to the last booking response.
+    booking_secs: float | None = None
+
+    @property
+    def n_booked(self) -> int:
+        return sum(1 for r in self.results if r.is_booked)
+
+
+class BookingEngine:
+    def __init__(self, max_workers: int | None = None):
+        """
+        Args:
+            max_workers: the max number of concurrent pipelines/requests.
+        """
+        self.max_workers = max_workers or settings.BOOKING_ENGINE_MAX_WORKERS
+
+    def run(
+        self, accounts: list[Account], is_sniper: bool = False
+    ) -> list[AccountReport]:
+        """
+        Returns: a report for each account, in the same order.
+        """
+        logger.info(f"Booking engine: running {len(accounts)} accounts")
+        prepared = list()
+        try:
+            with ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="booking-engine"
+            ) as executor:
+                # Phase 1: prepare.
+                prepared = list(executor.map(self._prepare, accounts))
+
+                # Phase 2: book.
+                to_book = [
+                    (report, domain, result, klass)
+                    for report, domain, pairs in prepared
+                    for result, klass in pairs
+                ]
+                lock = threading.Lock()
+                start = time.perf_counter()
+
+                def book(args: tuple) -> None:
+                    report, domain, result, klass = args
+                    domain.book_target(result, klass, is_sniper)
+                    elapsed = time.perf_counter() - start
+                    with lock:
+                        report.booking_secs = max(report.booking_secs or 0, elapsed)
+
+                list(executor.map(book, to_book))
+        finally:
+            # The per-account sessions are not reused: close their connection
+            #  pools, so they do not pile up across warm invocations.
+            for _, domain, _ in prepared:
+                if domain is not None:
+                    domain.client.http_session.close()
+
+        reports = [report for report, _, _ in prepared]
+        for report in reports:
+            logger.info(
+                f"Booking engine: {report.username} booked"
+                f" {report.n_booked}/{len(report.results)}",
+                extra=dict(
+                    prepare_secs=report.prepare_secs,
+                    booking_secs=report.booking_secs,
+                    exc=str(report.exception) if report.exception else None,
+                ),
+            )
+        return reports
+
+    def _prepare(self, account: Account) -> tuple[
+        AccountReport,
+        BookClassDomain | None,
+        list[tuple[BookingResult, PalinsestoClass]],
+    ]:
+        report = AccountReport(account.username)
+        start = time.perf_counter()
+        # A dedicated HTTP session per account, so accounts share nothing.
+        http_session = reborn_api_client.make_http_session(
+            pool_size=max(len(account.targets), 1)
+        )
+        try:
+            domain = BookClassDomain(
+                sede_id=account.sede_id,
+                http_session=http_session,
+                username=account.username,
+                password=account.password,
+            )
+            report.results, to_book = domain.resolve_targets(account.targets)
+        except Exception as exc:
+            report.exception = exc
+            http_session.close()
+            return report, None, []
+        finally:
+            report.prepare_secs = time.perf_counter() - start
+        return report, domain, to_book
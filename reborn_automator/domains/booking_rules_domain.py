@@ -0,0 +1,203 @@
+"""
+Declarative booking rules: which classes to book, as configured in
+ `settings.BOOKING_RULES`, so that a new class to book is a new rule, not a new view
+ (and a new Lambda, with its own cold start and login).
+
+All the rules run by an invocation share the login and the palinsesto of their gym
+ (`sede_id`), they are all evaluated in a single pass over the palinsesto and all
+ their bookings are sent concurrently.
+
+Usage:
+    rules = get_rules(["cali", "power"])
+    for rule, result in BookingRulesDomain().book(rules):
+        result.is_booked
+"""
+
+import asyncio
+from dataclasses import dataclass
+from datetime import time
+
+import requests
+
+from ..conf import settings
+from ..utils import asyncio_utils
+from ..utils.log_utils import logger
+from .book_class_domain import BookClassDomain, BookingResult, ClassTarget
+from .waitlist_watcher_domain import WaitlistWatcher
+
+
+@dataclass(frozen=True)
+class BookingRule:
+    id: str
+    course_name: str
+    # 0 is Monday, like `date.weekday()`.
+    weekday: int | None = None
+    start_time: time | None = None
+    instructor: str | None = None
+    sede_id: int = 47
+
+    @classmethod
+    def from_config(cls, rule_id: str, config: dict) -> "BookingRule":
+        """
+        Args:
+            rule_id: the key in `settings.BOOKING_RULES`.
+            config: the value in `settings.BOOKING_RULES`, eg.:
+             {"course_name": "Calisthenics", "weekday": 0, "start_time": "20:00"}.
+        """
+        config = dict(config)
+        start_time = config.pop("start_time", None)
+        try:
+            rule = cls(
+                id=rule_id,
+                start_time=time.fromisoformat(start_time) if start_time else None,
+                **config,
+            )
+        except (TypeError, ValueError) as exc:
+            raise InvalidBookingRule(rule_id, str(exc)) from exc
+        if rule.weekday is not None and not 0 <= rule.weekday <= 6:
+            raise InvalidBookingRule(rule_id, f"invalid weekday {rule.weekday}")
+        return rule
+
+    def to_target(self) -> ClassTarget:
+        return ClassTarget(
+            self.course_name,
+            start_time=self.start_time,
+            weekday=self.weekday,
+            instructor=self.instructor,
+        )
+
+
+def get_rules(rule_ids: list[str]) -> list[BookingRule]:
+    """
+    The rules in `settings.BOOKING_RULES` with the given ids, in the same order.
+    """
+    rules = list()
+    for rule_id in rule_ids:
+        config = settings.BOOKING_RULES.get(rule_id)
+        if config is None:
+            raise UnknownBookingRule(rule_id)
+        rules.append(BookingRule.from_config(rule_id, config))
+    return rules
+
+
+class BookingRulesDomain:
+    def __init__(self, http_session: requests.Session | None = None):
+        """
+        Args:
+            http_session: the HTTP session to use, by default the shared one.
+        """
+        self.http_session = http_session
+
+    def book(
+        self,
+        rules: list[BookingRule],
+        is_sniper: bool = False,
+        is_watcher: bool = False,
+        max_watch_secs: float | None = None,
+    ) -> list[tuple[BookingRule, BookingResult]]:
+        """
+        Book the classes of all the rules: one login and one palinsesto fetch per
+         gym, and all the bookings sent concurrently.
+
+        Args:
+            rules: the rules to run.
+            is_sniper: True to book every class at the exact instant its booking
+             window opens, see `BookClassDomain._book_next_class()`.
+            is_watcher: True to watch full classes and book them as soon as a seat
+             frees up, see `WaitlistWatcher`. The request budget is split among
+             the gyms.
+            max_watch_secs: stop watching after this long, by default
+             `WAITLIST_MAX_DURATION_SECS`.
+
+        Returns: a (rule, result) for each rule, in the same order. A rule that could
+         not be booked has the `exception` of its result set, it is never raised.
+        """
+        return asyncio.run(
+            self.abook(
+                rules,
+                is_sniper=is_sniper,
+                is_watcher=is_watcher,
+                max_watch_secs=max_watch_secs,
+            )
+        )
+
+    async def abook(
+        self,
+        rules: list[BookingRule],
+        is_sniper: bool = False,
+        is_watcher: bool = False,
+        max_watch_secs: float | None = None,
+    ) -> list[tuple[BookingRule, BookingResult]]:
+        """
+        Asyncio version of `book()`.
+        """
+        logger.info(
+            f"Running {len(rules)} booking rules",
+            extra=dict(rule_ids=[rule.id for rule in rules]),
+        )
+        rules_by_sede: dict[int, list[BookingRule]] = dict()
+        for rule in rules:
+            rules_by_sede.setdefault(rule.sede_id, list()).append(rule)
+
+        if is_watcher:
+            max_requests = max(settings.WAITLIST_MAX_REQUESTS // len(rules_by_sede), 2)
+            coros = (
+                self._awatch_sede(sede_id, sede_rules, max_requests, max_watch_secs)
+                for sede_id, sede_rules in rules_by_sede.items()
+            )
+        else:
+            coros = (
+                self._abook_sede(sede_id, sede_rules, is_sniper)
+                for sede_id, sede_rules in rules_by_sede.items()
+            )
+        results_by_sede = await asyncio.gather(*coros)
+        result_by_rule = {
+            rule.id: result
+            for sede_rules, results in zip(rules_by_sede.values(), results_by_sede)
+            for rule, result in zip(sede_rules, results)
+        }
+        return [(rule, result_by_rule[rule.id]) for rule in rules]
+
+    async def _abook_sede(
+        self, sede_id: int, rules: list[BookingRule], is_sniper: bool
+    ) -> list[BookingResult]:
+        targets = [rule.to_target() for rule in rules]
+        domain = BookClassDomain(sede_id=sede_id, http_session=self.http_session)
+        try:
+            return await domain.abook_classes(targets, is_sniper=is_sniper)
+        except Exception as exc:
+            # Eg. `AuthError` at login: all the rules of this gym failed.
+            return [BookingResult(target, exception=exc) for target in targets]
+
+    async def _awatch_sede(
+        self,
+        sede_id: int,
+        rules: list[BookingRule],
+        max_requests: int,
+        max_duration_secs: float | None,
+    ) -> list[BookingResult]:
+        targets = [rule.to_target() for rule in rules]
+        domain = BookClassDomain(sede_id=sede_id, http_session=self.http_session)
+        watcher = WaitlistWatcher(
+            domain, max_requests=max_requests, max_duration_secs=max_duration_secs
+        )
+        try:
+            # The watcher sleeps between polls, so it runs in a thread.
+            return await asyncio_utils.run_in_thread(watcher.watch, targets)
+        except Exception as exc:
+            return [BookingResult(target, exception=exc) for target in targets]
+
+
+class BaseBookingRulesDomainException(Exception):
+    pass
+
+
+class UnknownBookingRule(BaseBookingRulesDomainException):
+    def __init__(self, rule_id: str):
+        self.rule_id = rule_id
+
+
+class InvalidBookingRule(BaseBookingRulesDomainException):
+    def __init__(self, rule_id: str, reason: str):
+        self.rule_id = rule_id
+        self.reason = reason
@@ -0,0 +1,137 @@
+"""
+A cache for the palinsesto responses, in front of `RebornApiClient.get_palinsesto()`.
+
+The palinsesto changes rarely within an hour, so in a warm Lambda execution
+ environment it is fetched once and then served from the cache: the raw response
+ is stored in a `TmpCache` (in-process + /tmp) and the parsed `Palinsesto` is kept
+ in memory, indexed by the hash of the response content, so that it is parsed only
+ once per distinct content.
+
+Entries are keyed by user, sede and day: the response includes the user's
+ bookings (`prenotazioni.utente_prenotato`) and it lists the days from today on,
+ so a new day means a new key. Bookings change the response, so the entry must be
+ invalidated after a successful booking with `invalidate()`.
+
+The cache is shared by the threads of the booking engine, so it is thread-safe.
+
+Note: the palinsesto endpoint does not send any ETag or Last-Modified header, so
+ change detection is done by hashing the content.
+
+Usage:
+    cache = PalinsestoCache(ttl_secs=60 * 60)
+    data = cache.get(username, sede_id)
+    if data is None:
+        data = client.get_palinsesto(sede_id)
+        cache.set(username, sede_id, data)
+    palinsesto = cache.get_palinsesto(username, sede_id)
+"""
+
+import hashlib
+import json
+import threading
+from datetime import date
+
+from ..conf import settings
+from ..utils import datetime_utils
+from ..utils.log_utils import logger
+from ..utils.tmp_cache_utils import TmpCache
+from .palinsesto_model import Palinsesto
+
+
+class PalinsestoCache:
+    def __init__(self, ttl_secs: float | None = None, max_parsed: int | None = None):
+        """
+        Args:
+            ttl_secs: responses older than this are fetched again.
+            max_parsed: the max number of parsed palinsesti kept in memory.
+        """
+        if ttl_secs is None:
+            ttl_secs = settings.PALINSESTO_CACHE_TTL_SECS
+        self.ttl_secs = ttl_secs
+        self.max_parsed = max_parsed or settings.PALINSESTO_CACHE_MAX_PARSED
+        # Key -> {"content_hash": ..., "data": ...}.
+        self._cache = TmpCache("reborn-palinsesti", ttl_secs=self.ttl_secs)
+        # Content hash -> parsed palinsesto, in insertion order.
+        self._parsed: dict[str, Palinsesto] = dict()
+        self._lock = threading.Lock()
+
+    def get(self, username: str, sede_id: int) -> dict | None:
+        item = self._get_item(username, sede_id)
+        return item["data"] if item else None
+
+    def get_content_hash(self, username: str, sede_id: int) -> str | None:
+        item = self._get_item(username, sede_id)
+        return item["content_hash"] if item else None
+
+    def set(self, username: str, sede_id: int, data: dict) -> str:
+        """
+        Returns: the content hash, to pass to `parse()` so that the content is
+         hashed only once.
+        """
+        content_hash = compute_content_hash(data)
+        key = self._get_key(username, sede_id)
+        with self._lock:
+            prev = self._cache.get(key)
+            self._cache.set(key, dict(content_hash=content_hash, data=data))
+        if prev and prev["content_hash"] == content_hash:
+            logger.debug("Palinsesto unchanged")
+        return content_hash
+
+    def get_palinsesto(self, username: str, sede_id: int) -> Palinsesto | None:
+        """
+        The parsed palinsesto for the cached response, parsed only once per content.
+        """
+        item = self._get_item(username, sede_id)
+        if not item:
+            return None
+        return self.parse(item["data"], item["content_hash"])
+
+    def parse(self, data: dict, content_hash: str | None = None) -> Palinsesto:
+        """
+        Parse the given palinsesto response, reusing the parsed palinsesto if the
+         same content was already parsed.
+        """
+        if not settings.IS_TMP_CACHE_ENABLED:
+            return Palinsesto.from_response(data)
+
+        content_hash = content_hash or compute_content_hash(data)
+        with self._lock:
+            palinsesto = self._parsed.get(content_hash)
+        if palinsesto is not None:
+            return palinsesto
+
+        # Parsed out of the lock: 2 threads may parse the same content, the first
+        #  one stored is kept.
+        palinsesto = Palinsesto.from_response(data)
+        with self._lock:
+            palinsesto = self._parsed.setdefault(content_hash, palinsesto)
+            while len(self._parsed) > self.max_parsed:
+                # Evict the oldest.
+                self._parsed.pop(next(iter(self._parsed)), None)
+        return palinsesto
+
+    def invalidate(self, username: str, sede_id: int) -> None:
+        """
+        To be called after a successful booking, as the bookings are in the response.
+        """
+        logger.debug("Invalidating the cached palinsesto")
+        with self._lock:
+            self._cache.delete(self._get_key(username, sede_id))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._parsed.clear()
+
+    def _get_item(self, username: str, sede_id: int) -> dict | None:
+        with self._lock:
+            return self._cache.get(self._get_key(username, sede_id))
+
+    def _get_key(self, username: str, sede_id: int, day: date | None = None) -> str:
+        day = day or datetime_utils.now().date()
+        return f"{username}:{sede_id}:{day.isoformat()}"
+
+
+def compute_content_hash(data: dict) -> str:
+    content = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(content.encode()).hexdigest()
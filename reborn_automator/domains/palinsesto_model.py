@@ -0,0 +1,232 @@
+"""
+A compact, indexed model of the palinsesto (the weekly schedule of classes).
+
+The palinsesto response is parsed once into `PalinsestoClass` objects (with
+ `__slots__`, so they are small) and indexed by (course name, day), by (day, start
+ time) and by instructor, so that lookups do not need to traverse the nested dicts
+ of the response over and over.
+
+Usage:
+    palinsesto = Palinsesto.from_response(client.get_palinsesto())
+    klass = palinsesto.get_next_class("Calisthenics", after=date(2024, 10, 25))
+    klass.id, klass.day_date, klass.start_time
+"""
+
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, time
+from typing import Iterable, Iterator
+
+# The only palinsesto with the classes we are interested in (the others are eg.
+#  "Open Gym").
+DEFAULT_PALINSESTO_NAME = "Lezioni Collettive"
+
+
+class PalinsestoClass:
+    """
+    A class in the palinsesto: an item in `orari_giorno`.
+    """
+
+    __slots__ = (
+        "id",
+        "course_name",
+        "day_date",
+        "start_time",
+        "end_time",
+        "instructor",
+        "data",
+    )
+
+    def __init__(
+        self,
+        id: str | None,
+        course_name: str | None,
+        day_date: date,
+        start_time: time | None,
+        end_time: time | None,
+        instructor: str | None,
+        data: dict,
+    ):
+        self.id = id
+        self.course_name = course_name
+        self.day_date = day_date
+        self.start_time = start_time
+        self.end_time = end_time
+        self.instructor = instructor
+        # The original item in `orari_giorno`.
+        self.data = data
+
+    @classmethod
+    def from_data(cls, data: dict, day_date: date) -> "PalinsestoClass":
+        return cls(
+            id=data.get("id_orario_palinsesto"),
+            course_name=data.get("nome_corso"),
+            day_date=day_date,
+            start_time=_parse_time(data.get("orario_inizio")),
+            end_time=_parse_time(data.get("orario_fine")),
+            instructor=data.get("nome_staff") or None,
+            data=data,
+        )
+
+    @property
+    def n_free_seats(self) -> int | None:
+        return _parse_int(self._get_prenotazioni().get("numero_posti_disponibili"))
+
+    @property
+    def n_booked(self) -> int | None:
+        return _parse_int(self._get_prenotazioni().get("numero_posti_occupati"))
+
+    @property
+    def is_course_bookable(self) -> bool:
+        # "2" is the API's true.
+        return self.data.get("prenotabile_corso") == "2"
+
+    @property
+    def n_queued(self) -> int | None:
+        # The users in the waiting list.
+        return _parse_int(self._get_prenotazioni().get("numero_utenti_coda"))
+
+    @property
+    def is_queue_open(self) -> bool:
+        # "2" is the API's true.
+        return self._get_prenotazioni().get("prenota_coda") == "2"
+
+    @property
+    def is_user_booked(self) -> bool:
+        # The user id when booked, else "0".
+        return self._get_prenotazioni().get("utente_prenotato", "0") not in ("0", "")
+
+    def _get_prenotazioni(self) -> dict:
+        return self.data.get("prenotazioni") or {}
+
+    def __repr__(self):
+        return (
+            f"<PalinsestoClass {self.id} {self.course_name}"
+            f" {self.day_date} {self.start_time}>"
+        )
+
+
+class Palinsesto:
+    __slots__ = (
+        "classes",
+        "_by_course_and_day",
+        "_by_day_and_start_time",
+        "_by_instructor",
+        "_days_by_course",
+    )
+
+    def __init__(self, classes: Iterable[PalinsestoClass] = ()):
+        self.classes: list[PalinsestoClass] = list()
+        self._by_course_and_day: dict[tuple[str, date], list[PalinsestoClass]] = (
+            defaultdict(list)
+        )
+        self._by_day_and_start_time: dict[tuple[date, time], list[PalinsestoClass]] = (
+            defaultdict(list)
+        )
+        self._by_instructor: dict[str, list[PalinsestoClass]] = defaultdict(list)
+        # Course name -> sorted list of the days with that course.
+        self._days_by_course: dict[str, list[date]] = defaultdict(list)
+        for klass in classes:
+            self.add(klass)
+
+    @classmethod
+    def from_response(
+        cls, data: dict, palinsesto_name: str = DEFAULT_PALINSESTO_NAME
+    ) -> "Palinsesto":
+        """
+        Parse the response of `RebornApiClient.get_palinsesto()`.
+        """
+        return cls(iter_classes(data, palinsesto_name))
+
+    def add(self, klass: PalinsestoClass) -> None:
+        self.classes.append(klass)
+        self._by_course_and_day[(klass.course_name, klass.day_date)].append(klass)
+        self._by_day_and_start_time[(klass.day_date, klass.start_time)].append(klass)
+        if klass.instructor:
+            self._by_instructor[klass.instructor].append(klass)
+
+        days = self._days_by_course[klass.course_name]
+        # Days are usually already sorted in the response, so this is an append.
+        if not days or days[-1] < klass.day_date:
+            days.append(klass.day_date)
+        elif klass.day_date not in days:
+            days.insert(bisect_right(days, klass.day_date), klass.day_date)
+
+    def get_classes(self, course_name: str, day_date: date) -> list[PalinsestoClass]:
+        return self._by_course_and_day.get((course_name, day_date), [])
+
+    def get_classes_at(self, day_date: date, start_time: time) -> list[PalinsestoClass]:
+        return self._by_day_and_start_time.get((day_date, start_time), [])
+
+    def get_classes_by_instructor(self, instructor: str) -> list[PalinsestoClass]:
+        return self._by_instructor.get(instructor, [])
+
+    def get_next_class(self, course_name: str, after: date) -> PalinsestoClass | None:
+        """
+        The first class of the given course in the first day strictly after `after`.
+        """
+        days = self._days_by_course.get(course_name)
+        if not days:
+            return None
+        i = bisect_right(days, after)
+        if i == len(days):
+            return None
+        return self._by_course_and_day[(course_name, days[i])][0]
+
+    def iter_next_classes(
+        self, course_name: str, after: date
+    ) -> Iterator[PalinsestoClass]:
+        """
+        All the classes of the given course in the days strictly after `after`,
+         sorted by day.
+        """
+        days = self._days_by_course.get(course_name, [])
+        for day_date in days[bisect_right(days, after) :]:
+            yield from self._by_course_and_day[(course_name, day_date)]
+
+    def __len__(self):
+        return len(self.classes)
+
+
+def iter_classes(
+    data: dict, palinsesto_name: str = DEFAULT_PALINSESTO_NAME
+) -> Iterator[PalinsestoClass]:
+    for risultato in data.get("parametri", {}).get("lista_risultati", []):
+        risultato: dict
+        if risultato.get("nome_palinsesto") != palinsesto_name:
+            continue
+        for giorno in risultato.get("giorni", []):
+            yield from iter_day_classes(giorno)
+
+
+def iter_day_classes(giorno: dict) -> Iterator[PalinsestoClass]:
+    day_str: str | None = giorno.get("giorno")  # Eg. "2024-10-25".
+    if not day_str:
+        raise MissingDay(giorno)
+    day_date = date.fromisoformat(day_str)
+    for klass in giorno.get("orari_giorno") or []:
+        yield PalinsestoClass.from_data(klass, day_date)
+
+
+def _parse_int(value: str | None) -> int | None:
+    # Eg. "16".
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_time(value: str | None) -> time | None:
+    # Eg. "20:00".
+    if not value:
+        return None
+    return time.fromisoformat(value)
+
+
+class BasePalinsestoModelException(Exception):
+    pass
+
+
+class MissingDay(BasePalinsestoModelException):
+    def __init__(self, data: dict):
+        self.data = data
@@ -0,0 +1,599 @@
+"""
+A local history of the palinsesto: every fetched palinsesto is recorded as a
+ snapshot of the occupancy and bookability of each class, in a small SQLite file
+ in /tmp, so that we can learn eg. how fast a class fills up after its booking
+ window opens, and time the bookings accordingly.
+
+Every booking attempt is recorded too, with the time it was sent and the time its
+ response was received, so that the time the booking window opens can be learned
+ for each course (see `get_window_estimate()`).
+
+The store is append-only (plus a retention prune) and compact: one row per class
+ per fetch, made of integers only (dates as ordinals, times as minutes, course
+ names in a lookup table), with indexes on the fetch time and on (course, day).
+
+Like the other caches in /tmp, it survives across warm invocations but not cold
+ starts, and it is an optimization: a failure to record is logged, never raised.
+ Records are written in the background with `submit()`, so that no booking ever
+ waits for SQLite, and waited for with `flush()` at the end of the handler.
+
+Usage:
+    store = PalinsestoSnapshotStore()
+    store.record(47, palinsesto)
+    # Or in the background.
+    store.submit(store.record, 47, palinsesto)
+    store.flush(timeout_secs=1)
+    # When did Calisthenics on Monday fill up last month?
+    store.get_fill_ups("Calisthenics", since=date(2024, 9, 1),
+                       until=date(2024, 9, 30), weekday=0)
+    # When does the booking window of Calisthenics open?
+    store.get_window_estimate("Calisthenics")
+"""
+
+import sqlite3
+import threading
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable
+
+from ..clients.reborn_api_client import WINDOW_NOT_OPEN_MESSAGE
+from ..conf import settings
+from ..utils import datetime_utils
+from ..utils.log_utils import logger
+from .palinsesto_model import Palinsesto
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    -- Unix timestamp of the fetch.
+    fetched_at INTEGER NOT NULL,
+    sede_id INTEGER NOT NULL,
+    class_id INTEGER NOT NULL,
+    course_id INTEGER NOT NULL REFERENCES courses(id),
+    -- `date.toordinal()` and `date.weekday()` of the class day.
+    day INTEGER NOT NULL,
+    weekday INTEGER NOT NULL,
+    -- Minutes since midnight.
+    start_minute INTEGER,
+    n_booked INTEGER,
+    n_free_seats INTEGER,
+    n_queued INTEGER,
+    -- Bit 0: the course is bookable, bit 1: the user is booked.
+    flags INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_fetched_at ON snapshots (fetched_at);
+CREATE INDEX IF NOT EXISTS snapshots_course_day ON snapshots (course_id, day);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS booking_attempts (
+    -- Unix timestamps in ms of the request and of its response.
+    sent_at_ms INTEGER NOT NULL,
+    received_at_ms INTEGER NOT NULL,
+    sede_id INTEGER NOT NULL,
+    class_id INTEGER NOT NULL,
+    course_id INTEGER NOT NULL REFERENCES courses(id),
+    day INTEGER NOT NULL,
+    -- Unix timestamp of the class start.
+    starts_at INTEGER NOT NULL,
+    status INTEGER,
+    -- See the `*_OUTCOME` constants.
+    outcome INTEGER NOT NULL,
+    message_id INTEGER REFERENCES messages(id)
+);
+CREATE INDEX IF NOT EXISTS booking_attempts_course_sent_at
+    ON booking_attempts (course_id, sent_at_ms);
+"""
+
+IS_BOOKABLE_FLAG = 1
+IS_USER_BOOKED_FLAG = 2
+
+# The outcome of a booking attempt, as far as the booking window is concerned.
+OTHER_OUTCOME = 0
+WINDOW_NOT_OPEN_OUTCOME = 1
+# The booking succeeded, so the window was open.
+BOOKED_OUTCOME = 2
+
+
+@dataclass
+class Snapshot:
+    fetched_at: datetime
+    n_booked: int | None
+    n_free_seats: int | None
+    n_queued: int | None
+    is_course_bookable: bool
+    is_user_booked: bool
+
+
+@dataclass
+class FillUp:
+    """
+    When a class filled up: sometime between `last_free_at` (the last snapshot with
+     free seats) and `filled_up_at` (the first snapshot with no free seats).
+    """
+
+    class_id: str
+    day_date: date
+    start_time: time | None
+    # None if it never filled up in the snapshots.
+    filled_up_at: datetime | None
+    last_free_at: datetime | None
+
+    @property
+    def filled_up_after_window_secs(self) -> float | None:
+        """
+        Secs from the booking window opening to the fill up.
+        """
+        if self.filled_up_at is None or self.start_time is None:
+            return None
+        # Imported here to avoid a circular import.
+        from .book_class_domain import get_booking_window_opens_at
+
+        opens_at = get_booking_window_opens_at(
+            {"orario_inizio": self.start_time.strftime("%H:%M")}, self.day_date
+        )
+        return (self.filled_up_at - opens_at).total_seconds()
+
+
+@dataclass
+class WindowEstimate:
+    """
+    When the booking window of a course opens, learned from the booking attempts:
+     it opens between `min_before_class_secs` and `max_before_class_secs` before
+     the class starts.
+
+    A "Prenotazioni non aperte." response means that when the server handled the
+     request (after it was sent) the window was not open yet: the window opens less
+     than (class start - sent time) before the class. A successful booking means
+     that the window was open when it was handled (before the response was
+     received): it opens at least (class start - received time) before the class.
+     The bounds are the intersection of all these intervals.
+    """
+
+    course_name: str
+    # None if unbounded (no booked or no "not open" attempt).
+    min_before_class_secs: float | None
+    max_before_class_secs: float | None
+    n_booked: int
+    n_not_open: int
+
+    @property
+    def is_consistent(self) -> bool:
+        """
+        False if the observations contradict each other (eg. the rules changed).
+        """
+        if self.min_before_class_secs is None or self.max_before_class_secs is None:
+            return True
+        return self.min_before_class_secs <= self.max_before_class_secs
+
+    @property
+    def width_secs(self) -> float | None:
+        if self.min_before_class_secs is None or self.max_before_class_secs is None:
+            return None
+        return self.max_before_class_secs - self.min_before_class_secs
+
+    def get_fire_before_class_secs(self, default: float) -> float:
+        """
+        When to fire the booking, in secs before the class starts: the earliest
+         instant the window can open at, if bounded; else the default, moved within
+         the known bound.
+        """
+        if self.max_before_class_secs is not None:
+            if self.min_before_class_secs is not None:
+                return self.max_before_class_secs
+            return min(default, self.max_before_class_secs)
+        if self.min_before_class_secs is not None:
+            return max(default, self.min_before_class_secs)
+        return default
+
+
+@lru_cache
+def get_background_executor() -> ThreadPoolExecutor:
+    """
+    The thread the records are written in. A single one: the writes are serialized
+     by the store anyway, and they keep their order.
+    """
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshots")
+
+
+class PalinsestoSnapshotStore:
+    def __init__(self, path: str | Path | None = None):
+        """
+        Args:
+            path: the SQLite file, by default in `settings.TMP_CACHE_DIR`.
+        """
+        self.path = path
+        self._connection: sqlite3.Connection | None = None
+        self._connection_path: Path | None = None
+        # The connection is shared by the domains running in threads.
+        self._lock = threading.Lock()
+        # The records submitted and not written yet.
+        self._pending: set[futures.Future] = set()
+        self._pending_lock = threading.Lock()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> None:
+        """
+        Call a recording method (eg. `self.record`) in the background, see
+         `get_background_executor()`.
+        """
+        future = get_background_executor().submit(fn, *args, **kwargs)
+        with self._pending_lock:
+            self._pending.add(future)
+        future.add_done_callback(self._on_done)
+
+    def flush(self, timeout_secs: float | None = None) -> bool:
+        """
+        Wait at most `timeout_secs` for the submitted records. Failures are logged,
+         never raised.
+
+        Returns: True if none is still running.
+        """
+        with self._pending_lock:
+            pending = set(self._pending)
+        _, not_done = futures.wait(pending, timeout=timeout_secs)
+        if not_done:
+            logger.warning(
+                "Snapshot store records still running after the wait",
+                extra=dict(n_pending=len(not_done), timeout_secs=timeout_secs),
+            )
+        return not not_done
+
+    def _on_done(self, future: futures.Future) -> None:
+        with self._pending_lock:
+            self._pending.discard(future)
+        exc = future.exception()
+        if exc is not None:
+            logger.warning(
+                "Could not record in the snapshot store",
+                extra=dict(exc=f"{exc.__class__.__name__}: {exc}"),
+            )
+
+    def record(
+        self, sede_id: int, palinsesto: Palinsesto, fetched_at: datetime | None = None
+    ) -> int:
+        """
+        Record a snapshot of every class in the palinsesto.
+
+        Returns: the number of rows recorded.
+        """
+        ts = int((fetched_at or datetime_utils.now_utc()).timestamp())
+        try:
+            with self._lock:
+                connection = self._connect()
+                course_ids = self._get_course_ids(
+                    connection, {k.course_name for k in palinsesto.classes}
+                )
+                rows = [
+                    (
+                        ts,
+                        sede_id,
+                        int(klass.id),
+                        course_ids[klass.course_name],
+                        klass.day_date.toordinal(),
+                        klass.day_date.weekday(),
+                        _to_minute(klass.start_time),
+                        klass.n_booked,
+                        klass.n_free_seats,
+                        klass.n_queued,
+                        (IS_BOOKABLE_FLAG if klass.is_course_bookable else 0)
+                        | (IS_USER_BOOKED_FLAG if klass.is_user_booked else 0),
+                    )
+                    for klass in palinsesto.classes
+                    if klass.id and klass.course_name
+                ]
+                with connection:
+                    connection.executemany(
+                        "INSERT INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+        except (sqlite3.Error, OSError, ValueError) as exc:
+            logger.warning(
+                "Could not record palinsesto snapshot", extra=dict(exc=str(exc))
+            )
+            return 0
+        return len(rows)
+
+    def record_booking_attempt(
+        self,
+        sede_id: int,
+        class_id: str,
+        course_name: str,
+        day_date: date,
+        starts_at: datetime,
+        sent_at: datetime,
+        received_at: datetime,
+        response: dict,
+    ) -> None:
+        """
+        Record a booking request and its response.
+        """
+        message = response.get("messaggio") or None
+        if response.get("status") == 2:
+            outcome = BOOKED_OUTCOME
+        elif message == WINDOW_NOT_OPEN_MESSAGE:
+            outcome = WINDOW_NOT_OPEN_OUTCOME
+        else:
+            outcome = OTHER_OUTCOME
+        try:
+            with self._lock:
+                connection = self._connect()
+                course_ids = self._get_course_ids(connection, {course_name})
+                message_id = None
+                with connection:
+                    if message:
+                        connection.execute(
+                            "INSERT OR IGNORE INTO messages (text) VALUES (?)",
+                            (message,),
+                        )
+                        (message_id,) = connection.execute(
+                            "SELECT id FROM messages WHERE text = ?", (message,)
+                        ).fetchone()
+                    connection.execute(
+                        "INSERT INTO booking_attempts"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            _to_ms(sent_at),
+                            _to_ms(received_at),
+                            sede_id,
+                            int(class_id),
+                            course_ids[course_name],
+                            day_date.toordinal(),
+                            int(starts_at.timestamp()),
+                            _parse_status(response.get("status")),
+                            outcome,
+                            message_id,
+                        ),
+                    )
+        except (sqlite3.Error, OSError, ValueError, KeyError) as exc:
+            logger.warning("Could not record booking attempt", extra=dict(exc=str(exc)))
+
+    def get_window_estimate(
+        self, course_name: str, sede_id: int = 47, since: datetime | None = None
+    ) -> WindowEstimate | None:
+        """
+        When the booking window of the course opens, learned from the booking
+         attempts sent after `since`.
+
+        Returns: None if there are no useful attempts (or the store is not readable).
+        """
+        since_ms = _to_ms(since) if since else 0
+        try:
+            with self._lock:
+                row = (
+                    self._connect()
+                    .execute(
+                        """
+                        SELECT
+                            MAX(CASE WHEN a.outcome = ?
+                                THEN a.starts_at * 1000 - a.received_at_ms END),
+                            MIN(CASE WHEN a.outcome = ?
+                                THEN a.starts_at * 1000 - a.sent_at_ms END),
+                            SUM(a.outcome = ?),
+                            SUM(a.outcome = ?)
+                        FROM booking_attempts a JOIN courses c ON c.id = a.course_id
+                        WHERE c.name = ? AND a.sede_id = ? AND a.sent_at_ms >= ?
+                        """,
+                        (
+                            BOOKED_OUTCOME,
+                            WINDOW_NOT_OPEN_OUTCOME,
+                            BOOKED_OUTCOME,
+                            WINDOW_NOT_OPEN_OUTCOME,
+                            course_name,
+                            sede_id,
+                            since_ms,
+                        ),
+                    )
+                    .fetchone()
+                )
+        except (sqlite3.Error, OSError) as exc:
+            logger.warning("Could not read booking attempts", extra=dict(exc=str(exc)))
+            return None
+
+        min_ms, max_ms, n_booked, n_not_open = row
+        if not n_booked and not n_not_open:
+            return None
+        return WindowEstimate(
+            course_name=course_name,
+            min_before_class_secs=min_ms / 1000 if min_ms is not None else None,
+            max_before_class_secs=max_ms / 1000 if max_ms is not None else None,
+            n_booked=n_booked,
+            n_not_open=n_not_open,
+        )
+
+    def get_fill_ups(
+        self,
+        course_name: str,
+        since: date,
+        until: date,
+        weekday: int | None = None,
+        start_time: time | None = None,
+        sede_id: int = 47,
+    ) -> list[FillUp]:
+        """
+        When each class of the course held between `since` and `until` (included)
+         filled up, sorted by day and start time.
+
+        Args:
+            weekday: only the classes on this weekday (0 is Monday).
+            start_time: only the classes starting at this time.
+        """
+        filters = ""
+        params = [since.toordinal(), until.toordinal()]
+        if weekday is not None:
+            filters += " AND s.weekday = ?"
+            params.append(weekday)
+        if start_time is not None:
+            filters += " AND s.start_minute = ?"
+            params.append(_to_minute(start_time))
+        query = f"""
+            WITH course_snapshots AS (
+                SELECT s.* FROM snapshots s JOIN courses c ON c.id = s.course_id
+                WHERE c.name = ? AND s.sede_id = ? AND s.day BETWEEN ? AND ?{filters}
+            ),
+            filled AS (
+                SELECT class_id, day, MIN(fetched_at) AS filled_up_at
+                FROM course_snapshots WHERE n_free_seats = 0 GROUP BY class_id, day
+            )
+            SELECT s.class_id, s.day, s.start_minute, f.filled_up_at,
+                MAX(CASE WHEN s.n_free_seats > 0 AND (
+                    f.filled_up_at IS NULL OR s.fetched_at < f.filled_up_at
+                ) THEN s.fetched_at END)
+            FROM course_snapshots s LEFT JOIN filled f USING (class_id, day)
+            GROUP BY s.class_id, s.day
+            ORDER BY s.day, s.start_minute
+        """
+        with self._lock:
+            rows = (
+                self._connect()
+                .execute(query, [course_name, sede_id, *params])
+                .fetchall()
+            )
+        return [
+            FillUp(
+                class_id=str(class_id),
+                day_date=date.fromordinal(day),
+                start_time=_from_minute(start_minute),
+                filled_up_at=_from_ts(filled_up_at),
+                last_free_at=_from_ts(last_free_at),
+            )
+            for class_id, day, start_minute, filled_up_at, last_free_at in rows
+        ]
+
+    def get_class_history(
+        self, class_id: str, day_date: date, sede_id: int = 47
+    ) -> list[Snapshot]:
+        """
+        All the snapshots of a class, sorted by fetch time.
+        """
+        with self._lock:
+            rows = (
+                self._connect()
+                .execute(
+                    "SELECT fetched_at, n_booked, n_free_seats, n_queued, flags"
+                    " FROM snapshots WHERE sede_id = ? AND class_id = ? AND day = ?"
+                    " ORDER BY fetched_at",
+                    (sede_id, int(class_id), day_date.toordinal()),
+                )
+                .fetchall()
+            )
+        return [
+            Snapshot(
+                fetched_at=_from_ts(fetched_at),
+                n_booked=n_booked,
+                n_free_seats=n_free_seats,
+                n_queued=n_queued,
+                is_course_bookable=bool(flags & IS_BOOKABLE_FLAG),
+                is_user_booked=bool(flags & IS_USER_BOOKED_FLAG),
+            )
+            for fetched_at, n_booked, n_free_seats, n_queued, flags in rows
+        ]
+
+    def prune(self, before: datetime) -> int:
+        """
+        Delete the snapshots fetched before the given time.
+
+        Returns: the number of rows deleted.
+        """
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                cursor = connection.execute(
+                    "DELETE FROM snapshots WHERE fetched_at < ?",
+                    (int(before.timestamp()),),
+                )
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _get_path(self) -> Path:
+        if self.path:
+            return Path(self.path)
+        return Path(settings.TMP_CACHE_DIR) / "palinsesto-snapshots.sqlite3"
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        The connection, opened on first use (and again if the path changed, eg. in
+         tests). The retention is applied when opening.
+        """
+        path = self._get_path()
+        if self._connection is not None and self._connection_path == path:
+            return self._connection
+        if self._connection is not None:
+            self._connection.close()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.executescript(SCHEMA)
+        retention_ts = (
+            datetime_utils.now_utc()
+            - timedelta(days=settings.SNAPSHOT_STORE_RETENTION_DAYS)
+        ).timestamp()
+        with connection:
+            connection.execute(
+                "DELETE FROM snapshots WHERE fetched_at < ?", (int(retention_ts),)
+            )
+            connection.execute(
+                "DELETE FROM booking_attempts WHERE sent_at_ms < ?",
+                (int(retention_ts * 1000),),
+            )
+        self._connection = connection
+        self._connection_path = path
+        return connection
+
+    def _get_course_ids(
+        self, connection: sqlite3.Connection, names: set[str | None]
+    ) -> dict[str, int]:
+        names = {name for name in names if name}
+        with connection:
+            connection.executemany(
+                "INSERT OR IGNORE INTO courses (name) VALUES (?)",
+                [(name,) for name in names],
+            )
+        return dict(
+            (name, course_id)
+            for course_id, name in connection.execute("SELECT id, name FROM courses")
+            if name in names
+        )
+
+
+def _to_minute(value: time | None) -> int | None:
+    if value is None:
+        return None
+    return value.hour * 60 + value.minute
+
+
+def _from_minute(value: int | None) -> time | None:
+    if value is None:
+        return None
+    return time(value // 60, value % 60)
+
+
+def _to_ms(value: datetime) -> int:
+    return int(value.timestamp() * 1000)
+
+
+def _parse_status(value) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _from_ts(value: int | None) -> datetime | None:
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value, tz=timezone.utc)
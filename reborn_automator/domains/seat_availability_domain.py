@@ -0,0 +1,175 @@
+"""
+Seat availability of every upcoming class in the palinsesto: occupancy, free seats,
+ waiting list and whether it can be booked now.
+
+It is computed with a single pass over a single palinsesto response, and cached for
+ `settings.SEAT_AVAILABILITY_CACHE_TTL_SECS`, so that dashboards can poll it cheaply
+ from warm invocations.
+
+Usage:
+    domain = SeatAvailabilityDomain()
+    for item in domain.get_availability():
+        item["course_name"], item["n_free_seats"], item["occupancy_ratio"]
+"""
+
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, time
+
+import requests
+
+from ..conf import settings
+from ..utils import datetime_utils
+from ..utils.log_utils import logger
+from ..utils.tmp_cache_utils import TmpCache
+from .book_class_domain import (
+    BookClassDomain,
+    get_booking_window_opens_at,
+    get_class_starts_at,
+)
+from .palinsesto_model import Palinsesto, PalinsestoClass
+
+# `username:sede_id` -> {"computed_at": ..., "classes": [...]}.
+availability_cache = TmpCache(
+    "reborn-availability", ttl_secs=settings.SEAT_AVAILABILITY_CACHE_TTL_SECS
+)
+
+
+@dataclass
+class ClassAvailability:
+    class_id: str | None
+    course_name: str | None
+    day_date: date
+    start_time: time | None
+    end_time: time | None
+    instructor: str | None
+    n_seats: int | None
+    n_booked: int | None
+    n_free_seats: int | None
+    n_queued: int | None
+    # Booked seats / seats, None if unknown.
+    occupancy_ratio: float | None
+    booking_window_opens_at: datetime | None
+    # The booking window is open, there are free seats and the user is not
+    #  already booked.
+    is_bookable: bool
+    is_user_booked: bool
+
+    @classmethod
+    def from_class(
+        cls, klass: PalinsestoClass, opens_at: datetime | None, now: datetime
+    ) -> "ClassAvailability":
+        n_booked = klass.n_booked
+        n_free_seats = klass.n_free_seats
+        n_seats = None
+        occupancy_ratio = None
+        if n_booked is not None and n_free_seats is not None:
+            n_seats = n_booked + n_free_seats
+            occupancy_ratio = round(n_booked / n_seats, 4) if n_seats else None
+        return cls(
+            class_id=klass.id,
+            course_name=klass.course_name,
+            day_date=klass.day_date,
+            start_time=klass.start_time,
+            end_time=klass.end_time,
+            instructor=klass.instructor,
+            n_seats=n_seats,
+            n_booked=n_booked,
+            n_free_seats=n_free_seats,
+            n_queued=klass.n_queued,
+            occupancy_ratio=occupancy_ratio,
+            booking_window_opens_at=opens_at,
+            is_bookable=bool(
+                klass.is_course_bookable
+                and n_free_seats
+                and not klass.is_user_booked
+                and (opens_at is None or opens_at <= now)
+            ),
+            is_user_booked=klass.is_user_booked,
+        )
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        for key in ("day_date", "start_time", "end_time", "booking_window_opens_at"):
+            if data[key] is not None:
+                data[key] = data[key].isoformat()
+        return data
+
+
+def scan_availability(
+    palinsesto: Palinsesto, after: date, now: datetime | None = None
+) -> list[ClassAvailability]:
+    """
+    The availability of all the classes in the days from `after` (included) that
+     have not started yet at `now`, in a single pass over the palinsesto, sorted by
+     day and start time.
+    """
+    now = now or datetime_utils.now_utc()
+    items = list()
+    for klass in palinsesto.classes:
+        if klass.day_date < after:
+            continue
+        opens_at = None
+        if klass.start_time is not None:
+            if get_class_starts_at(klass.data, klass.day_date) <= now:
+                continue
+            opens_at = get_booking_window_opens_at(klass.data, klass.day_date)
+        items.append(ClassAvailability.from_class(klass, opens_at, now))
+    items.sort(key=lambda item: (item.day_date, item.start_time or time.min))
+    return items
+
+
+class SeatAvailabilityDomain:
+    def __init__(
+        self,
+        sede_id: int = 47,
+        http_session: requests.Session | None = None,
+        username: str | None = None,
+        password: str | None = None,
+    ):
+        self.domain = BookClassDomain(
+            sede_id=sede_id,
+            http_session=http_session,
+            username=username,
+            password=password,
+        )
+
+    def get_availability(self, do_refresh: bool = False) -> dict:
+        """
+        Returns:
+            {
+                "computed_at": "2024-10-25T09:00:00+00:00",
+                "classes": [
+                    {
+                        "class_id": "756422",
+                        "course_name": "Calisthenics",
+                        "day_date": "2024-10-30",
+                        "start_time": "20:00:00",
+                        ...
+                        "n_free_seats": 6,
+                        "occupancy_ratio": 0.625,
+                        "is_bookable": False,
+                    },
+                    ...
+                ],
+            }
+        """
+        key = f"{self.domain.username}:{self.domain.sede_id}"
+        if not do_refresh:
+            data = availability_cache.get(key)
+            if data is not None:
+                logger.debug("Reusing cached seat availability")
+                return data
+
+        # Always a fresh palinsesto: seats change much faster than the palinsesto
+        #  cache expires (and the fetch refreshes that cache too).
+        palinsesto = self.domain.get_palinsesto(do_refresh=True)
+        now = datetime_utils.now_utc()
+        items = scan_availability(
+            palinsesto, after=datetime_utils.now().date(), now=now
+        )
+        data = dict(
+            computed_at=now.isoformat(),
+            classes=[item.to_dict() for item in items],
+        )
+        availability_cache.set(key, data)
+        return data
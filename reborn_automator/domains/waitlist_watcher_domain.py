@@ -0,0 +1,226 @@
+"""
+Watch full classes and book them the instant a seat frees up (eg. someone cancels).
+
+The palinsesto is polled at an adaptive interval: the closer the class, the tighter
+ the interval (cancellations cluster right before the class); and when nothing
+ changes between polls (free seats and waiting list), the interval backs off
+ exponentially. Every request (polls, bookings, and logins when the session
+ expires) counts against a per-invocation request budget, so a watcher can never
+ hammer the server.
+
+Usage:
+    watcher = WaitlistWatcher(BookClassDomain())
+    results = watcher.watch([ClassTarget(ClassNameEnum.CALI)])
+    results[0].is_booked
+"""
+
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Callable
+
+from ..conf import settings
+from ..utils import datetime_utils
+from ..utils.log_utils import logger
+from .book_class_domain import (
+    BaseBookClassDomainException,
+    BookClassDomain,
+    BookingResult,
+    ClassTarget,
+    FailedBooking,
+    get_class_starts_at,
+)
+from .palinsesto_model import PalinsestoClass
+
+
+@dataclass
+class _Watched:
+    result: BookingResult
+    # The class found at the first poll: later polls look up this very class.
+    target: ClassTarget | None = None
+    starts_at: datetime | None = None
+    # (free seats, waiting list) at the last poll.
+    state: tuple | None = None
+    is_done: bool = False
+
+
+class WaitlistWatcher:
+    def __init__(
+        self,
+        domain: BookClassDomain,
+        max_requests: int | None = None,
+        max_duration_secs: float | None = None,
+    ):
+        """
+        Args:
+            domain: the domain to poll and book with.
+            max_requests: the request budget (polls, bookings and logins).
+            max_duration_secs: stop watching after this long, eg. the remaining time
+             of the Lambda invocation.
+        """
+        self.domain = domain
+        self.max_requests = max_requests or settings.WAITLIST_MAX_REQUESTS
+        if max_duration_secs is None:
+            max_duration_secs = settings.WAITLIST_MAX_DURATION_SECS
+        self.max_duration_secs = max_duration_secs
+        self.n_requests = 0
+        self.n_polls = 0
+
+    def watch(self, targets: list[ClassTarget]) -> list[BookingResult]:
+        """
+        Poll the palinsesto until every target is booked (or was already booked),
+         its class starts, or the budget or the time is over.
+
+        Returns: a result for each target, in the same order. A target not booked
+         has its `exception` set: `NoSeatFreedUp`, `AlreadyBooked`, or eg.
+         `FailedBooking` when the last seat was taken by someone else first.
+        """
+        watched = [_Watched(BookingResult(target)) for target in targets]
+        deadline = time.monotonic() + self.max_duration_secs
+        n_unchanged = 0
+
+        while True:
+            is_changed = self._poll(watched)
+            n_unchanged = 0 if is_changed else n_unchanged + 1
+            pending = [w for w in watched if not w.is_done]
+            if not pending:
+                break
+
+            remaining_secs = deadline - time.monotonic()
+            # Keep 1 request for the booking, after the next poll.
+            if (
+                self.n_requests + 2 > self.max_requests
+                or remaining_secs < settings.WAITLIST_MIN_INTERVAL_SECS
+            ):
+                for w in pending:
+                    w.result.exception = w.result.exception or NoSeatFreedUp(
+                        self.n_requests
+                    )
+                break
+
+            # A last poll right at the deadline, rather than none.
+            interval = min(self.get_interval(pending, n_unchanged), remaining_secs)
+            logger.debug(
+                f"Waitlist watcher: next poll in {interval:.1f} secs",
+                extra=dict(n_pending=len(pending), n_unchanged=n_unchanged),
+            )
+            time.sleep(interval)
+
+        logger.info(
+            f"Waitlist watcher done after {self.n_polls} polls",
+            extra=dict(
+                n_requests=self.n_requests,
+                n_booked=sum(1 for w in watched if w.result.is_booked),
+            ),
+        )
+        return [w.result for w in watched]
+
+    def get_interval(self, pending: list[_Watched], n_unchanged: int) -> float:
+        """
+        The time to wait before the next poll: from the max interval down to the min
+         one as the first pending class gets within `WAITLIST_TIGHTEN_WITHIN_SECS`,
+         and then multiplied by the backoff factor for each poll with no changes.
+        """
+        min_secs = settings.WAITLIST_MIN_INTERVAL_SECS
+        max_secs = settings.WAITLIST_MAX_INTERVAL_SECS
+        now = datetime_utils.now_utc()
+        secs_to_class = min(
+            ((w.starts_at - now).total_seconds() for w in pending if w.starts_at),
+            default=settings.WAITLIST_TIGHTEN_WITHIN_SECS,
+        )
+        ratio = min(max(secs_to_class, 0) / settings.WAITLIST_TIGHTEN_WITHIN_SECS, 1)
+        interval = min_secs + (max_secs - min_secs) * ratio
+        interval *= settings.WAITLIST_BACKOFF_FACTOR**n_unchanged
+        return min(interval, max_secs)
+
+    def _poll(self, watched: list[_Watched]) -> bool:
+        """
+        Fetch the palinsesto and book the pending classes with a free seat.
+
+        Returns: True if any watched class changed since the previous poll.
+        """
+        self.n_polls += 1
+        self._call_counted(self.domain.get_palinsesto, do_refresh=True)
+        now = datetime_utils.now_utc()
+        is_changed = False
+
+        for w in watched:
+            if w.is_done:
+                continue
+            try:
+                klass = self.domain.find_class(w.target or w.result.target)
+            except BaseBookClassDomainException as exc:
+                w.result.exception = exc
+                w.is_done = True
+                continue
+            if w.target is None:
+                w.target = ClassTarget(
+                    klass.course_name,
+                    day_date=klass.day_date,
+                    start_time=klass.start_time,
+                )
+                if klass.start_time is not None:
+                    w.starts_at = get_class_starts_at(klass.data, klass.day_date)
+                w.result.class_id = klass.id
+                w.result.day_date = klass.day_date
+
+            state = (klass.n_free_seats, klass.n_queued)
+            is_changed |= w.state is not None and state != w.state
+            w.state = state
+
+            if klass.is_user_booked:
+                w.result.exception = AlreadyBooked(klass.id, klass.day_date)
+                w.is_done = True
+            elif w.starts_at and now >= w.starts_at:
+                w.is_done = True
+                w.result.exception = w.result.exception or NoSeatFreedUp(
+                    self.n_requests
+                )
+            elif klass.n_free_seats and self.n_requests < self.max_requests:
+                self._book(w, klass)
+        return is_changed
+
+    def _book(self, w: _Watched, klass: PalinsestoClass) -> None:
+        logger.info(
+            f"Waitlist watcher: {klass.n_free_seats} free seats, booking",
+            extra=dict(class_id=klass.id, day_date=str(klass.day_date)),
+        )
+        w.result.exception = None
+        self._call_counted(self.domain.book_target, w.result, klass)
+        if w.result.is_booked:
+            w.is_done = True
+        elif isinstance(w.result.exception, FailedBooking):
+            # Someone else got the seat first: keep watching.
+            w.result.response = None
+        else:
+            w.is_done = True
+
+    def _call_counted(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Call a domain method, counting all the requests it sends (eg. a new login
+         when the session expired) against the budget.
+        """
+        n_sent = self.domain.client.n_requests
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.n_requests += self.domain.client.n_requests - n_sent
+
+
+class BaseWaitlistWatcherDomainException(Exception):
+    pass
+
+
+class AlreadyBooked(BaseWaitlistWatcherDomainException):
+    def __init__(self, class_id: str, day_date: date):
+        self.class_id = class_id
+        self.day_date = day_date
+
+
+class NoSeatFreedUp(BaseWaitlistWatcherDomainException):
+    """
+    No seat freed up before the class started or the budget or the time ran out.
+    """
+
+    def __init__(self, n_requests: int):
+        self.n_requests = n_requests
@@ -0,0 +1,33 @@
+"""
+Run blocking calls (eg. HTTP requests with `requests`) from asyncio code, without
+ blocking the event loop.
+
+All the calls share one bounded thread pool, so that the number of concurrent
+ requests never exceeds the size of the HTTP connection pools.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable
+
+from ..conf import settings
+
+
+@lru_cache
+def get_shared_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(
+        max_workers=settings.ASYNC_IO_MAX_WORKERS, thread_name_prefix="async-io"
+    )
+
+
+async def run_in_thread(fn: Callable, *args, **kwargs) -> Any:
+    """
+    Usage:
+        data = await asyncio_utils.run_in_thread(client.get_palinsesto, 47)
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_shared_executor(), functools.partial(fn, *args, **kwargs)
+    )
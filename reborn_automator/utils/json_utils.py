@@ -1,7 +1,93 @@
+"""
+JSON encoding of the Lambda responses, with support for datetime, Decimal, pydantic
+ Url, UUID and objects with a `to_dict()` method.
+
+The conversion of each non-native type is looked up once and then cached per type,
+ and the encoders are reused across calls. When orjson is installed (the optional
+ extra `fast-json`) and `settings.IS_JSON_FAST_BACKEND_ENABLED` (off by default),
+ `to_json()` uses it for the calls with no formatting options: the output has the
+ same meaning, but it is compact (no spaces after separators), non-ASCII chars are
+ not escaped, and NaN and infinity are encoded as null.
+
+Usage:
+    json_utils.to_json(dict(now=datetime.now(), id=uuid.uuid4()))
+"""
+
 import json
 from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable
 from uuid import UUID
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _convert_decimal(obj) -> float:
+    return float(obj)
+
+
+def _convert_to_str(obj) -> str:
+    return str(obj)
+
+
+def _convert_datetime(obj: datetime) -> str:
+    return obj.isoformat()
+
+
+def _convert_to_dict(obj) -> Any:
+    return obj.to_dict()
+
+
+# Type -> conversion function, None when the type has no conversion.
+_converters: dict[type, Callable | None] = dict()
+
+
+def _get_converter(cls: type) -> Callable | None:
+    """
+    The conversion for the given type (the first matching check wins), cached per
+     type.
+    """
+    try:
+        return _converters[cls]
+    except KeyError:
+        pass
+    if issubclass(cls, datetime):
+        converter = _convert_datetime
+    elif cls.__name__ == "Decimal":
+        # It's the Decimal class coming from DynamoDB and
+        #  we don't want to import its lib, so we check for the
+        #  class name.
+        converter = _convert_decimal
+    elif cls.__name__ == "Url":
+        # It's the pydantic.HttpUrl class coming from pydantic and
+        #  we don't want to import its lib, so we check for the
+        #  class name.
+        converter = _convert_to_str
+    elif callable(getattr(cls, "to_dict", None)):
+        converter = _convert_to_dict
+    elif issubclass(cls, UUID):
+        converter = _convert_to_str
+    else:
+        converter = None
+    _converters[cls] = converter
+    return converter
+
+
+def convert(obj):
+    """
+    Convert a non-native object to a JSON-serializable one.
+    """
+    converter = _get_converter(obj.__class__)
+    if converter is not None:
+        return converter(obj)
+    # A `to_dict` set on the instance rather than on the class.
+    if hasattr(obj, "to_dict") and callable(obj.to_dict):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
 
 class CustomJsonEncoder(json.JSONEncoder):
     """
@@ -10,24 +96,47 @@ class CustomJsonEncoder(json.JSONEncoder):
     """
 
     def default(self, obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        elif obj.__class__.__name__ == "Decimal":
-            # It's the Decimal class coming from DynamoDB and
-            #  we don't want to import its lib, so we check for the
-            #  class name.
-            return float(obj)
-        elif obj.__class__.__name__ == "Url":
-            # It's the pydantic.HttpUrl class coming from pydantic and
-            #  we don't want to import its lib, so we check for the
-            #  class name.
-            return str(obj)
-        elif hasattr(obj, "to_dict") and callable(obj.to_dict):
-            return obj.to_dict()
-        elif isinstance(obj, UUID):
-            return str(obj)
-        return json.JSONEncoder.default(self, obj)
+        return convert(obj)
+
+
+@lru_cache(maxsize=32)
+def _get_encoder(sort_keys: bool, options: tuple) -> CustomJsonEncoder:
+    return CustomJsonEncoder(sort_keys=sort_keys, **dict(options))
 
 
 def to_json(data, sort_keys=False, **kwargs):
-    return json.dumps(data, cls=CustomJsonEncoder, sort_keys=sort_keys, **kwargs)
+    """
+    Like `json.dumps(data, cls=CustomJsonEncoder, sort_keys=sort_keys, **kwargs)`.
+    """
+    # Imported here so that importing this module (at every Lambda cold start) does
+    #  not load the settings.
+    from ..conf import settings
+
+    if not kwargs and orjson is not None and settings.IS_JSON_FAST_BACKEND_ENABLED:
+        try:
+            return orjson.dumps(
+                data,
+                default=convert,
+                option=_get_orjson_option(sort_keys),
+            ).decode()
+        except orjson.JSONEncodeError:
+            # Eg. an int larger than 64 bits: the stdlib handles it.
+            pass
+    try:
+        encoder = _get_encoder(sort_keys, tuple(sorted(kwargs.items())))
+    except TypeError:
+        # Unhashable options.
+        return json.dumps(data, cls=CustomJsonEncoder, sort_keys=sort_keys, **kwargs)
+    return encoder.encode(data)
+
+
+def _get_orjson_option(sort_keys: bool) -> int:
+    # Datetimes and dataclasses are passed to `convert()`, like with the stdlib.
+    option = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    return option
@@ -1,11 +1,8 @@
 import json
 import os
+import threading
 from pathlib import Path
-from typing import Callable
-
-from ..clients.aws_parameter_store_client.aws_parameter_store_client import (
-    ParameterStoreClient,
-)
+from typing import Any, Callable
 
 
 def get_string_from_env(key: str, default: str | None = None):
@@ -56,28 +53,103 @@ def get_string_from_env_or_file(
     return value
 
 
-def get_string_from_env_or_aws_parameter_store(
-    env_key: str,
-    parameter_store_key_path: str | Path,
-    default: str | None = None,
-    is_value_json=False,
-):
-    try:
-        value = get_string_from_env(env_key)
-    except KeyError:
-        value = None
+class LazyEnvOrAwsParameterStoreSetting:
+    """
+    A setting read from an env var or, if missing, from AWS Parameter Store, lazily:
+     the value is resolved only when the setting is first read, and then it is
+     memoized.
+    When a value has to be read from Parameter Store, all the lazy settings that are
+     still unresolved and missing their env var are read at once, with a single
+     batched request. A parameter missing in Parameter Store raises
+     `ParameterNotFound`: the default is only for the settings with no parameter.
+    So importing the settings does no network or boto3 work.
 
-    if value is None:
-        value = ParameterStoreClient().get_secret(parameter_store_key_path)
+    Usage:
+        class settings:
+            API_TOKEN = LazyEnvOrAwsParameterStoreSetting(
+                env_key="API_TOKEN",
+                parameter_store_key_path="/my-app/production/api-token",
+            )
+            API_URL = LazyEnvOrAwsParameterStoreSetting(
+                env_key="API_URL", default="https://example.com"
+            )
+    """
 
-    if value and is_value_json:
-        # Hack: store JSON strings as env vars (or in Parameter store) with
-        #  a starting and ending single quote, like '{"foo": "bar"}'.
-        value = value.replace("'", "")
-        value = json.loads(value)
+    # All the instances, so that unresolved ones can be batched together.
+    _instances: list["LazyEnvOrAwsParameterStoreSetting"] = list()
+    _lock = threading.Lock()
 
-    if value is None:
-        if default is None:
-            raise KeyError
-        value = default
-    return value
+    def __init__(
+        self,
+        env_key: str,
+        parameter_store_key_path: str | None = None,
+        default: str | None = None,
+        is_value_json=False,
+    ):
+        self.env_key = env_key
+        self.parameter_store_key_path = parameter_store_key_path
+        self.default = default
+        self.is_value_json = is_value_json
+        self._is_resolved = False
+        self._value: Any = None
+        self._instances.append(self)
+
+    def __get__(self, instance, owner) -> Any:
+        if not self._is_resolved:
+            with self._lock:
+                if not self._is_resolved:
+                    self._resolve()
+        return self._value
+
+    def _resolve(self) -> None:
+        try:
+            value = get_string_from_env(self.env_key)
+        except KeyError:
+            value = None
+        if value is None and self.parameter_store_key_path:
+            self._resolve_from_aws_parameter_store()
+            return
+        self._set_value(value)
+
+    def _resolve_from_aws_parameter_store(self) -> None:
+        batch = [self]
+        for lazy_setting in self._instances:
+            if lazy_setting is self or lazy_setting._is_resolved:
+                continue
+            if not lazy_setting.parameter_store_key_path:
+                continue
+            if os.getenv(lazy_setting.env_key, "").strip():
+                continue
+            batch.append(lazy_setting)
+
+        # Imported here so that boto3 is imported only when actually needed.
+        from ..clients.aws_parameter_store_client.aws_parameter_store_client import (
+            ParameterNotFound,
+            ParameterStoreClient,
+        )
+
+        values = ParameterStoreClient().get_secrets(
+            list({s.parameter_store_key_path for s in batch})
+        )
+        for lazy_setting in batch:
+            value = values.get(lazy_setting.parameter_store_key_path)
+            if value is not None:
+                lazy_setting._set_value(value)
+        if not self._is_resolved:
+            # Eg. a typo in the path or a deleted parameter: never fall back to
+            #  the default (the others missing raise when read).
+            raise ParameterNotFound(self.parameter_store_key_path)
+
+    def _set_value(self, value: str | None) -> None:
+        if value and self.is_value_json:
+            # Hack: store JSON strings as env vars (or in Parameter store) with
+            #  a starting and ending single quote, like '{"foo": "bar"}'.
+            value = value.replace("'", "")
+            value = json.loads(value)
+
+        if value is None:
+            if self.default is None:
+                raise KeyError(self.env_key)
+            value = self.default
+        self._value = value
+        self._is_resolved = True
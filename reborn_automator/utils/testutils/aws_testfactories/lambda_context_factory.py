@@ -3,7 +3,7 @@ from dataclasses import dataclass
 
 class LambdaContextFactory:
     @staticmethod
-    def make():
+    def make(remaining_time_in_millis: int = 90_000):
         @dataclass
         class LambdaContext:
             function_name: str = __name__
@@ -13,4 +13,7 @@ class LambdaContextFactory:
             )
             aws_request_id: str = "52fdfc07-2182-154f-163f-5f0f9a621d72"
 
+            def get_remaining_time_in_millis(self) -> int:
+                return remaining_time_in_millis
+
         return LambdaContext()
@@ -0,0 +1,293 @@
+"""
+A local stand-in for the Reborn API (the shaggyowl `loginApp`, `palinsesti` and
+ `prenotazione_new` endpoints), to exercise the clients and the domains offline and
+ under load, without touching production.
+
+It serves a palinsesto (by default made by `PalinsestoFactory`) and keeps the
+ bookings in memory, with a limited number of seats per class. Latency, jitter,
+ error rate, the server clock and the time the booking window opens are
+ configurable.
+
+Usage:
+    with FakeRebornServer(latency_secs=0.05, n_seats=4) as server:
+        with override_settings(settings, REBORN_BASE_URL=server.base_url):
+            BookClassDomain().book_next_calisthenics_class()
+        server.n_requests_by_endpoint
+"""
+
+import copy
+import json
+import random
+import threading
+import time
+import urllib.parse
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from zoneinfo import ZoneInfo
+
+from ...clients.reborn_api_client import (
+    BOOKING_FAILED_MESSAGE,
+    WINDOW_NOT_OPEN_MESSAGE,
+)
+from ...conf import settings
+from .. import datetime_utils
+from .reborn_testfactories.palinsesto_factory import PalinsestoFactory
+
+LOGIN_OK_MESSAGE = "Accesso effettuato con successo."
+LOGIN_FAILED_MESSAGE = "Cliente non trovato. Controllare email e password."
+INVALID_SESSION_MESSAGE = "Sessione non valida."
+BOOKING_OK_MESSAGE = "Prenotazione effettuata."
+NO_SEATS_MESSAGE = "Posti esauriti."
+ALREADY_BOOKED_MESSAGE = "Sei già prenotato per questo orario."
+
+
+class FakeRebornServer:
+    def __init__(
+        self,
+        palinsesto: dict | None = None,
+        n_seats: int = 16,
+        latency_secs: float = 0,
+        jitter_secs: float = 0,
+        error_rate: float = 0,
+        window_opens_at: datetime | None = None,
+        window_opens_before_class_secs: float | None = None,
+        passwords: dict[str, str] | None = None,
+        clock_offset_secs: float = 0,
+        seed: int | None = None,
+        host: str = "localhost",
+        port: int = 0,
+    ):
+        """
+        Args:
+            palinsesto: the palinsesto response to serve, by default a week from
+             tomorrow made by `PalinsestoFactory`.
+            n_seats: the seats of each class in the default palinsesto.
+            latency_secs: the time to wait before every response.
+            jitter_secs: a random extra latency, uniform in [-jitter, +jitter].
+            error_rate: the probability of an HTTP 500 response.
+            window_opens_at: the booking window of all classes opens at this time
+             (timezone-aware); None for always open.
+            window_opens_before_class_secs: the booking window of each class opens
+             this long before the class starts, like the real one (see
+             `settings.REBORN_BOOKING_WINDOW_OPENS_BEFORE_CLASS_SECS`).
+            passwords: username -> password; None to accept any creds.
+            clock_offset_secs: how much the server clock is ahead of the local one:
+             it affects the `Date` header and the booking window.
+            seed: the seed for latency and errors, for reproducible runs.
+            host, port: where to listen, port 0 for a random free port.
+        """
+        self.palinsesto = palinsesto or PalinsestoFactory.make(
+            start_day=datetime_utils.now().date() + timedelta(days=1),
+            n_seats=n_seats,
+        )
+        self.n_seats = n_seats
+        self.latency_secs = latency_secs
+        self.jitter_secs = jitter_secs
+        self.error_rate = error_rate
+        self.window_opens_at = window_opens_at
+        self.window_opens_before_class_secs = window_opens_before_class_secs
+        self.passwords = passwords
+        self.clock_offset_secs = clock_offset_secs
+        self._random = random.Random(seed)
+
+        # `codice_sessione` -> username.
+        self.sessions: dict[str, str] = dict()
+        # (id_orario_palinsesto, day) -> usernames.
+        self.bookings: dict[tuple[str, str], list[str]] = dict()
+        self.n_requests_by_endpoint: Counter = Counter()
+        self.n_errors = 0
+        self._lock = threading.Lock()
+        # (id_orario_palinsesto, day) -> class data.
+        self._classes: dict[tuple[str, str], dict] = {
+            (klass["id_orario_palinsesto"], giorno["giorno"]): klass
+            for risultato in self.palinsesto["parametri"]["lista_risultati"]
+            for giorno in risultato["giorni"]
+            for klass in giorno["orari_giorno"]
+        }
+
+        self._httpd = ThreadingHTTPServer((host, port), _RequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        # VCR ignores "localhost" (see `vcr_config` in tests).
+        if host in ("127.0.0.1", "::1"):
+            host = "localhost"
+        return f"http://{host}:{port}/funzioniapp/v407"
+
+    def start(self) -> "FakeRebornServer":
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever,
+            # A short poll interval, so that `stop()` is quick.
+            kwargs=dict(poll_interval=0.05),
+            name="fake-reborn-server",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeRebornServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def handle(self, endpoint: str, params: dict[str, str]) -> tuple[int, dict | None]:
+        """
+        Returns: (HTTP status code, JSON body).
+        """
+        with self._lock:
+            self.n_requests_by_endpoint[endpoint] += 1
+        delay = self.latency_secs
+        if self.jitter_secs:
+            delay += self._random.uniform(-self.jitter_secs, self.jitter_secs)
+        if delay > 0:
+            time.sleep(delay)
+        if self.error_rate and self._random.random() < self.error_rate:
+            with self._lock:
+                self.n_errors += 1
+            return 500, None
+
+        if endpoint == "loginApp":
+            return 200, self._login(params)
+        if endpoint == "palinsesti":
+            return 200, self._get_palinsesto(params)
+        if endpoint == "prenotazione_new":
+            return 200, self._book_class(params)
+        return 404, None
+
+    def _login(self, params: dict[str, str]) -> dict:
+        username = params.get("mail")
+        password = params.get("pass")
+        if not username or (
+            self.passwords is not None and self.passwords.get(username) != password
+        ):
+            return _make_body(1, LOGIN_FAILED_MESSAGE)
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self.sessions[session_id] = username
+        return _make_body(
+            2, LOGIN_OK_MESSAGE, {"sessione": {"codice_sessione": session_id}}
+        )
+
+    def _get_palinsesto(self, params: dict[str, str]) -> dict:
+        username = self.sessions.get(params.get("codice_sessione"))
+        if username is None:
+            return _make_body(1, INVALID_SESSION_MESSAGE)
+
+        with self._lock:
+            bookings = {
+                key: list(usernames) for key, usernames in self.bookings.items()
+            }
+        data = copy.deepcopy(self.palinsesto)
+        for risultato in data["parametri"]["lista_risultati"]:
+            for giorno in risultato["giorni"]:
+                for klass in giorno["orari_giorno"]:
+                    usernames = bookings.get(
+                        (klass["id_orario_palinsesto"], giorno["giorno"])
+                    )
+                    if usernames:
+                        _set_bookings(klass, usernames, username)
+        return data
+
+    def _book_class(self, params: dict[str, str]) -> dict:
+        username = self.sessions.get(params.get("codice_sessione"))
+        key = (params.get("id_orario_palinsesto"), params.get("data"))
+        klass = self._classes.get(key)
+        if username is None or klass is None:
+            return _make_body(1, BOOKING_FAILED_MESSAGE)
+
+        opens_at = self.get_window_opens_at(klass, key[1])
+        if opens_at and self.now() < opens_at:
+            return _make_body(1, WINDOW_NOT_OPEN_MESSAGE)
+
+        n_seats = int(klass["prenotazioni"]["numero_posti_disponibili"])
+        with self._lock:
+            usernames = self.bookings.setdefault(key, list())
+            if username in usernames:
+                return _make_body(1, ALREADY_BOOKED_MESSAGE)
+            if len(usernames) >= n_seats:
+                return _make_body(1, NO_SEATS_MESSAGE)
+            usernames.append(username)
+        return _make_body(2, BOOKING_OK_MESSAGE)
+
+    def cancel_booking(self, class_id: str, day: str, username: str) -> None:
+        """
+        Free the seat of `username`, like a cancellation in the app.
+        """
+        with self._lock:
+            self.bookings[(class_id, day)].remove(username)
+
+    def now(self) -> datetime:
+        """
+        The current time on the server clock.
+        """
+        return datetime_utils.now_utc() + timedelta(seconds=self.clock_offset_secs)
+
+    def get_window_opens_at(self, klass: dict, day: str) -> datetime | None:
+        if self.window_opens_before_class_secs is not None:
+            starts_at = datetime.combine(
+                datetime.fromisoformat(day).date(),
+                datetime.strptime(klass["orario_inizio"], "%H:%M").time(),
+                tzinfo=ZoneInfo(settings.REBORN_TIMEZONE),
+            )
+            return starts_at - timedelta(seconds=self.window_opens_before_class_secs)
+        return self.window_opens_at
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive connections, closed after 5 secs of inactivity like the real server.
+    protocol_version = "HTTP/1.1"
+    timeout = 5
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode()
+        params = dict(urllib.parse.parse_qsl(body))
+        endpoint = self.path.rstrip("/").rsplit("/", 1)[-1]
+        status_code, data = self.server.fake.handle(endpoint, params)
+
+        payload = json.dumps(data).encode() if data is not None else b""
+        self.send_response(status_code)
+        self.send_header("Content-Type", "text/html; charset=UTF-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("Keep-Alive", "timeout=5, max=100")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def date_time_string(self, timestamp=None):
+        # The `Date` header, on the server clock.
+        if timestamp is None:
+            timestamp = time.time() + self.server.fake.clock_offset_secs
+        return super().date_time_string(timestamp)
+
+    def log_message(self, format, *args):
+        # Silence the default logging to stderr.
+        pass
+
+
+def _make_body(status: int, message: str, parametri: dict | None = None) -> dict:
+    return {"status": status, "messaggio": message, "parametri": parametri or {}}
+
+
+def _set_bookings(klass: dict, usernames: list[str], username: str) -> None:
+    prenotazioni = klass["prenotazioni"]
+    n_seats = int(prenotazioni["numero_posti_disponibili"])
+    n_booked = int(prenotazioni["numero_posti_occupati"]) + len(usernames)
+    prenotazioni["numero_posti_occupati"] = str(n_booked)
+    prenotazioni["numero_posti_disponibili"] = str(max(n_seats - len(usernames), 0))
+    if username in usernames:
+        prenotazioni["utente_prenotato"] = "10992911"
+        prenotazioni["frase"] = f"Sei prenotato per questo orario ({n_booked} p.)"
@@ -0,0 +1,128 @@
+from datetime import date, time, timedelta
+
+from ....domains.palinsesto_model import DEFAULT_PALINSESTO_NAME
+
+DAY_NAMES = (
+    "Lunedì",
+    "Martedì",
+    "Mercoledì",
+    "Giovedì",
+    "Venerdì",
+    "Sabato",
+    "Domenica",
+)
+DEFAULT_COURSES = ("Calisthenics", "Powerlifting", "Functional Fitness", "Yoga")
+
+
+class PalinsestoFactory:
+    """
+    Make palinsesto responses shaped like those of `RebornApiClient.get_palinsesto()`.
+
+    Usage:
+        data = PalinsestoFactory.make(start_day=date(2024, 10, 25), n_days=7)
+    """
+
+    @classmethod
+    def make(
+        cls,
+        start_day: date,
+        n_days: int = 7,
+        n_classes_per_day: int = 8,
+        courses: tuple[str, ...] = DEFAULT_COURSES,
+        n_seats: int = 16,
+        first_start_time: time = time(7, 0),
+        first_class_id: int = 700000,
+    ) -> dict:
+        """
+        Args:
+            start_day: the first day.
+            n_days: the number of days.
+            n_classes_per_day: classes of each day, one per hour from
+             `first_start_time`, courses taken in turn from `courses`.
+            n_seats: the seats of each class.
+            first_start_time: the start time of the first class of each day.
+            first_class_id: ids are sequential from this.
+        """
+        class_id = first_class_id
+        giorni = list()
+        for i in range(n_days):
+            day = start_day + timedelta(days=i)
+            orari_giorno = list()
+            for j in range(n_classes_per_day):
+                hour = (first_start_time.hour + j) % 24
+                orari_giorno.append(
+                    cls.make_class(
+                        class_id=class_id,
+                        course_name=courses[(i + j) % len(courses)],
+                        start_time=time(hour, first_start_time.minute),
+                        n_seats=n_seats,
+                    )
+                )
+                class_id += 1
+            giorni.append(cls.make_day(day, orari_giorno))
+
+        open_gym_giorni = [
+            cls.make_day(start_day + timedelta(days=i), []) for i in range(n_days)
+        ]
+        return {
+            "status": 2,
+            "messaggio": "Tutto bene",
+            "parametri": {
+                "lista_risultati": [
+                    cls.make_risultato("47", DEFAULT_PALINSESTO_NAME, giorni),
+                    cls.make_risultato("1931", "Open Gym", open_gym_giorni),
+                ]
+            },
+        }
+
+    @staticmethod
+    def make_risultato(id_palinsesti: str, name: str, giorni: list[dict]) -> dict:
+        return {
+            "id_palinsesti": id_palinsesti,
+            "nome_palinsesto": name,
+            "visibile": "2",
+            "principale": "2",
+            "tipo": "palinsesto",
+            "giorni": giorni,
+        }
+
+    @staticmethod
+    def make_day(day: date, orari_giorno: list[dict]) -> dict:
+        # Mind that in the real response `giorno` comes after `orari_giorno`.
+        return {
+            "orari_giorno": orari_giorno,
+            "nome_giorno": f"{DAY_NAMES[day.weekday()]} {day.strftime('%d/%m/%Y')}",
+            "giorno": day.isoformat(),
+        }
+
+    @staticmethod
+    def make_class(
+        class_id: int,
+        course_name: str,
+        start_time: time,
+        n_seats: int = 16,
+        n_booked: int = 0,
+        is_user_booked: bool = False,
+    ) -> dict:
+        end_time = time((start_time.hour + 1) % 24, start_time.minute)
+        return {
+            "id_orario_palinsesto": str(class_id),
+            "orario_inizio": start_time.strftime("%H:%M"),
+            "orario_fine": end_time.strftime("%H:%M"),
+            "nome_corso": course_name,
+            "prenotabile_corso": "2",
+            "nome_staff": "Matteo Artina",
+            "prenotazioni": {
+                "numero_posti_disponibili": str(max(n_seats - n_booked, 0)),
+                "numero_utenti_coda": "0",
+                "numero_utenti_attesa": "0",
+                "numero_posti_occupati": str(n_booked),
+                "utente_prenotato": "10992911" if is_user_booked else "0",
+                "frase": (
+                    f"Sei prenotato per questo orario ({n_booked} p.)"
+                    if is_user_booked
+                    else f"Posti disponibili: {max(n_seats - n_booked, 0)}"
+                ),
+                "prenota_coda": "2",
+            },
+        }
@@ -1,5 +1,8 @@
+import inspect
 from contextlib import ContextDecorator
 
+_MISSING = object()
+
 
 class override_settings(ContextDecorator):
     """
@@ -35,10 +38,13 @@ class override_settings(ContextDecorator):
 
     def __enter__(self):
         for key, value in self.kwargs.items():
+            # Without resolving lazy settings (eg. from AWS Parameter Store), see
+            #  `LazyEnvOrAwsParameterStoreSetting`.
+            orig_value = inspect.getattr_static(self.settings, key, _MISSING)
             # Only update existing keys; discard non-existing keys.
-            if not hasattr(self.settings, key):
+            if orig_value is _MISSING:
                 continue
-            self.orig_values[key] = getattr(self.settings, key)
+            self.orig_values[key] = orig_value
             setattr(self.settings, key, value)
         return self
 
@@ -0,0 +1,118 @@
+"""
+A tiny two-tier cache: an in-process dict first, then a JSON file under /tmp.
+
+Both tiers survive across warm invocations in the same Lambda execution environment
+ (the in-process tier only as long as the process lives, the /tmp tier also across
+ process restarts), but you can NOT assume that this always happens: on a cold start
+ the cache is empty.
+
+Usage:
+    cache = TmpCache("reborn-sessions", ttl_secs=60 * 60)
+    cache.set("key", {"foo": "bar"})
+    cache.get("key")
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any
+
+from ..conf import settings
+from .log_utils import logger
+
+
+class TmpCache:
+    def __init__(self, namespace: str, ttl_secs: float | None = None):
+        """
+        Args:
+            namespace: the name of the sub-dir in `settings.TMP_CACHE_DIR`.
+            ttl_secs: values older than this are considered expired; None to never
+             expire.
+        """
+        self.namespace = namespace
+        self.ttl_secs = ttl_secs
+        # Key -> (stored_at timestamp, value).
+        self._memory: dict[str, tuple[float, Any]] = dict()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if not settings.IS_TMP_CACHE_ENABLED:
+            return default
+
+        item = self._memory.get(key)
+        if item is None:
+            item = self._read_file(key)
+            if item is None:
+                return default
+            self._memory[key] = item
+
+        stored_at, value = item
+        if self.ttl_secs is not None and time.time() - stored_at > self.ttl_secs:
+            self.delete(key)
+            return default
+        return value
+
+    def get_stored_at(self, key: str) -> float | None:
+        """
+        The timestamp when the value was stored, None if the key is not cached.
+        """
+        if self.get(key) is None:
+            return None
+        return self._memory[key][0]
+
+    def set(self, key: str, value: Any) -> None:
+        if not settings.IS_TMP_CACHE_ENABLED:
+            return
+
+        item = (time.time(), value)
+        self._memory[key] = item
+        self._write_file(key, item)
+
+    def delete(self, key: str) -> None:
+        self._memory.pop(key, None)
+        self._get_path(key).unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        self._memory.clear()
+        dir_path = self._get_dir_path()
+        if dir_path.is_dir():
+            for path in dir_path.glob("*.json"):
+                path.unlink(missing_ok=True)
+
+    def _get_dir_path(self) -> Path:
+        return Path(settings.TMP_CACHE_DIR) / self.namespace
+
+    def _get_path(self, key: str) -> Path:
+        # Hash the key, so that no sensitive data (eg. usernames) ends up in filenames.
+        digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+        return self._get_dir_path() / f"{digest}.json"
+
+    def _read_file(self, key: str) -> tuple[float, Any] | None:
+        try:
+            with open(self._get_path(key)) as fin:
+                data = json.load(fin)
+            return data["stored_at"], data["value"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as exc:
+            logger.warning(
+                "Discarding unreadable cache file", extra=dict(exc=str(exc), key=key)
+            )
+            return None
+
+    def _write_file(self, key: str, item: tuple[float, Any]) -> None:
+        path = self._get_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a tmp file and then rename it, so that readers never see
+            #  a partially written file.
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w") as fout:
+                json.dump(dict(stored_at=item[0], value=item[1]), fout)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            # The cache is an optimization: never fail because of it.
+            logger.warning(
+                "Could not write cache file", extra=dict(exc=str(exc), key=key)
+            )
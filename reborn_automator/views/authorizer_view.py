@@ -0,0 +1,51 @@
+import hmac
+from typing import Any
+
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+from ..conf import settings
+from ..utils.log_utils import logger
+
+# Objects declared outside the Lambda's handler method are part of Lambda's
+# *execution environment*. This execution environment is sometimes reused for subsequent
+# function invocations. Note that you can not assume that this always happens.
+# See: https://docs.aws.amazon.com/lambda/latest/dg/runtimes-context.html#runtimes-lifecycle-shutdown
+
+# The placeholder set by serverless.yml when the token is not configured: it never
+#  authorizes.
+UNSET_TOKEN = "XXX"
+
+logger.info("AUTHORIZER: LOADING")
+
+
+def lambda_handler(event: dict[str, Any], context: LambdaContext) -> dict:
+    """
+    HTTP API Lambda authorizer (payload 2.0, simple responses): the request is
+     authorized if its `Authorization` header is `settings.API_AUTHORIZER_TOKEN`,
+     like Botte's endpoints.
+
+    Args:
+        event: the authorizer event, like an API Gateway invocation event (see
+         `endpoint_introspection_view`) plus the `identitySource`.
+        context: the context passed to the Lambda.
+
+    Example:
+        $ curl https://tr7lfzd0ec.execute-api.eu-south-1.amazonaws.com/availability \
+           -H 'Authorization: XXX'
+
+    Returns: {"isAuthorized": bool}.
+    """
+    # Never log the event: it has the token.
+    token = (event.get("headers") or dict()).get("authorization") or ""
+    return {"isAuthorized": is_authorized(token)}
+
+
+def is_authorized(token: str) -> bool:
+    expected = settings.API_AUTHORIZER_TOKEN
+    if not expected or expected == UNSET_TOKEN:
+        logger.warning("API_AUTHORIZER_TOKEN not configured, denying")
+        return False
+    is_ok = hmac.compare_digest(token.encode(), expected.encode())
+    if not is_ok:
+        logger.info("Unauthorized request")
+    return is_ok
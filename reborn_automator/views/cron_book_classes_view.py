@@ -0,0 +1,192 @@
+import os
+import time
+from typing import Any
+
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+from ..clients import connection_prewarmer, reborn_api_client
+from ..clients.botte_outbox import BotteOutbox
+from ..conf import settings
+from ..domains.book_class_domain import (
+    BookingResult,
+    FailedBooking,
+    NoClassFoundInPalinsesto,
+    snapshot_store,
+)
+from ..domains.booking_rules_domain import BookingRule, BookingRulesDomain, get_rules
+from ..domains.waitlist_watcher_domain import AlreadyBooked, NoSeatFreedUp
+from ..utils import emoji_utils
+from ..utils.log_utils import logger
+
+# Objects declared outside the Lambda's handler method are part of Lambda's
+# *execution environment*. This execution environment is sometimes reused for subsequent
+# function invocations. Note that you can not assume that this always happens.
+# Typical use case: database connection. The same connection can be re-used in some
+# subsequent function invocations. It is recommended though to add logic to check if a
+# connection already exists before creating a new one.
+# The execution environment also provides 512 MB of *disk space* in the /tmp directory.
+# Again, this can be re-used in some subsequent function invocations.
+# See: https://docs.aws.amazon.com/lambda/latest/dg/runtimes-context.html#runtimes-lifecycle-shutdown
+
+# The Lambda is configured with 0 retries. So do raise exceptions in the view.
+
+# Keep-alive connection pool to Reborn API, created once per execution environment
+#  (at init time) and reused by all the requests (login, palinsesto, booking) of
+#  every invocation.
+reborn_api_client.get_shared_http_session()
+# And its connections are opened now: on a cold start the invocation follows
+#  right away, and the init phase runs with a full CPU. Only in the Lambda runtime:
+#  elsewhere (tests, benchmarks, scripts) importing a handler does no network I/O.
+if (
+    settings.IS_CONNECTION_PREWARM_ENABLED
+    and not settings.IS_TEST
+    and os.getenv("AWS_LAMBDA_FUNCTION_NAME")
+):
+    connection_prewarmer.prewarm_connections(
+        reborn_api_client.get_shared_http_session()
+    )
+
+logger.info("CRON BOOK CLASSES: LOADING")
+
+
+@logger.inject_lambda_context(log_event=True)
+def lambda_handler(event: dict[str, Any], context: LambdaContext) -> None:
+    """
+    Book the classes of the booking rules listed in the event, see
+     `settings.BOOKING_RULES`.
+
+    Args:
+        event: an AWS event, eg. CloudWatch Scheduled Event with an input.
+        context: the context passed to the Lambda.
+
+    The `event` is the input of the schedule in serverless.yml, like:
+        {"rule_ids": ["cali", "power"]}
+    With `"is_watcher": true`, full classes are watched and booked as soon as a seat
+     frees up, see `WaitlistWatcher`, until shortly before the Lambda timeout.
+    """
+    logger.info("CRON BOOK CLASSES: START")
+    rule_ids = event.get("rule_ids")
+    if (
+        not isinstance(rule_ids, list)
+        or not rule_ids
+        or not all(rule_id in settings.BOOKING_RULES for rule_id in rule_ids)
+    ):
+        # Eg. a schedule with a typo in serverless.yml or an invocation by hand.
+        known_rule_ids = list(settings.BOOKING_RULES)
+        logger.error(
+            "Invalid rule_ids in the event",
+            extra=dict(rule_ids=rule_ids, known_rule_ids=known_rule_ids),
+        )
+        raise InvalidEvent(rule_ids=rule_ids, known_rule_ids=known_rule_ids)
+
+    max_watch_secs = (
+        context.get_remaining_time_in_millis() / 1000
+        - settings.WAITLIST_LAMBDA_TIMEOUT_MARGIN_SECS
+    )
+    book_classes_by_rules(
+        rule_ids,
+        is_watcher=event.get("is_watcher", False),
+        max_watch_secs=max_watch_secs,
+    )
+
+
+def book_classes_by_rules(
+    rule_ids: list[str], is_watcher: bool = False, max_watch_secs: float | None = None
+) -> None:
+    """
+    Book the classes of the given rules, send a Telegram message for each rule and
+     raise the first exception, if any. When watching, no seat freeing up or the
+     class being already booked are not errors.
+    """
+    rules = get_rules(rule_ids)
+    domain = BookingRulesDomain(
+        http_session=reborn_api_client.get_shared_http_session()
+    )
+    start = time.perf_counter()
+    results = domain.book(
+        rules,
+        is_sniper=settings.IS_SNIPER_MODE_ENABLED,
+        is_watcher=is_watcher,
+        max_watch_secs=max_watch_secs,
+    )
+    # The bookings are final here: their time does not include Botte.
+    booking_secs = time.perf_counter() - start
+
+    # Use Botte (from patatrack monorepo) to send Telegram messages, through the
+    #  outbox: sent in the background, retried, and kept in /tmp if it fails.
+    botte = BotteOutbox()
+    exception = None
+    for rule, result in results:
+        botte.add(_make_message(rule, result, booking_secs))
+        if isinstance(result.exception, (NoSeatFreedUp, AlreadyBooked)):
+            continue
+        if result.exception and not exception:
+            exception = result.exception
+
+    # The execution environment is frozen when the handler returns, so wait for
+    #  the messages (but not for too long). Messages left in the outbox by previous
+    #  invocations are sent too.
+    botte.flush(timeout_secs=settings.BOTTE_MAX_WAIT_SECS)
+    snapshot_store.flush(timeout_secs=settings.SNAPSHOT_STORE_MAX_WAIT_SECS)
+    if exception:
+        raise exception
+
+
+def _make_message(rule: BookingRule, result: BookingResult, booking_secs: float) -> str:
+    day_date = result.day_date.strftime("%Y-%m-%d") if result.day_date else None
+    if not result.exception:
+        logger.info(
+            "Booking successful",
+            extra=dict(
+                rule_id=rule.id, response=result.response, booking_secs=booking_secs
+            ),
+        )
+        return (
+            emoji_utils.MUSCLE
+            + emoji_utils.GREEN_CIRCLE
+            + f"{rule.course_name} class booked for {day_date}"
+        )
+
+    exception = result.exception
+    exc_str = f"{exception.__class__.__name__}: {exception}"
+    extra = dict(rule_id=rule.id, exc=exc_str, booking_secs=booking_secs)
+    message = emoji_utils.MUSCLE + emoji_utils.RED_CIRCLE
+
+    if isinstance(exception, AlreadyBooked):
+        logger.info("Class already booked", extra=extra)
+        return (
+            emoji_utils.MUSCLE
+            + emoji_utils.GREEN_CIRCLE
+            + f"{rule.course_name} class already booked for {day_date}"
+        )
+
+    if isinstance(exception, NoClassFoundInPalinsesto):
+        message += f"{exception.class_name} class NOT found in palinsesto"
+    elif isinstance(exception, NoSeatFreedUp):
+        message += (
+            f"{rule.course_name} class NOT booked for {day_date}\n\nNo seat freed up"
+        )
+    else:
+        if isinstance(exception, FailedBooking):
+            extra["response"] = exception.response
+            exc_str = exception.response.get("messaggio") or str(exception.response)
+        message += (
+            # Botte only supports plain text now, so no formatting like:
+            #  '\n<pre><code class="language-json">\n'
+            f"{rule.course_name} class NOT booked for {day_date}\n\n{exc_str}"
+        )
+
+    logger.info("Booking error", extra=extra)
+    return message
+
+
+class InvalidEvent(Exception):
+    def __init__(self, rule_ids: Any, known_rule_ids: list[str]):
+        self.rule_ids = rule_ids
+        self.known_rule_ids = known_rule_ids
+
+    def __str__(self):
+        return (
+            f"rule_ids={self.rule_ids!r}: expected a list of"
+            f" {', '.join(self.known_rule_ids)}"
+        )
@@ -2,8 +2,6 @@ import sqlite3
 import sys
 from typing import Any
 
-import boto3
-import botocore
 from aws_lambda_powertools.utilities.data_classes import APIGatewayProxyEventV2
 from aws_lambda_powertools.utilities.typing import LambdaContext
 
@@ -101,6 +99,10 @@ def lambda_handler(event: dict[str, Any], context: LambdaContext) -> dict:
     #  this endpoints plus extra endpoints that expose some private info.
 
     if api_event.path.endswith("/version"):
+        # Imported here as boto3 is slow to import and only needed here.
+        import boto3
+        import botocore
+
         body = {
             "appName": settings.APP_NAME,
             "app": __version__,
@@ -0,0 +1,103 @@
+from typing import Any
+
+from aws_lambda_powertools.utilities.data_classes import APIGatewayProxyEventV2
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+from ..clients import reborn_api_client
+from ..conf import settings
+from ..domains.book_class_domain import snapshot_store
+from ..domains.seat_availability_domain import SeatAvailabilityDomain
+from ..utils import aws_lambda_utils
+from ..utils.log_utils import logger
+
+# Objects declared outside the Lambda's handler method are part of Lambda's
+# *execution environment*. This execution environment is sometimes reused for subsequent
+# function invocations. Note that you can not assume that this always happens.
+# Typical use case: database connection. The same connection can be re-used in some
+# subsequent function invocations. It is recommended though to add logic to check if a
+# connection already exists before creating a new one.
+# The execution environment also provides 512 MB of *disk space* in the /tmp directory.
+# Again, this can be re-used in some subsequent function invocations.
+# See: https://docs.aws.amazon.com/lambda/latest/dg/runtimes-context.html#runtimes-lifecycle-shutdown
+
+# The Lambda is configured with 0 retries. So do raise exceptions in the view.
+
+# Keep-alive connection pool to Reborn API, created once per execution environment.
+reborn_api_client.get_shared_http_session()
+
+logger.info("ENDPOINT SEAT AVAILABILITY: LOADING")
+
+
+@logger.inject_lambda_context(log_event=True)
+def lambda_handler(event: dict[str, Any], context: LambdaContext) -> dict:
+    """
+    Get the seat availability of every upcoming class, see `SeatAvailabilityDomain`.
+    It is cached, so it is cheap to poll (eg. from a dashboard).
+    The endpoint is private: requests are authorized by `authorizer_view`.
+
+    Args:
+        event: an AWS event, eg. Lambda URL or API Gateway invocation.
+        context: the context passed to the Lambda.
+
+    The `event` is a dict (that can be casted to `APIGatewayProxyEventV2`), see
+     `endpoint_introspection_view`. The optional query string parameter `course`
+     filters the classes by course name.
+
+    The `context` is a `LambdaContext` instance with properties similar to:
+        {
+            "aws_request_id": "e23b50d7-f384-4954-b6b5-395ec8faffce",
+            "log_group_name": "/aws/lambda/contabel-prod-endpoint-introspection",
+            "log_stream_name": "2023/04/18/[$LATEST]1de9ef8decd54172a43cfe6bea75731c",
+            "function_name": "contabel-prod-endpoint-introspection",
+            "memory_limit_in_mb": "256",
+            "function_version": "$LATEST",
+            "invoked_function_arn": "arn:aws:lambda:eu-south-1:477353422995:function:contabel-prod-endpoint-introspection",
+            "client_context": null,
+            "identity": "CognitoIdentity([cognito_identity_id=None,cognito_identity_pool_id=None])",
+            "_epoch_deadline_time_in_ms": 1681848368843
+        }
+    More info here: https://docs.aws.amazon.com/lambda/latest/dg/python-context.html
+
+    Example:
+        $ curl https://tr7lfzd0ec.execute-api.eu-south-1.amazonaws.com/availability?course=Calisthenics \
+           -H 'Authorization: XXX'
+        {
+            "computed_at": "2024-10-25T09:00:00.123456+00:00",
+            "classes": [
+                {
+                    "class_id": "756422",
+                    "course_name": "Calisthenics",
+                    "day_date": "2024-10-30",
+                    "start_time": "20:00:00",
+                    "end_time": "21:00:00",
+                    "instructor": "Matteo Artina",
+                    "n_seats": 16,
+                    "n_booked": 10,
+                    "n_free_seats": 6,
+                    "n_queued": 0,
+                    "occupancy_ratio": 0.625,
+                    "booking_window_opens_at": "2024-10-28T19:00:00+00:00",
+                    "is_bookable": false,
+                    "is_user_booked": false
+                }
+            ]
+        }
+    """
+    logger.info("ENDPOINT SEAT AVAILABILITY: START")
+
+    api_event = APIGatewayProxyEventV2(event)
+    course_name = (api_event.query_string_parameters or dict()).get("course")
+
+    domain = SeatAvailabilityDomain(
+        http_session=reborn_api_client.get_shared_http_session()
+    )
+    data = domain.get_availability()
+    # The execution environment is frozen when the handler returns, so wait for the
+    #  palinsesto snapshot (but not for too long).
+    snapshot_store.flush(timeout_secs=settings.SNAPSHOT_STORE_MAX_WAIT_SECS)
+    if course_name:
+        data = dict(
+            data,
+            classes=[c for c in data["classes"] if c["course_name"] == course_name],
+        )
+    return aws_lambda_utils.Ok200Response(data).to_dict()
@@ -0,0 +1,81 @@
+from unittest import mock
+
+from reborn_automator.clients.aws_parameter_store_client.aws_parameter_store_client import (
+    ParameterStoreClient,
+    values_cache,
+)
+from reborn_automator.conf import settings
+from reborn_automator.utils.testutils.settings_testutils import override_settings
+
+
+def make_parameter(name: str) -> dict:
+    return {"Name": name, "Value": f"value-{name}"}
+
+
+class TestParameterStoreClient:
+    def setup_method(self):
+        values_cache.clear()
+        self.ssm = mock.Mock()
+        self.client = ParameterStoreClient(client=self.ssm)
+
+    def teardown_method(self):
+        values_cache.clear()
+
+    def test_get_secret_cached(self):
+        self.ssm.get_parameter.return_value = {"Parameter": make_parameter("/a")}
+        assert self.client.get_secret("/a") == "value-/a"
+        # A new client shares the cache.
+        assert ParameterStoreClient(client=self.ssm).get_secret("/a") == "value-/a"
+        self.ssm.get_parameter.assert_called_once_with(Name="/a", WithDecryption=True)
+
+    def test_ttl(self):
+        self.ssm.get_parameter.return_value = {"Parameter": make_parameter("/a")}
+        self.client.get_parameter("/a")
+        with override_settings(settings, PARAMETER_STORE_CACHE_TTL_SECS=-1):
+            self.client.get_parameter("/a")
+        assert self.ssm.get_parameter.call_count == 2
+
+    def test_get_parameters_chunked(self):
+        self.ssm.get_parameters.side_effect = lambda Names, WithDecryption: {
+            "Parameters": [make_parameter(name) for name in Names if name != "/p3"]
+        }
+        paths = [f"/p{i}" for i in range(23)]
+        values = self.client.get_secrets(paths)
+        assert len(values) == 22
+        assert "/p3" not in values
+        assert [
+            len(c.kwargs["Names"]) for c in self.ssm.get_parameters.call_args_list
+        ] == [
+            10,
+            10,
+            3,
+        ]
+
+        # Cached values are not fetched again.
+        self.ssm.get_parameters.reset_mock()
+        assert self.client.get_secrets(["/p0", "/p1"]) == {
+            "/p0": "value-/p0",
+            "/p1": "value-/p1",
+        }
+        self.ssm.get_parameters.assert_not_called()
+
+    def test_get_parameters_by_path(self):
+        self.ssm.get_parameters_by_path.side_effect = [
+            {"Parameters": [make_parameter("/app/a")], "NextToken": "t1"},
+            {"Parameters": [make_parameter("/app/b")]},
+        ]
+        assert self.client.get_parameters_by_path("/app", is_decrypted=True) == {
+            "/app/a": "value-/app/a",
+            "/app/b": "value-/app/b",
+        }
+        assert self.ssm.get_parameters_by_path.call_args.kwargs["NextToken"] == "t1"
+        # Cached.
+        assert self.client.get_secret("/app/b") == "value-/app/b"
+        self.ssm.get_parameter.assert_not_called()
+
+    def test_put_invalidates(self):
+        self.ssm.get_parameter.return_value = {"Parameter": make_parameter("/a")}
+        self.client.get_secret("/a")
+        self.client.put_secret("/a", "new", do_overwrite=True)
+        self.client.get_secret("/a")
+        assert self.ssm.get_parameter.call_count == 2
@@ -1,7 +1,20 @@
-from reborn_automator.clients.botte_api_client import BotteApiClient
+import asyncio
+
+from reborn_automator.clients.botte_api_client import (
+    AsyncBotteApiClient,
+    BotteApiClient,
+)
 
 
 class TestBotteApiClient:
     def test_happy_flow(self):
         response = BotteApiClient().send_telegram_message("Hello World")
         assert response
+
+
+class TestAsyncBotteApiClient:
+    def test_happy_flow(self):
+        response = asyncio.run(
+            AsyncBotteApiClient().send_telegram_message("Hello World")
+        )
+        assert response
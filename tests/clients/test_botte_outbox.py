@@ -0,0 +1,131 @@
+import json
+import time
+from unittest import mock
+
+import pytest
+import requests
+
+from reborn_automator.clients.botte_outbox import BotteOutbox
+from reborn_automator.conf import settings
+from reborn_automator.utils.testutils.settings_testutils import override_settings
+
+
+class TestBotteOutbox:
+    def setup_method(self):
+        self.client = mock.Mock()
+        self.outbox = BotteOutbox(client=self.client)
+
+    def test_single_message_sent_as_is(self):
+        self.outbox.add("Hello World")
+        assert self.outbox.flush(timeout_secs=1)
+        self.client.send_telegram_message.assert_called_once_with("Hello World")
+        # Nothing left.
+        assert self.outbox.flush(timeout_secs=1)
+        assert self.client.send_telegram_message.call_count == 1
+
+    def test_coalesced(self):
+        self.outbox.add("Hello")
+        self.outbox.add("World")
+        assert self.outbox.flush(timeout_secs=1)
+        self.client.send_telegram_message.assert_called_once_with("Hello\n\nWorld")
+
+    def test_coalesced_within_max_length(self):
+        with override_settings(settings, BOTTE_OUTBOX_MAX_MESSAGE_LENGTH=12):
+            for text in ("Hello", "World", "Ciao"):
+                self.outbox.add(text)
+            assert self.outbox.flush(timeout_secs=1)
+        assert [
+            c.args[0] for c in self.client.send_telegram_message.call_args_list
+        ] == [
+            "Hello\n\nWorld",
+            "Ciao",
+        ]
+
+    def test_retry(self):
+        self.client.send_telegram_message.side_effect = [
+            requests.ConnectionError,
+            {"message_id": 1},
+        ]
+        self.outbox.add("Hello World")
+        assert self.outbox.flush(timeout_secs=1)
+        assert self.client.send_telegram_message.call_count == 2
+
+    def test_no_retry_on_client_error(self):
+        response = requests.Response()
+        response.status_code = 400
+        self.client.send_telegram_message.side_effect = requests.HTTPError(
+            response=response
+        )
+        self.outbox.add("Hello World")
+        assert not self.outbox.flush(timeout_secs=1)
+        assert self.client.send_telegram_message.call_count == 1
+
+    def test_kept_until_sent(self):
+        self.client.send_telegram_message.side_effect = requests.ConnectionError
+        self.outbox.add("Hello World")
+        assert not self.outbox.flush(timeout_secs=1)
+        assert (
+            self.client.send_telegram_message.call_count
+            == settings.BOTTE_OUTBOX_MAX_ATTEMPTS
+        )
+
+        self.client.send_telegram_message.side_effect = None
+        self.client.reset_mock()
+        assert self.outbox.flush(timeout_secs=1)
+        self.client.send_telegram_message.assert_called_once_with("Hello World")
+
+    def test_expired_dropped(self):
+        self.outbox.add("Hello World")
+        with override_settings(settings, BOTTE_OUTBOX_MAX_AGE_SECS=-1):
+            assert self.outbox.flush(timeout_secs=1)
+        self.client.send_telegram_message.assert_not_called()
+
+    def test_bounded_flush(self):
+        self.client.send_telegram_message.side_effect = lambda text: time.sleep(0.2)
+        self.outbox.add("Hello World")
+        assert not self.outbox.flush(timeout_secs=0.05)
+
+    def test_failure_not_raised(self):
+        # Not a `requests` error, eg. a bug in the outbox.
+        self.client.send_telegram_message.side_effect = ValueError
+        self.outbox.add("Hello World")
+        assert not self.outbox.flush(timeout_secs=1)
+
+
+class TestBotteOutboxSpool:
+    @pytest.fixture(autouse=True)
+    def spool(self, tmp_cache):
+        self.dir_path = tmp_cache / "botte-outbox"
+
+    def test_sent_by_next_invocation(self):
+        client = mock.Mock()
+        client.send_telegram_message.side_effect = requests.ConnectionError
+        outbox = BotteOutbox(client=client)
+        outbox.add("Hello")
+        assert not outbox.flush(timeout_secs=1)
+        assert len(list(self.dir_path.glob("*.json"))) == 1
+
+        # A new invocation (a new outbox) sends the leftover with its own message.
+        client = mock.Mock()
+        outbox = BotteOutbox(client=client)
+        outbox.add("World")
+        assert outbox.flush(timeout_secs=1)
+        client.send_telegram_message.assert_called_once_with("Hello\n\nWorld")
+        assert list(self.dir_path.glob("*.json")) == []
+
+    def test_unreadable_file_discarded(self):
+        self.dir_path.mkdir()
+        path = self.dir_path / "0-broken.json"
+        path.write_text("{")
+        client = mock.Mock()
+        outbox = BotteOutbox(client=client)
+        outbox.add("Hello World")
+        assert outbox.flush(timeout_secs=1)
+        client.send_telegram_message.assert_called_once_with("Hello World")
+        assert not path.exists()
+
+    def test_file_content(self):
+        outbox = BotteOutbox(client=mock.Mock())
+        outbox.add("Hello World")
+        (path,) = self.dir_path.glob("*.json")
+        assert json.loads(path.read_text())["text"] == "Hello World"
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from reborn_automator.clients.clock_skew_estimator import (
+    ClockSkewEstimator,
+    clock_skew_estimator,
+)
+from reborn_automator.clients.reborn_api_client import (
+    RebornApiClient,
+    make_http_session,
+)
+from reborn_automator.conf import settings
+from reborn_automator.utils.testutils import datetime_testutils
+from reborn_automator.utils.testutils.fake_reborn_server import FakeRebornServer
+from reborn_automator.utils.testutils.settings_testutils import override_settings
+
+NOW = datetime(2024, 10, 26, 18, 0, 0, tzinfo=timezone.utc)
+
+
+class TestClockSkewEstimator:
+    def setup_method(self):
+        self.estimator = ClockSkewEstimator()
+
+    def add_sample(self, sent_secs: float, rtt_secs: float, offset_secs: float):
+        """
+        A sample of a server whose clock is `offset_secs` ahead, handling the request
+         in the middle of the round trip.
+        """
+        sent_at = NOW + timedelta(seconds=sent_secs)
+        server_at = sent_at + timedelta(seconds=rtt_secs / 2 + offset_secs)
+        # The `Date` header is truncated to the second.
+        server_date = server_at.replace(microsecond=0)
+        self.estimator.add_sample(
+            sent_at, sent_at + timedelta(seconds=rtt_secs), server_date
+        )
+
+    @datetime_testutils.freeze_time(NOW + timedelta(seconds=10))
+    def test_single_sample(self):
+        self.add_sample(sent_secs=0, rtt_secs=0.1, offset_secs=2.3)
+        estimate = self.estimator.get_estimate()
+        assert estimate.n_samples == 1
+        # Within [2 - 0.1, 3].
+        assert estimate.offset_secs == pytest.approx(2.45)
+        assert estimate.uncertainty_secs == pytest.approx(0.55)
+        assert estimate.min_rtt_secs == pytest.approx(0.1)
+
+    @datetime_testutils.freeze_time(NOW + timedelta(seconds=10))
+    def test_samples_narrow_the_estimate(self):
+        # At different sub-second phases.
+        for i in range(10):
+            self.add_sample(sent_secs=i * 0.37, rtt_secs=0.05, offset_secs=2.3)
+        estimate = self.estimator.get_estimate()
+        assert estimate.n_samples == 10
+        assert estimate.uncertainty_secs < 0.15
+        assert abs(estimate.offset_secs - 2.3) <= estimate.uncertainty_secs
+
+    @datetime_testutils.freeze_time(NOW + timedelta(seconds=10))
+    def test_inconsistent_older_samples_ignored(self):
+        # Then the local clock was adjusted.
+        self.add_sample(sent_secs=0, rtt_secs=0.05, offset_secs=-5)
+        self.add_sample(sent_secs=1, rtt_secs=0.05, offset_secs=2.3)
+        estimate = self.estimator.get_estimate()
+        assert estimate.n_samples == 1
+        assert abs(estimate.offset_secs - 2.3) <= estimate.uncertainty_secs
+
+    def test_old_samples_ignored(self):
+        self.add_sample(sent_secs=0, rtt_secs=0.05, offset_secs=2.3)
+        with datetime_testutils.freeze_time(NOW + timedelta(hours=2)):
+            assert self.estimator.get_estimate() is None
+            assert self.estimator.get_server_now() == NOW + timedelta(hours=2)
+
+    def test_rolling(self):
+        estimator = ClockSkewEstimator(max_samples=2)
+        for i in range(3):
+            estimator.add_sample(NOW, NOW, NOW)
+        with datetime_testutils.freeze_time(NOW):
+            assert estimator.get_estimate().n_samples == 2
+
+    def test_observe_responses(self):
+        session = make_http_session()
+        session.hooks["response"] = [self.estimator.observe]
+        with FakeRebornServer(clock_offset_secs=30) as server:
+            with override_settings(settings, REBORN_BASE_URL=server.base_url):
+                client = RebornApiClient(http_session=session)
+                client.login("rossi@gmail.com", "pass")
+                client.get_palinsesto()
+        estimate = self.estimator.get_estimate()
+        assert estimate.n_samples == 2
+        assert abs(estimate.offset_secs - 30) <= estimate.uncertainty_secs
+
+    def test_shared_estimator_hooked(self):
+        session = make_http_session()
+        assert clock_skew_estimator.observe in session.hooks["response"]
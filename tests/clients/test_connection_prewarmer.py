@@ -0,0 +1,54 @@
+import pytest
+
+from reborn_automator.clients.connection_prewarmer import (
+    _get_pool,
+    prewarm_connections,
+)
+from reborn_automator.clients.reborn_api_client import (
+    RebornApiClient,
+    make_http_session,
+)
+from reborn_automator.conf import settings
+from reborn_automator.utils.testutils.fake_reborn_server import FakeRebornServer
+from reborn_automator.utils.testutils.settings_testutils import override_settings
+
+# VCR replaces the connections with stubs that never connect.
+pytestmark = pytest.mark.novcr
+
+
+class TestPrewarmConnections:
+    def setup_method(self):
+        self.session = make_http_session()
+
+    def test_prewarm(self):
+        with FakeRebornServer() as server:
+            with override_settings(settings, REBORN_BASE_URL=server.base_url):
+                assert prewarm_connections(self.session, n_connections=2) == 2
+                pool = _get_pool(self.session, server.base_url)
+                assert pool.num_connections == 2
+
+                # The requests use the pre-warmed connections.
+                client = RebornApiClient(http_session=self.session)
+                client.login("rossi@gmail.com", "pass")
+                client.get_palinsesto()
+                assert pool.num_connections == 2
+
+    def test_dropped_connections_reopened(self):
+        with FakeRebornServer() as server:
+            with override_settings(settings, REBORN_BASE_URL=server.base_url):
+                prewarm_connections(self.session, n_connections=2)
+                pool = _get_pool(self.session, server.base_url)
+                # Like the server closing an idle connection.
+                dropped = pool.pool.queue[-1]
+                dropped.close()
+
+                assert prewarm_connections(self.session, n_connections=2) == 2
+                assert dropped.is_connected
+                assert pool.num_connections == 2
+
+    def test_failure_not_raised(self):
+        # Nothing listening there.
+        with FakeRebornServer() as server:
+            base_url = server.base_url
+        with override_settings(settings, REBORN_HTTP_CONNECT_TIMEOUT_SECS=0.5):
+            assert prewarm_connections(self.session, 2, url=base_url) == 0
@@ -0,0 +1,128 @@
+import time
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+import requests
+
+from reborn_automator.clients.hedged_booking_client import (
+    ALREADY_BOOKED_MESSAGE,
+    HedgedBookingClient,
+    is_booked_response,
+)
+from reborn_automator.clients.latency_tracker import LatencyTracker
+from reborn_automator.clients.reborn_api_client import make_http_session
+from reborn_automator.conf import settings
+from reborn_automator.domains.book_class_domain import (
+    BookClassDomain,
+    palinsesto_cache,
+    session_cache,
+)
+from reborn_automator.utils import datetime_utils
+from reborn_automator.utils.testutils.fake_reborn_server import FakeRebornServer
+from reborn_automator.utils.testutils.settings_testutils import override_settings
+
+BOOKED = {"status": 2, "messaggio": "Prenotazione effettuata."}
+ALREADY_BOOKED = {"status": 1, "messaggio": ALREADY_BOOKED_MESSAGE}
+
+
+def answer_after(delay_secs: float, data: dict | Exception):
+    def book_class(*args):
+        time.sleep(delay_secs)
+        if isinstance(data, Exception):
+            raise data
+        return data
+
+    return book_class
+
+
+class TestHedgedBookingClient:
+    def setup_method(self):
+        self.tracker = LatencyTracker()
+        self.client = HedgedBookingClient(
+            mock.Mock(n_requests=0), hedge_client=mock.Mock(), tracker=self.tracker
+        )
+
+    def book(self, original, duplicate) -> dict:
+        self.client.client.book_class.side_effect = original
+        self.client.hedge_client.book_class.side_effect = duplicate
+        with override_settings(settings, HEDGED_BOOKING_DEFAULT_DELAY_SECS=0.05):
+            return self.client.book_class(758744, "2024-10-28")
+
+    def test_fast_answer_not_hedged(self):
+        assert self.book(answer_after(0, BOOKED), answer_after(0, BOOKED)) == BOOKED
+        self.client.hedge_client.book_class.assert_not_called()
+
+    def test_slow_answer_hedged(self):
+        start = time.monotonic()
+        data = self.book(answer_after(1, ALREADY_BOOKED), answer_after(0, BOOKED))
+        assert data == BOOKED
+        assert time.monotonic() - start < 0.5
+        self.client.hedge_client.book_class.assert_called_once_with(
+            758744, "2024-10-28", 47
+        )
+        # The duplicate is counted.
+        assert self.client.client.n_requests == 1
+
+    def test_all_workers_busy(self):
+        # The original takes the only worker: no duplicate.
+        with override_settings(settings, HEDGED_BOOKING_MAX_WORKERS=1):
+            data = self.book(answer_after(0.2, BOOKED), answer_after(0, BOOKED))
+        assert data == BOOKED
+        self.client.hedge_client.book_class.assert_not_called()
+
+        # No worker at all: the original is sent right away, in the caller's thread.
+        with override_settings(settings, HEDGED_BOOKING_MAX_WORKERS=0):
+            data = self.book(answer_after(0.2, BOOKED), answer_after(0, BOOKED))
+        assert data == BOOKED
+        self.client.hedge_client.book_class.assert_not_called()
+        assert self.client.client.n_requests == 0
+
+    def test_duplicate_already_booked(self):
+        # The original request booked the class, but its answer is slow.
+        data = self.book(answer_after(1, BOOKED), answer_after(0, ALREADY_BOOKED))
+        assert data == ALREADY_BOOKED
+        assert is_booked_response(data)
+
+    def test_failures(self):
+        exc = requests.ConnectionError()
+        assert self.book(answer_after(0.1, exc), answer_after(0.1, BOOKED)) == BOOKED
+        with pytest.raises(requests.ConnectionError):
+            self.book(answer_after(0.1, exc), answer_after(0, exc))
+
+    def test_hedge_delay(self):
+        with override_settings(
+            settings, HEDGED_BOOKING_MIN_SAMPLES=5, HEDGED_BOOKING_PERCENTILE=90
+        ):
+            assert self.client.get_hedge_delay_secs() == (
+                settings.HEDGED_BOOKING_DEFAULT_DELAY_SECS
+            )
+            for i in range(1, 11):
+                self.tracker.add_sample("prenotazione_new", i / 10)
+            assert self.client.get_hedge_delay_secs() == 0.9
+
+
+class TestBookClassDomain_Hedged:
+    def setup_method(self):
+        palinsesto_cache.clear()
+        session_cache.clear()
+
+    def test_duplicates_never_fail_the_booking(self):
+        with FakeRebornServer(latency_secs=0.1) as server:
+            with override_settings(
+                settings,
+                REBORN_BASE_URL=server.base_url,
+                IS_HEDGED_BOOKING_ENABLED=True,
+                HEDGED_BOOKING_MIN_SAMPLES=1000,
+                HEDGED_BOOKING_DEFAULT_DELAY_SECS=0,
+                HEDGED_BOOKING_MIN_DELAY_SECS=0.01,
+            ):
+                domain = BookClassDomain(
+                    username="rossi@gmail.com", http_session=make_http_session()
+                )
+                response, day_date = domain.book_next_calisthenics_class()
+        assert server.n_requests_by_endpoint["prenotazione_new"] == 2
+        # Duplicates included.
+        assert domain.client.n_requests == sum(server.n_requests_by_endpoint.values())
+        assert day_date == datetime_utils.now().date() + timedelta(days=1)
+        assert server.bookings[("700000", day_date.isoformat())] == ["rossi@gmail.com"]
@@ -0,0 +1,45 @@
+from reborn_automator.clients.latency_tracker import LatencyTracker, get_endpoint
+from reborn_automator.clients.reborn_api_client import (
+    RebornApiClient,
+    make_http_session,
+)
+from reborn_automator.conf import settings
+from reborn_automator.utils.testutils.fake_reborn_server import FakeRebornServer
+from reborn_automator.utils.testutils.settings_testutils import override_settings
+
+
+class TestLatencyTracker:
+    def setup_method(self):
+        self.tracker = LatencyTracker(max_samples=10)
+
+    def test_percentile(self):
+        for i in range(1, 11):
+            self.tracker.add_sample("prenotazione_new", i / 10)
+        assert self.tracker.get_percentile("prenotazione_new", 50) == 0.5
+        assert self.tracker.get_percentile("prenotazione_new", 95) == 1.0
+        assert self.tracker.get_percentile("prenotazione_new", 0) == 0.1
+        assert self.tracker.get_percentile("loginApp", 50) is None
+        assert (
+            self.tracker.get_percentile("prenotazione_new", 50, min_samples=11) is None
+        )
+
+    def test_rolling(self):
+        for i in range(20):
+            self.tracker.add_sample("prenotazione_new", i)
+        assert self.tracker.get_percentile("prenotazione_new", 0) == 10
+
+    def test_get_endpoint(self):
+        assert (
+            get_endpoint("https://reborn.shaggyowl.com/funzioniapp/v407/loginApp/")
+            == "loginApp"
+        )
+
+    def test_observe_responses(self):
+        session = make_http_session()
+        session.hooks["response"] = [self.tracker.observe]
+        with FakeRebornServer(latency_secs=0.05) as server:
+            with override_settings(settings, REBORN_BASE_URL=server.base_url):
+                client = RebornApiClient(http_session=session)
+                client.login("rossi@gmail.com", "pass")
+        assert self.tracker.get_percentile("loginApp", 50) >= 0.05
+        assert self.tracker.get_percentile("palinsesti", 50) is None
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+from reborn_automator.clients.palinsesto_stream_parser import (
+    IncompletePalinsesto,
+    PalinsestoStreamParser,
+)
+
+DATA = {
+    "status": 2,
+    "messaggio": "Tutto bene",
+    "parametri": {
+        "lista_risultati": [
+            {
+                "id_palinsesti": "47",
+                "nome_palinsesto": "Lezioni Collettive",
+                "note": 'Tricky "quotes", {braces} and [brackets] in strings\\\\',
+                "tagsc": [],
+                "giorni": [
+                    {
+                        "orari_giorno": [
+                            {
+                                "id_orario_palinsesto": "758744",
+                                "orario_inizio": "20:00",
+                                "orario_fine": "21:00",
+                                "nome_corso": "Calisthenics",
+                                "path_img_corso": "https://storage.shaggyowl.com/x.png",
+                                "staff": {"principali": [{"nome": "Matteo Artina"}]},
+                                "nome_staff": "Matteo Artina",
+                                "prenotazioni": {
+                                    "numero_posti_disponibili": "0",
+                                    "numero_posti_occupati": "16",
+                                    "id_disponibilita": "0",
+                                },
+                            }
+                        ],
+                        "nome_giorno": "Venerdì 25/10/2024",
+                        "giorno": "2024-10-25",
+                    },
+                    {"orari_giorno": [], "giorno": "2024-10-26"},
+                ],
+            },
+            {
+                "nome_palinsesto": "Open Gym",
+                "giorni": [{"orari_giorno": [], "giorno": "2024-10-25"}],
+            },
+        ]
+    },
+}
+
+
+def parse(body: bytes, chunk_size: int) -> tuple[PalinsestoStreamParser, list]:
+    parser = PalinsestoStreamParser()
+    days = list()
+    for i in range(0, len(body), chunk_size):
+        days.extend(parser.feed(body[i : i + chunk_size]))
+    parser.close()
+    return parser, days
+
+
+class TestPalinsestoStreamParser:
+    @pytest.mark.parametrize("chunk_size", [1, 3, 64, 100_000])
+    def test_happy_flow(self, chunk_size):
+        body = json.dumps(DATA, ensure_ascii=False, indent=2).encode()
+        parser, days = parse(body, chunk_size)
+        assert parser.status == 2
+        assert days == [
+            (
+                "Lezioni Collettive",
+                {
+                    "giorno": "2024-10-25",
+                    "orari_giorno": [
+                        {
+                            "id_orario_palinsesto": "758744",
+                            "nome_corso": "Calisthenics",
+                            "orario_inizio": "20:00",
+                            "orario_fine": "21:00",
+                            "nome_staff": "Matteo Artina",
+                            "prenotazioni": {
+                                "numero_posti_disponibili": "0",
+                                "numero_posti_occupati": "16",
+                            },
+                        }
+                    ],
+                },
+            ),
+            ("Lezioni Collettive", {"giorno": "2024-10-26", "orari_giorno": []}),
+            ("Open Gym", {"giorno": "2024-10-25", "orari_giorno": []}),
+        ]
+
+    def test_invalid_session(self):
+        body = b'{"status": 1, "messaggio": "Sessione non valida.", "parametri": {}}'
+        parser, days = parse(body, 5)
+        assert parser.status == 1
+        assert days == []
+
+    def test_incomplete(self):
+        body = json.dumps(DATA).encode()[:-10]
+        with pytest.raises(IncompletePalinsesto):
+            parse(body, 64)
@@ -1,9 +1,32 @@
+import asyncio
+import time
+
 import pytest
 
-from reborn_automator.clients.reborn_api_client import AuthError, RebornApiClient
+from reborn_automator.clients.reborn_api_client import (
+    AsyncRebornApiClient,
+    AuthError,
+    RebornApiClient,
+    get_shared_http_session,
+    make_http_session,
+)
 from reborn_automator.conf import settings
 
 
+class TestRebornApiClientHttpSession:
+    def test_shared_by_default(self):
+        assert RebornApiClient().http_session is get_shared_http_session()
+        assert RebornApiClient().http_session is RebornApiClient().http_session
+
+    def test_custom(self):
+        http_session = make_http_session(pool_size=2)
+        client = RebornApiClient(http_session=http_session)
+        assert client.http_session is http_session
+        adapter = http_session.get_adapter("https://reborn.shaggyowl.com")
+        assert adapter._pool_maxsize == 2
+        assert http_session.headers["accept-encoding"] == "gzip"
+
+
 class TestRebornApiClientLogin:
     def test_happy_flow(self):
         client = RebornApiClient()
@@ -51,3 +74,35 @@ class TestRebornApiClientBookClass:
     def test_class_id_does_not_exist(self):
         response = self.client.book_class(99, "2024-10-30")
         assert response
+
+
+class TestAsyncRebornApiClient:
+    def test_happy_flow(self):
+        async def run():
+            client = AsyncRebornApiClient()
+            await client.login(
+                settings.REBORN_CREDS_USERNAME, settings.REBORN_CREDS_PASSWORD
+            )
+            assert client.session_id
+            return await client.get_palinsesto()
+
+        palinsesto = asyncio.run(run())
+        assert palinsesto
+
+    def test_gather(self):
+        def get_palinsesto(sede_id):
+            time.sleep(0.2)
+            return {"id_sede": sede_id}
+
+        async def run():
+            client = AsyncRebornApiClient()
+            client.client.get_palinsesto = get_palinsesto
+            return await asyncio.gather(
+                client.get_palinsesto(47), client.get_palinsesto(48)
+            )
+
+        start = time.perf_counter()
+        palinsesti = asyncio.run(run())
+        assert palinsesti == [{"id_sede": 47}, {"id_sede": 48}]
+        # Concurrent, not sequential.
+        assert time.perf_counter() - start < 0.35
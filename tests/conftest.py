@@ -54,6 +54,49 @@ def test_settings_fixture(monkeypatch, request):
         setattr(settings, attr_name, attr_value)
 
 
+@pytest.fixture(autouse=True, scope="function")
+def reset_shared_http_session():
+    """
+    The shared HTTP session keeps its connections alive across tests, but each test
+     plays its own VCR cassette: so start every test with a new session.
+    """
+    from reborn_automator.clients import reborn_api_client
+
+    reborn_api_client.get_shared_http_session.cache_clear()
+    yield
+    reborn_api_client.get_shared_http_session().close()
+    reborn_api_client.get_shared_http_session.cache_clear()
+
+
+@pytest.fixture
+def tmp_cache(tmp_path) -> Iterator:
+    """
+    Enable the caches in /tmp (see `TmpCache`) in a dir of the test, starting and
+     ending with empty shared caches.
+    Opt in with `@pytest.mark.usefixtures("tmp_cache")`, or as an argument of
+     another fixture. It yields the dir.
+    """
+    from reborn_automator.domains.book_class_domain import (
+        palinsesto_cache,
+        session_cache,
+        snapshot_store,
+    )
+    from reborn_automator.domains.seat_availability_domain import availability_cache
+    from reborn_automator.utils.testutils.settings_testutils import override_settings
+
+    caches = (availability_cache, palinsesto_cache, session_cache)
+    with override_settings(
+        settings, IS_TMP_CACHE_ENABLED=True, TMP_CACHE_DIR=str(tmp_path)
+    ):
+        for cache in caches:
+            cache.clear()
+        yield tmp_path
+        for cache in caches:
+            cache.clear()
+        snapshot_store.flush()
+        snapshot_store.close()
+
+
 @pytest.fixture(autouse=True, scope="function")
 def logging_mock(request):
     """
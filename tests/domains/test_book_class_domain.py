@@ -1,13 +1,29 @@
-from datetime import datetime, timedelta
+import threading
+from datetime import date, datetime, time, timedelta, timezone
+from unittest import mock
 
 import pytest
 
+from reborn_automator.clients.clock_skew_estimator import (
+    SkewEstimate,
+    clock_skew_estimator,
+)
+from reborn_automator.clients.reborn_api_client import BOOKING_FAILED_MESSAGE
+from reborn_automator.conf import settings
 from reborn_automator.domains.book_class_domain import (
+    WINDOW_NOT_OPEN_MESSAGE,
     BookClassDomain,
+    ClassTarget,
     FailedBooking,
     NoClassFoundInPalinsesto,
+    palinsesto_cache,
+    session_cache,
 )
+from reborn_automator.domains.palinsesto_model import Palinsesto, PalinsestoClass
+from reborn_automator.utils import datetime_utils
 from reborn_automator.utils.testutils import datetime_testutils
+from reborn_automator.utils.testutils.fake_reborn_server import FakeRebornServer
+from reborn_automator.utils.testutils.settings_testutils import override_settings
 
 frozen_date1 = datetime(2024, 10, 25, 11, 0, 0).astimezone()
 frozen_date2 = datetime(2025, 10, 19, 11, 0, 0).astimezone()
@@ -71,3 +87,329 @@ class TestBookClassDomain_BookNextPowerliftingClass:
         with pytest.raises(NoClassFoundInPalinsesto) as exc:
             BookClassDomain().book_next_powerlifting_class()
         assert exc.value.class_name == "Powerlifting"
+
+
+@pytest.mark.usefixtures("tmp_cache")
+class TestBookClassDomain_SessionCache:
+    @datetime_testutils.freeze_time(frozen_date1)
+    def test_cached_session(self):
+        # No login request in the cassette.
+        session_cache.set(settings.REBORN_CREDS_USERNAME, "XXX")
+        domain = BookClassDomain()
+        klass_id, _, _ = domain.get_next_calisthenics_class()
+        assert klass_id
+        assert domain.client.session_id == "XXX"
+
+    @datetime_testutils.freeze_time(frozen_date1)
+    def test_cached_session_rejected(self):
+        # Note: I built the rejected palinsesto response in the cassette, it's not
+        #  a real one.
+        session_cache.set(settings.REBORN_CREDS_USERNAME, "XXX")
+        domain = BookClassDomain()
+        klass_id, _, _ = domain.get_next_calisthenics_class()
+        assert klass_id
+        assert domain.client.session_id != "XXX"
+        assert session_cache.get(settings.REBORN_CREDS_USERNAME) != "XXX"
+
+
+class TestBookClassDomain_CachedSessionExpired:
+    @pytest.fixture(autouse=True)
+    def server(self, tmp_cache):
+        with FakeRebornServer() as self.server:
+            with override_settings(settings, REBORN_BASE_URL=self.server.base_url):
+                yield
+
+    def test_login_again_when_booking(self):
+        # Both the session and the palinsesto cached.
+        BookClassDomain().get_palinsesto()
+        # The cached session expires.
+        self.server.sessions.clear()
+
+        results = BookClassDomain().book_classes([ClassTarget("Calisthenics")])
+        assert results[0].is_booked
+        assert self.server.n_requests_by_endpoint["loginApp"] == 2
+        # The fetch and the check of the session.
+        assert self.server.n_requests_by_endpoint["palinsesti"] == 2
+        assert self.server.n_requests_by_endpoint["prenotazione_new"] == 2
+
+    def test_class_does_not_exist(self):
+        # The same answer as to an expired session, but the session is valid: no
+        #  new login.
+        domain = BookClassDomain()
+        domain.get_palinsesto()
+        domain = BookClassDomain()
+        data = domain._send_booking(99, dict(), datetime_utils.now().date())
+        assert data["messaggio"] == BOOKING_FAILED_MESSAGE
+        assert self.server.n_requests_by_endpoint["loginApp"] == 1
+        assert self.server.n_requests_by_endpoint["prenotazione_new"] == 1
+
+    def test_rejected_again(self):
+        BookClassDomain().get_palinsesto()
+        self.server.sessions.clear()
+        # A fresh session is rejected too.
+        self.server.sessions = mock.MagicMock(get=mock.Mock(return_value=None))
+
+        results = BookClassDomain().book_classes([ClassTarget("Calisthenics")])
+        assert isinstance(results[0].exception, FailedBooking)
+        assert self.server.n_requests_by_endpoint["prenotazione_new"] == 2
+
+
+@pytest.mark.usefixtures("tmp_cache")
+class TestBookClassDomain_PalinsestoCache:
+    @datetime_testutils.freeze_time(frozen_date1)
+    def test_happy_flow(self):
+        # Only 1 login and 1 palinsesto request in the cassette.
+        klass_id, _, _ = BookClassDomain().get_next_calisthenics_class()
+        domain = BookClassDomain()
+        assert domain.get_next_calisthenics_class()[0] == klass_id
+        # Parsed only once.
+        assert domain.get_palinsesto() is palinsesto_cache.get_palinsesto(
+            settings.REBORN_CREDS_USERNAME, domain.sede_id
+        )
+
+    @datetime_testutils.freeze_time(frozen_date1)
+    def test_invalidated_after_booking(self):
+        domain = BookClassDomain()
+        domain._login = mock.Mock()
+        domain.client.book_class = mock.Mock(return_value={"status": 2})
+        palinsesto_cache.set(domain.username, domain.sede_id, {"status": 2})
+        domain._palinsesto = Palinsesto(
+            [
+                PalinsestoClass.from_data(
+                    {"id_orario_palinsesto": "1", "nome_corso": "Calisthenics"},
+                    date(2024, 10, 28),
+                )
+            ]
+        )
+        domain.book_next_calisthenics_class()
+        assert palinsesto_cache.get(domain.username, domain.sede_id) is None
+
+
+class TestBookClassDomain_Sniper:
+    def setup_method(self):
+        self.domain = BookClassDomain()
+        self.klass = {
+            "id_orario_palinsesto": "758744",
+            "nome_corso": "Calisthenics",
+            "orario_inizio": "20:00",
+        }
+        self.day_date = date(2024, 10, 28)
+        self.domain._login = mock.Mock()
+        self.domain._palinsesto = Palinsesto(
+            [PalinsestoClass.from_data(self.klass, self.day_date)]
+        )
+        self.domain.client.book_class = mock.Mock()
+        self.not_open = {"status": 1, "messaggio": WINDOW_NOT_OPEN_MESSAGE}
+        self.booked = {"status": 2, "messaggio": "Prenotazione effettuata."}
+
+    def test_booking_window_opens_at(self):
+        # Saturday 20:00 in Rome (summer time) for a Monday 20:00 class.
+        assert self.domain.get_booking_window_opens_at(
+            self.klass, self.day_date
+        ) == datetime(2024, 10, 26, 18, 0, 0, tzinfo=timezone.utc)
+        # Winter time.
+        assert self.domain.get_booking_window_opens_at(
+            self.klass, date(2024, 11, 4)
+        ) == datetime(2024, 11, 2, 19, 0, 0, tzinfo=timezone.utc)
+
+    @datetime_testutils.freeze_time(
+        datetime(2024, 10, 26, 18, 0, 0, tzinfo=timezone.utc)
+    )
+    @mock.patch("time.sleep")
+    def test_retry_until_booked(self, sleep_mock):
+        self.domain.client.book_class.side_effect = [
+            self.not_open,
+            self.not_open,
+            self.booked,
+        ]
+        response, day_date = self.domain.book_next_calisthenics_class(is_sniper=True)
+        assert response == self.booked
+        assert day_date == self.day_date
+        assert self.domain.client.book_class.call_count == 3
+
+    @datetime_testutils.freeze_time(
+        datetime(2024, 10, 26, 18, 0, 0, tzinfo=timezone.utc)
+    )
+    @mock.patch("time.sleep")
+    def test_deadline_reached(self, sleep_mock):
+        self.domain.client.book_class.return_value = self.not_open
+        with override_settings(settings, SNIPER_DEADLINE_SECS=0):
+            with pytest.raises(FailedBooking) as exc:
+                self.domain.book_next_calisthenics_class(is_sniper=True)
+        assert exc.value.response == self.not_open
+        assert self.domain.client.book_class.call_count == 1
+
+    @datetime_testutils.freeze_time(
+        datetime(2024, 10, 26, 17, 59, 50, tzinfo=timezone.utc)
+    )
+    @mock.patch("time.monotonic", return_value=100)
+    @mock.patch("reborn_automator.domains.book_class_domain._sleep_until")
+    def test_aims_at_server_clock(self, sleep_until_mock, monotonic_mock):
+        self.domain.client.book_class.return_value = self.booked
+        # The window opens in 10 secs on the local clock.
+        self.domain.book_next_calisthenics_class(is_sniper=True)
+        sleep_until_mock.assert_called_once_with(110)
+
+        # But the server clock is 10 secs ahead: it is open already.
+        skew = SkewEstimate(
+            offset_secs=10, uncertainty_secs=0.1, min_rtt_secs=0.05, n_samples=3
+        )
+        with override_settings(settings, IS_CLOCK_SKEW_CORRECTION_ENABLED=True):
+            with mock.patch.object(
+                clock_skew_estimator, "get_estimate", return_value=skew
+            ):
+                self.domain.book_next_calisthenics_class(is_sniper=True)
+        sleep_until_mock.assert_called_with(100)
+
+    @datetime_testutils.freeze_time(
+        datetime(2024, 10, 26, 17, 59, 50, tzinfo=timezone.utc)
+    )
+    @mock.patch("time.monotonic", return_value=100)
+    @mock.patch("reborn_automator.domains.book_class_domain.prewarm_connections")
+    @mock.patch("reborn_automator.domains.book_class_domain._sleep_until")
+    def test_prewarm_before_firing(
+        self, sleep_until_mock, prewarm_mock, monotonic_mock
+    ):
+        self.domain.client.book_class.return_value = self.booked
+        with override_settings(settings, IS_CONNECTION_PREWARM_ENABLED=True):
+            self.domain.book_next_calisthenics_class(is_sniper=True)
+        assert [c.args[0] for c in sleep_until_mock.call_args_list] == [
+            110 - settings.PREWARM_BEFORE_FIRE_SECS,
+            110 - settings.PREWARM_CHECK_BEFORE_FIRE_SECS,
+            110,
+        ]
+        # Pre-warmed, then checked.
+        assert prewarm_mock.call_count == 2
+
+    @datetime_testutils.freeze_time(
+        datetime(2024, 10, 26, 18, 0, 0, tzinfo=timezone.utc)
+    )
+    @mock.patch("time.sleep")
+    def test_other_failures_are_not_retried(self, sleep_mock):
+        no_subscription = {"status": 1, "messaggio": "Non hai abbonamenti attivi"}
+        self.domain.client.book_class.return_value = no_subscription
+        with pytest.raises(FailedBooking):
+            self.domain.book_next_calisthenics_class(is_sniper=True)
+        assert self.domain.client.book_class.call_count == 1
+
+
+@pytest.mark.novcr
+class TestBookClassDomain_SniperPrewarm:
+    @pytest.fixture(autouse=True)
+    def server(self):
+        # The booking windows are open.
+        with FakeRebornServer() as self.server:
+            with override_settings(
+                settings,
+                REBORN_BASE_URL=self.server.base_url,
+                IS_CONNECTION_PREWARM_ENABLED=True,
+            ):
+                yield
+
+    def test_more_targets_than_workers(self):
+        # Each sniper runs in the shared executor and pre-warms: that must not wait
+        #  for work queued in the same (full) executor.
+        classes = Palinsesto.from_response(self.server.palinsesto).classes
+        targets = [
+            ClassTarget(k.course_name, day_date=k.day_date, start_time=k.start_time)
+            for k in classes[: settings.ASYNC_IO_MAX_WORKERS + 2]
+        ]
+        results = list()
+        thread = threading.Thread(
+            target=lambda: results.extend(
+                BookClassDomain().book_classes(targets, is_sniper=True)
+            ),
+            daemon=True,
+        )
+        thread.start()
+        thread.join(timeout=10)
+
+        assert not thread.is_alive(), "Deadlocked"
+        assert [r.is_booked for r in results] == [True] * len(targets)
+
+
+class TestBookClassDomain_BookClasses:
+    def setup_method(self):
+        self.domain = BookClassDomain()
+        self.domain._login = mock.Mock()
+        self.domain._palinsesto = Palinsesto(
+            [
+                PalinsestoClass.from_data(
+                    {
+                        "id_orario_palinsesto": "1",
+                        "nome_corso": "Calisthenics",
+                        "orario_inizio": "20:00",
+                    },
+                    date(2024, 10, 28),
+                ),
+                PalinsestoClass.from_data(
+                    {
+                        "id_orario_palinsesto": "2",
+                        "nome_corso": "Calisthenics",
+                        "orario_inizio": "20:00",
+                    },
+                    date(2024, 10, 30),
+                ),
+                PalinsestoClass.from_data(
+                    {
+                        "id_orario_palinsesto": "3",
+                        "nome_corso": "Powerlifting",
+                        "orario_inizio": "19:00",
+                    },
+                    date(2024, 10, 29),
+                ),
+            ]
+        )
+        self.domain.client.book_class = mock.Mock(
+            side_effect=lambda class_id, day, sede_id: (
+                {"status": 2, "messaggio": "OK"}
+                if class_id != "3"
+                else {"status": 1, "messaggio": "Non hai abbonamenti attivi"}
+            )
+        )
+
+    @datetime_testutils.freeze_time(frozen_date1)
+    def test_happy_flow(self):
+        results = self.domain.book_classes(
+            [
+                ClassTarget("Calisthenics"),
+                ClassTarget("Calisthenics", day_date=date(2024, 10, 30)),
+                ClassTarget("Powerlifting", start_time=time(19, 0)),
+                ClassTarget("Yoga"),
+            ]
+        )
+        assert [r.class_id for r in results] == ["1", "2", "3", None]
+        assert [r.is_booked for r in results] == [True, True, False, False]
+        assert isinstance(results[2].exception, FailedBooking)
+        assert isinstance(results[3].exception, NoClassFoundInPalinsesto)
+        assert self.domain.client.book_class.call_count == 3
+
+    @datetime_testutils.freeze_time(frozen_date1)
+    def test_start_time_not_found(self):
+        results = self.domain.book_classes(
+            [ClassTarget("Calisthenics", start_time=time(7, 0))]
+        )
+        assert isinstance(results[0].exception, NoClassFoundInPalinsesto)
+        self.domain.client.book_class.assert_not_called()
+
+
+class TestBookClassDomain_Streaming:
+    @pytest.fixture(autouse=True)
+    def streaming(self):
+        with override_settings(settings, IS_PALINSESTO_STREAMING_ENABLED=True):
+            yield
+
+    @datetime_testutils.freeze_time(frozen_date1)
+    def test_get_next_calisthenics_class(self):
+        klass_id, klass, day = BookClassDomain().get_next_calisthenics_class()
+        assert klass_id
+        assert klass["nome_corso"] == "Calisthenics"
+        assert "prenotazioni" in klass
+        # Only the fields used by the domain.
+        assert "path_img_corso" not in klass
+        assert day == date(2024, 10, 30)
+
+    @datetime_testutils.freeze_time(frozen_date1 + timedelta(days=5))
+    def test_no_calisthenics_class_found_in_palinsesto(self):
+        with pytest.raises(NoClassFoundInPalinsesto):
+            BookClassDomain().get_next_calisthenics_class()
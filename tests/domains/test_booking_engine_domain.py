@@ -0,0 +1,65 @@
+from datetime import date, datetime
+from unittest import mock
+
+from reborn_automator.clients.reborn_api_client import AuthError, RebornApiClient
+from reborn_automator.domains.book_class_domain import BookClassDomain, ClassTarget
+from reborn_automator.domains.booking_engine_domain import Account, BookingEngine
+from reborn_automator.domains.palinsesto_model import Palinsesto, PalinsestoClass
+from reborn_automator.utils.testutils import datetime_testutils
+
+frozen_date1 = datetime(2024, 10, 25, 11, 0, 0).astimezone()
+
+
+def get_palinsesto(domain: BookClassDomain):
+    if domain.username == "wrong":
+        raise AuthError({})
+    return Palinsesto(
+        [
+            PalinsestoClass.from_data(
+                {"id_orario_palinsesto": "1", "nome_corso": "Calisthenics"},
+                date(2024, 10, 28),
+            ),
+            PalinsestoClass.from_data(
+                {"id_orario_palinsesto": "2", "nome_corso": "Powerlifting"},
+                date(2024, 10, 29),
+            ),
+        ]
+    )
+
+
+class TestBookingEngine:
+    @datetime_testutils.freeze_time(frozen_date1)
+    @mock.patch.object(
+        RebornApiClient, "book_class", return_value={"status": 2, "messaggio": "OK"}
+    )
+    @mock.patch.object(
+        BookClassDomain, "get_palinsesto", autospec=True, side_effect=get_palinsesto
+    )
+    @mock.patch.object(BookClassDomain, "_login")
+    @mock.patch("requests.Session.close", autospec=True)
+    def test_happy_flow(
+        self, close_mock, login_mock, get_palinsesto_mock, book_class_mock
+    ):
+        accounts = [
+            Account(
+                "rossi", "pass1", [ClassTarget("Calisthenics"), ClassTarget("Yoga")]
+            ),
+            Account("wrong", "pass2", [ClassTarget("Calisthenics")]),
+            Account("bianchi", "pass3", [ClassTarget("Powerlifting")]),
+        ]
+        reports = BookingEngine(max_workers=4).run(accounts)
+
+        assert [r.username for r in reports] == ["rossi", "wrong", "bianchi"]
+        assert reports[0].n_booked == 1
+        assert [r.class_id for r in reports[0].results] == ["1", None]
+        assert isinstance(reports[1].exception, AuthError)
+        assert reports[1].booking_secs is None
+        assert reports[2].n_booked == 1
+        assert reports[2].prepare_secs is not None
+        assert reports[2].booking_secs is not None
+        assert book_class_mock.call_count == 2
+        # Each account's session is closed, even when its preparation failed.
+        assert close_mock.call_count == 3
+
+    def test_password_not_in_repr(self):
+        assert "secret" not in repr(Account("rossi", "secret", []))
@@ -0,0 +1,104 @@
+from datetime import time, timedelta
+
+import pytest
+
+from reborn_automator.clients.reborn_api_client import AuthError
+from reborn_automator.conf import settings
+from reborn_automator.domains.book_class_domain import NoClassFoundInPalinsesto
+from reborn_automator.domains.booking_rules_domain import (
+    BookingRule,
+    BookingRulesDomain,
+    InvalidBookingRule,
+    UnknownBookingRule,
+    get_rules,
+)
+from reborn_automator.utils import datetime_utils
+from reborn_automator.utils.testutils.fake_reborn_server import FakeRebornServer
+from reborn_automator.utils.testutils.reborn_testfactories.palinsesto_factory import (
+    PalinsestoFactory,
+)
+from reborn_automator.utils.testutils.settings_testutils import override_settings
+
+
+class TestGetRules:
+    def test_happy_flow(self):
+        with override_settings(
+            settings,
+            BOOKING_RULES={
+                "cali-mon": dict(
+                    course_name="Calisthenics", weekday=0, start_time="20:00"
+                ),
+                "power": dict(course_name="Powerlifting", instructor="Matteo Artina"),
+            },
+        ):
+            rules = get_rules(["power", "cali-mon"])
+        assert rules == [
+            BookingRule("power", "Powerlifting", instructor="Matteo Artina"),
+            BookingRule("cali-mon", "Calisthenics", weekday=0, start_time=time(20, 0)),
+        ]
+
+    def test_unknown_rule(self):
+        with pytest.raises(UnknownBookingRule) as exc:
+            get_rules(["cali", "XXX"])
+        assert exc.value.rule_id == "XXX"
+
+    @pytest.mark.parametrize(
+        "config",
+        [
+            dict(course_name="Calisthenics", weekday=7),
+            dict(course_name="Calisthenics", start_time="25:00"),
+            dict(course_name="Calisthenics", XXX=1),
+            dict(weekday=1),
+        ],
+    )
+    def test_invalid_rule(self, config):
+        with override_settings(settings, BOOKING_RULES={"cali": config}):
+            with pytest.raises(InvalidBookingRule) as exc:
+                get_rules(["cali"])
+        assert exc.value.rule_id == "cali"
+
+
+class TestBookingRulesDomain:
+    @pytest.fixture(autouse=True)
+    def server(self):
+        self.start_day = datetime_utils.now().date() + timedelta(days=1)
+        # Courses in turn: day 0 starts with Calisthenics, day 1 with Powerlifting...
+        palinsesto = PalinsestoFactory.make(
+            self.start_day, n_days=7, n_classes_per_day=4
+        )
+        with FakeRebornServer(palinsesto=palinsesto) as self.server:
+            with override_settings(settings, REBORN_BASE_URL=self.server.base_url):
+                yield
+
+    def test_happy_flow(self):
+        day = self.start_day + timedelta(days=2)
+        rules = [
+            BookingRule("cali", "Calisthenics"),
+            # Day 2: Functional Fitness, Yoga, Calisthenics at 09:00, Powerlifting.
+            BookingRule("cali-9", "Calisthenics", weekday=day.weekday()),
+            BookingRule("yoga-8", "Yoga", start_time=time(8, 0)),
+            BookingRule("zumba", "Zumba"),
+        ]
+        results = BookingRulesDomain().book(rules)
+
+        assert [rule for rule, _ in results] == rules
+        cali, cali_9, yoga_8, zumba = (result for _, result in results)
+        assert cali.is_booked
+        assert (cali.day_date, cali.class_id) == (self.start_day, "700000")
+        assert cali_9.is_booked
+        assert (cali_9.day_date, cali_9.class_id) == (day, "700010")
+        assert yoga_8.is_booked
+        assert yoga_8.day_date == self.start_day + timedelta(days=2)
+        assert isinstance(zumba.exception, NoClassFoundInPalinsesto)
+        # A single login and a single palinsesto fetch for all the rules.
+        assert self.server.n_requests_by_endpoint == {
+            "loginApp": 1,
+            "palinsesti": 1,
+            "prenotazione_new": 3,
+        }
+
+    def test_auth_error(self):
+        self.server.passwords = {}
+        rules = [BookingRule("cali", "Calisthenics"), BookingRule("yoga", "Yoga")]
+        results = BookingRulesDomain().book(rules)
+        assert all(isinstance(r.exception, AuthError) for _, r in results)
@@ -0,0 +1,124 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+
+from reborn_automator.conf import settings
+from reborn_automator.domains.palinsesto_cache import (
+    PalinsestoCache,
+    compute_content_hash,
+)
+from reborn_automator.utils.testutils.settings_testutils import override_settings
+
+
+def make_response(id_orario: str = "1") -> dict:
+    return {
+        "status": 2,
+        "parametri": {
+            "lista_risultati": [
+                {
+                    "nome_palinsesto": "Lezioni Collettive",
+                    "giorni": [
+                        {
+                            "orari_giorno": [
+                                {
+                                    "id_orario_palinsesto": id_orario,
+                                    "nome_corso": "Calisthenics",
+                                    "orario_inizio": "20:00",
+                                }
+                            ],
+                            "giorno": "2024-10-28",
+                        }
+                    ],
+                }
+            ]
+        },
+    }
+
+
+@pytest.mark.usefixtures("tmp_cache")
+class TestPalinsestoCache:
+    def setup_method(self):
+        self.cache = PalinsestoCache(ttl_secs=60)
+
+    def test_happy_flow(self):
+        assert self.cache.get("user", 47) is None
+        assert self.cache.set("user", 47, make_response())
+        assert self.cache.get("user", 47) == make_response()
+        # Keyed by user and sede.
+        assert self.cache.get("user", 48) is None
+        assert self.cache.get("other", 47) is None
+        # A new instance simulates a new process in the same execution environment.
+        assert PalinsestoCache(ttl_secs=60).get("user", 47) == make_response()
+
+    def test_change_detection(self):
+        content_hash = self.cache.set("user", 47, make_response())
+        assert self.cache.get_content_hash("user", 47) == content_hash
+        assert self.cache.set("user", 47, make_response()) == content_hash
+        assert self.cache.set("user", 47, make_response("2")) != content_hash
+        assert self.cache.get_content_hash("user", 47) != content_hash
+
+    def test_ttl_zero(self):
+        # Not replaced by the default.
+        assert PalinsestoCache(ttl_secs=0).ttl_secs == 0
+
+    @mock.patch(
+        "reborn_automator.domains.palinsesto_cache.compute_content_hash",
+        wraps=compute_content_hash,
+    )
+    def test_hashed_once(self, compute_content_hash_mock):
+        content_hash = self.cache.set("user", 47, make_response())
+        self.cache.parse(make_response(), content_hash)
+        self.cache.get_palinsesto("user", 47)
+        assert compute_content_hash_mock.call_count == 1
+
+    def test_parsed_once_per_content(self):
+        self.cache.set("user", 47, make_response())
+        palinsesto = self.cache.get_palinsesto("user", 47)
+        assert len(palinsesto) == 1
+        assert self.cache.get_palinsesto("user", 47) is palinsesto
+        assert self.cache.parse(make_response()) is palinsesto
+        assert self.cache.parse(make_response("2")) is not palinsesto
+
+    def test_max_parsed(self):
+        cache = PalinsestoCache(max_parsed=2)
+        palinsesto = cache.parse(make_response("1"))
+        cache.parse(make_response("2"))
+        cache.parse(make_response("3"))
+        assert len(cache._parsed) == 2
+        assert cache.parse(make_response("1")) is not palinsesto
+
+    def test_concurrent_parse(self):
+        cache = PalinsestoCache(max_parsed=2)
+        responses = [make_response(str(i)) for i in range(10)]
+        hashes = [compute_content_hash(data) for data in responses]
+        switch_interval = sys.getswitchinterval()
+        # Switch threads as often as possible, to interleave the evictions.
+        sys.setswitchinterval(1e-6)
+        try:
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                results = list(
+                    executor.map(
+                        lambda i: cache.parse(responses[i % 10], hashes[i % 10]),
+                        range(2000),
+                    )
+                )
+        finally:
+            sys.setswitchinterval(switch_interval)
+        assert len(results) == 2000
+        assert len(cache._parsed) == 2
+
+    def test_invalidate(self):
+        self.cache.set("user", 47, make_response())
+        self.cache.invalidate("user", 47)
+        assert self.cache.get("user", 47) is None
+        assert self.cache.get_palinsesto("user", 47) is None
+
+    def test_disabled(self):
+        with override_settings(settings, IS_TMP_CACHE_ENABLED=False):
+            self.cache.set("user", 47, make_response())
+            assert self.cache.get("user", 47) is None
+            assert self.cache.parse(make_response()) is not self.cache.parse(
+                make_response()
+            )
@@ -0,0 +1,121 @@
+from datetime import date, time
+
+import pytest
+
+from reborn_automator.domains.palinsesto_model import (
+    MissingDay,
+    Palinsesto,
+    PalinsestoClass,
+)
+
+
+def make_class(id, course_name, start, instructor="Matteo Artina"):
+    return {
+        "id_orario_palinsesto": id,
+        "nome_corso": course_name,
+        "orario_inizio": start,
+        "orario_fine": start.replace(":00", ":59"),
+        "nome_staff": instructor,
+    }
+
+
+def make_palinsesto_response(giorni: list, other_giorni: list | None = None):
+    return {
+        "status": 2,
+        "messaggio": "Tutto bene",
+        "parametri": {
+            "lista_risultati": [
+                {"nome_palinsesto": "Lezioni Collettive", "giorni": giorni},
+                {"nome_palinsesto": "Open Gym", "giorni": other_giorni or []},
+            ]
+        },
+    }
+
+
+class TestPalinsesto:
+    def setup_method(self):
+        self.data = make_palinsesto_response(
+            [
+                {
+                    "giorno": "2024-10-25",
+                    "orari_giorno": [
+                        make_class("1", "Calisthenics", "20:00"),
+                        make_class("2", "Powerlifting", "19:00", "Mario Rossi"),
+                    ],
+                },
+                {"giorno": "2024-10-26", "orari_giorno": []},
+                {
+                    "giorno": "2024-10-28",
+                    "orari_giorno": [
+                        make_class("3", "Calisthenics", "20:00"),
+                        make_class("4", "Calisthenics", "21:00"),
+                    ],
+                },
+            ],
+            other_giorni=[
+                {
+                    "giorno": "2024-10-26",
+                    "orari_giorno": [make_class("5", "Calisthenics", "10:00")],
+                }
+            ],
+        )
+        self.palinsesto = Palinsesto.from_response(self.data)
+
+    def test_only_lezioni_collettive(self):
+        assert len(self.palinsesto) == 4
+        assert [k.id for k in self.palinsesto.classes] == ["1", "2", "3", "4"]
+
+    def test_get_next_class(self):
+        klass = self.palinsesto.get_next_class("Calisthenics", after=date(2024, 10, 24))
+        assert klass.id == "1"
+        assert klass.day_date == date(2024, 10, 25)
+        assert klass.start_time == time(20, 0)
+        assert klass.data["nome_corso"] == "Calisthenics"
+        klass = self.palinsesto.get_next_class("Calisthenics", after=date(2024, 10, 25))
+        assert klass.id == "3"
+        assert not self.palinsesto.get_next_class(
+            "Calisthenics", after=date(2024, 10, 28)
+        )
+        assert not self.palinsesto.get_next_class("Yoga", after=date(2024, 10, 24))
+
+    def test_get_classes(self):
+        classes = self.palinsesto.get_classes("Calisthenics", date(2024, 10, 28))
+        assert [k.id for k in classes] == ["3", "4"]
+        classes = self.palinsesto.get_classes_at(date(2024, 10, 28), time(21, 0))
+        assert [k.id for k in classes] == ["4"]
+        classes = self.palinsesto.get_classes_by_instructor("Mario Rossi")
+        assert [k.id for k in classes] == ["2"]
+
+    def test_missing_day(self):
+        data = make_palinsesto_response([{"orari_giorno": []}])
+        with pytest.raises(MissingDay):
+            Palinsesto.from_response(data)
+
+    def test_slots(self):
+        with pytest.raises(AttributeError):
+            self.palinsesto.classes[0].foo = "bar"
+
+
+class TestPalinsestoClass:
+    def test_seats(self):
+        data = make_class("1", "Calisthenics", "20:00")
+        data["prenotazioni"] = {
+            "numero_posti_disponibili": "2",
+            "numero_utenti_coda": "3",
+            "utente_prenotato": "10992911",
+            "prenota_coda": "2",
+        }
+        klass = PalinsestoClass.from_data(data, date(2024, 10, 25))
+        assert klass.n_free_seats == 2
+        assert klass.n_queued == 3
+        assert klass.is_user_booked
+        assert klass.is_queue_open
+
+    def test_no_prenotazioni(self):
+        klass = PalinsestoClass.from_data(
+            make_class("1", "Calisthenics", "20:00"), date(2024, 10, 25)
+        )
+        assert klass.n_free_seats is None
+        assert klass.n_queued is None
+        assert not klass.is_user_booked
+        assert not klass.is_queue_open
@@ -0,0 +1,298 @@
+import threading
+import time as time_module
+from datetime import date, datetime, time, timedelta, timezone
+from unittest import mock
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from reborn_automator.clients.reborn_api_client import BOOKING_FAILED_MESSAGE
+from reborn_automator.conf import settings
+from reborn_automator.domains.book_class_domain import (
+    WINDOW_NOT_OPEN_MESSAGE,
+    BookClassDomain,
+    ClassTarget,
+    snapshot_store,
+)
+from reborn_automator.domains.palinsesto_model import Palinsesto, PalinsestoClass
+from reborn_automator.domains.palinsesto_snapshot_store import (
+    PalinsestoSnapshotStore,
+    WindowEstimate,
+)
+from reborn_automator.utils import datetime_utils
+from reborn_automator.utils.testutils import datetime_testutils
+from reborn_automator.utils.testutils.fake_reborn_server import FakeRebornServer
+from reborn_automator.utils.testutils.reborn_testfactories.palinsesto_factory import (
+    PalinsestoFactory,
+)
+from reborn_automator.utils.testutils.settings_testutils import override_settings
+
+# A Monday.
+DAY = date(2024, 10, 28)
+# The booking window of the Monday 07:00 Calisthenics class (the first of the day)
+#  opens on Saturday at 07:00 Rome time.
+WINDOW_OPENS_AT = datetime(2024, 10, 26, 5, 0, tzinfo=timezone.utc)
+STARTS_AT = datetime(2024, 10, 28, 7, 0, tzinfo=ZoneInfo("Europe/Rome"))
+NOT_OPEN = {"status": 1, "messaggio": WINDOW_NOT_OPEN_MESSAGE}
+BOOKED = {"status": 2, "messaggio": "Prenotazione effettuata."}
+BOOKING_FAILED = {"status": 1, "messaggio": BOOKING_FAILED_MESSAGE}
+
+
+def make_palinsesto(n_booked: int) -> Palinsesto:
+    data = PalinsestoFactory.make(DAY, n_days=1, n_classes_per_day=2, n_seats=16)
+    klass = data["parametri"]["lista_risultati"][0]["giorni"][0]["orari_giorno"][0]
+    klass.update(
+        PalinsestoFactory.make_class(700000, "Calisthenics", time(7, 0), 16, n_booked)
+    )
+    return Palinsesto.from_response(data)
+
+
+class TestPalinsestoSnapshotStore:
+    @pytest.fixture(autouse=True)
+    def store(self, tmp_path):
+        self.store = PalinsestoSnapshotStore(tmp_path / "snapshots.sqlite3")
+        yield
+        self.store.close()
+
+    def record(self, n_booked: int, secs_after_window: int) -> None:
+        fetched_at = WINDOW_OPENS_AT + timedelta(seconds=secs_after_window)
+        assert self.store.record(47, make_palinsesto(n_booked), fetched_at) == 2
+
+    def test_fill_ups(self):
+        self.record(n_booked=0, secs_after_window=-60)
+        self.record(n_booked=10, secs_after_window=30)
+        self.record(n_booked=16, secs_after_window=90)
+        # A cancellation.
+        self.record(n_booked=15, secs_after_window=3600)
+
+        (fill_up,) = self.store.get_fill_ups(
+            "Calisthenics", since=DAY - timedelta(days=30), until=DAY, weekday=0
+        )
+        assert fill_up.class_id == "700000"
+        assert fill_up.day_date == DAY
+        assert fill_up.start_time == time(7, 0)
+        assert fill_up.last_free_at == WINDOW_OPENS_AT + timedelta(seconds=30)
+        assert fill_up.filled_up_at == WINDOW_OPENS_AT + timedelta(seconds=90)
+        assert fill_up.filled_up_after_window_secs == 90
+
+    def test_never_filled_up(self):
+        self.record(n_booked=10, secs_after_window=30)
+        (fill_up,) = self.store.get_fill_ups("Powerlifting", since=DAY, until=DAY)
+        assert fill_up.filled_up_at is None
+        assert fill_up.filled_up_after_window_secs is None
+
+    def test_filters(self):
+        self.record(n_booked=16, secs_after_window=30)
+        assert self.store.get_fill_ups("Calisthenics", DAY, DAY, weekday=1) == []
+        assert (
+            self.store.get_fill_ups("Calisthenics", DAY, DAY, start_time=time(8, 0))
+            == []
+        )
+        assert self.store.get_fill_ups("Calisthenics", DAY + timedelta(1), DAY) == []
+        assert self.store.get_fill_ups("Calisthenics", DAY, DAY, sede_id=1) == []
+
+    def test_class_history(self):
+        self.record(n_booked=0, secs_after_window=-60)
+        self.record(n_booked=16, secs_after_window=90)
+        history = self.store.get_class_history("700000", DAY)
+        assert [s.n_free_seats for s in history] == [16, 0]
+        assert history[0].is_course_bookable
+        assert not history[0].is_user_booked
+
+    def test_prune(self):
+        self.record(n_booked=0, secs_after_window=-60)
+        self.record(n_booked=16, secs_after_window=90)
+        assert self.store.prune(before=WINDOW_OPENS_AT) == 2
+        assert len(self.store.get_class_history("700000", DAY)) == 1
+
+    def test_record_failure_not_raised(self, tmp_path):
+        # A dir, not a file.
+        store = PalinsestoSnapshotStore(tmp_path)
+        assert store.record(47, make_palinsesto(0)) == 0
+
+    def record_attempt(
+        self, response: dict, sent_secs_after_window: float, rtt_secs: float = 0.2
+    ) -> None:
+        sent_at = WINDOW_OPENS_AT + timedelta(seconds=sent_secs_after_window)
+        self.store.record_booking_attempt(
+            47,
+            "700000",
+            "Calisthenics",
+            DAY,
+            starts_at=STARTS_AT,
+            sent_at=sent_at,
+            received_at=sent_at + timedelta(seconds=rtt_secs),
+            response=response,
+        )
+
+    def test_window_estimate(self):
+        before_class_secs = (STARTS_AT - WINDOW_OPENS_AT).total_seconds()
+        self.record_attempt(NOT_OPEN, sent_secs_after_window=-1)
+        self.record_attempt(NOT_OPEN, sent_secs_after_window=-0.5)
+        self.record_attempt(BOOKED, sent_secs_after_window=0.1)
+        # Ignored: it says nothing about the window.
+        self.record_attempt(
+            {"status": 1, "messaggio": "Posti esauriti."}, sent_secs_after_window=-5
+        )
+
+        estimate = self.store.get_window_estimate("Calisthenics")
+        assert estimate.n_not_open == 2
+        assert estimate.n_booked == 1
+        assert estimate.is_consistent
+        assert estimate.max_before_class_secs == before_class_secs + 0.5
+        assert estimate.min_before_class_secs == pytest.approx(before_class_secs - 0.3)
+        assert estimate.width_secs == pytest.approx(0.8)
+        assert estimate.get_fire_before_class_secs(default=0) == before_class_secs + 0.5
+
+    def test_window_estimate_filters(self):
+        self.record_attempt(BOOKED, sent_secs_after_window=0.1)
+        assert self.store.get_window_estimate("Powerlifting") is None
+        assert self.store.get_window_estimate("Calisthenics", sede_id=1) is None
+        assert (
+            self.store.get_window_estimate(
+                "Calisthenics", since=WINDOW_OPENS_AT + timedelta(1)
+            )
+            is None
+        )
+
+    def test_window_estimate_inconsistent(self):
+        self.record_attempt(BOOKED, sent_secs_after_window=-10)
+        self.record_attempt(NOT_OPEN, sent_secs_after_window=0)
+        assert not self.store.get_window_estimate("Calisthenics").is_consistent
+
+    def test_fire_before_class_with_one_bound(self):
+        estimate = WindowEstimate("Calisthenics", None, 100, n_booked=0, n_not_open=1)
+        assert estimate.width_secs is None
+        assert estimate.get_fire_before_class_secs(default=120) == 100
+        assert estimate.get_fire_before_class_secs(default=90) == 90
+        estimate = WindowEstimate("Calisthenics", 100, None, n_booked=1, n_not_open=0)
+        assert estimate.get_fire_before_class_secs(default=90) == 100
+        assert estimate.get_fire_before_class_secs(default=120) == 120
+
+    def test_prune_booking_attempts(self):
+        self.record_attempt(BOOKED, sent_secs_after_window=0.1)
+        with override_settings(settings, SNAPSHOT_STORE_RETENTION_DAYS=1):
+            with datetime_testutils.freeze_time(WINDOW_OPENS_AT + timedelta(days=2)):
+                store = PalinsestoSnapshotStore(self.store.path)
+                assert store.get_window_estimate("Calisthenics") is None
+                store.close()
+
+
+class TestBookClassDomain_SnapshotStore:
+    @pytest.fixture(autouse=True)
+    def server(self, tmp_cache):
+        with FakeRebornServer() as self.server:
+            with override_settings(
+                settings,
+                REBORN_BASE_URL=self.server.base_url,
+                IS_SNAPSHOT_STORE_ENABLED=True,
+            ):
+                yield
+
+    def test_recorded_on_fetch(self):
+        domain = BookClassDomain(username="rossi@gmail.com", password="pass")
+        domain.get_palinsesto()
+        assert snapshot_store.flush(timeout_secs=5)
+        tomorrow = datetime_utils.now().date() + timedelta(days=1)
+        history = snapshot_store.get_class_history("700000", tomorrow)
+        assert len(history) == 1
+        assert history[0].n_free_seats == 16
+
+    def test_booking_does_not_wait(self):
+        is_recorded = threading.Event()
+        with mock.patch.object(
+            snapshot_store,
+            "record_booking_attempt",
+            side_effect=lambda *args, **kwargs: is_recorded.wait(5),
+        ) as record_mock:
+            domain = BookClassDomain(username="rossi@gmail.com", password="pass")
+            results = domain.book_classes([ClassTarget("Calisthenics")])
+            assert results[0].is_booked
+            # The booking returned while the record was still being written.
+            assert not snapshot_store.flush(timeout_secs=0)
+            is_recorded.set()
+            assert snapshot_store.flush(timeout_secs=5)
+        record_mock.assert_called_once()
+
+    def test_failure_not_raised(self):
+        with mock.patch.object(
+            snapshot_store, "record", side_effect=RuntimeError("Boom")
+        ) as record_mock:
+            domain = BookClassDomain(username="rossi@gmail.com", password="pass")
+            assert domain.get_palinsesto()
+            assert snapshot_store.flush(timeout_secs=5)
+        record_mock.assert_called_once()
+
+
+class TestBookClassDomain_WindowLearning:
+    @pytest.fixture(autouse=True)
+    def domain(self, tmp_cache):
+        with override_settings(
+            settings,
+            IS_SNAPSHOT_STORE_ENABLED=True,
+            IS_BOOKING_WINDOW_LEARNING_ENABLED=True,
+        ):
+            self.domain = BookClassDomain()
+            self.klass = {
+                "id_orario_palinsesto": "700000",
+                "nome_corso": "Calisthenics",
+                "orario_inizio": "07:00",
+            }
+            self.domain._login = mock.Mock()
+            self.domain._palinsesto = Palinsesto(
+                [PalinsestoClass.from_data(self.klass, DAY)]
+            )
+            self.domain.client.book_class = mock.Mock()
+            yield
+
+    @datetime_testutils.freeze_time(WINDOW_OPENS_AT)
+    @mock.patch("time.sleep")
+    def test_attempts_recorded(self, sleep_mock):
+        self.domain.client.book_class.side_effect = [NOT_OPEN, NOT_OPEN, BOOKED]
+        self.domain.book_next_calisthenics_class(is_sniper=True)
+        assert snapshot_store.flush(timeout_secs=5)
+        estimate = snapshot_store.get_window_estimate("Calisthenics")
+        assert estimate.n_not_open == 2
+        assert estimate.n_booked == 1
+
+    def test_sent_at_after_login_again(self):
+        # The cached session is rejected: the attempt is timed from the request
+        #  sent after the login, not from the rejected one.
+        self.domain._is_session_cached = True
+        logged_in_at = list()
+
+        def login(**kwargs):
+            # A login round-trip.
+            time_module.sleep(0.01)
+            logged_in_at.append(datetime_utils.now_utc())
+
+        self.domain._login = mock.Mock(side_effect=login)
+        self.domain.client.is_session_valid = mock.Mock(return_value=False)
+        self.domain.client.book_class.side_effect = [BOOKING_FAILED, BOOKED]
+        with mock.patch.object(snapshot_store, "submit") as submit_mock:
+            assert self.domain._send_booking("700000", self.klass, DAY) == BOOKED
+        assert len(logged_in_at) == 2
+        assert submit_mock.call_args.kwargs["sent_at"] >= logged_in_at[-1]
+
+    @datetime_testutils.freeze_time(WINDOW_OPENS_AT - timedelta(minutes=1))
+    def test_learned_window_opens_at(self):
+        # The window was observed to open between 2 and 1 secs before the configured
+        #  time.
+        configured_opens_at = self.domain.get_booking_window_opens_at(self.klass, DAY)
+        for response, secs in ((NOT_OPEN, 2), (BOOKED, 1)):
+            at = configured_opens_at - timedelta(seconds=secs)
+            snapshot_store.record_booking_attempt(
+                47, "700000", "Calisthenics", DAY, STARTS_AT, at, at, response
+            )
+
+        estimate = self.domain._get_window_estimate(self.klass)
+        assert self.domain.get_booking_window_opens_at(
+            self.klass, DAY, estimate=estimate
+        ) == configured_opens_at - timedelta(seconds=2)
+
+    def test_learning_disabled(self):
+        snapshot_store.record_booking_attempt(
+            47, "700000", "Calisthenics", DAY, STARTS_AT, STARTS_AT, STARTS_AT, BOOKED
+        )
+        with override_settings(settings, IS_BOOKING_WINDOW_LEARNING_ENABLED=False):
+            assert self.domain._get_window_estimate(self.klass) is None
@@ -0,0 +1,107 @@
+from datetime import date, datetime, time, timedelta, timezone
+
+import pytest
+
+from reborn_automator.conf import settings
+from reborn_automator.domains.palinsesto_model import Palinsesto
+from reborn_automator.domains.seat_availability_domain import (
+    SeatAvailabilityDomain,
+    scan_availability,
+)
+from reborn_automator.utils import datetime_utils
+from reborn_automator.utils.testutils.fake_reborn_server import FakeRebornServer
+from reborn_automator.utils.testutils.reborn_testfactories.palinsesto_factory import (
+    PalinsestoFactory,
+)
+from reborn_automator.utils.testutils.settings_testutils import override_settings
+
+START_DAY = date(2024, 10, 28)
+
+
+class TestScanAvailability:
+    def setup_method(self):
+        data = PalinsestoFactory.make(START_DAY, n_days=3, n_classes_per_day=2)
+        classes = data["parametri"]["lista_risultati"][0]["giorni"][1]["orari_giorno"]
+        classes[0].update(
+            PalinsestoFactory.make_class(
+                700002, "Powerlifting", time(7, 0), n_seats=16, n_booked=12
+            )
+        )
+        classes[1].update(
+            PalinsestoFactory.make_class(
+                700003, "Yoga", time(8, 0), n_booked=16, is_user_booked=True
+            )
+        )
+        self.palinsesto = Palinsesto.from_response(data)
+        # The booking window of the classes of the 2nd day is open.
+        self.now = datetime(2024, 10, 27, 9, 0, tzinfo=timezone.utc)
+
+    def test_happy_flow(self):
+        items = scan_availability(
+            self.palinsesto, after=START_DAY + timedelta(days=1), now=self.now
+        )
+        assert [(i.day_date, i.start_time) for i in items] == [
+            (date(2024, 10, 29), time(7, 0)),
+            (date(2024, 10, 29), time(8, 0)),
+            (date(2024, 10, 30), time(7, 0)),
+            (date(2024, 10, 30), time(8, 0)),
+        ]
+        power, yoga, *_ = items
+        assert power.course_name == "Powerlifting"
+        assert (power.n_seats, power.n_booked, power.n_free_seats) == (16, 12, 4)
+        assert power.occupancy_ratio == 0.75
+        assert power.is_bookable
+        assert yoga.occupancy_ratio == 1
+        assert yoga.is_user_booked
+        assert not yoga.is_bookable
+        # The window of the 3rd day is not open yet.
+        assert not items[2].is_bookable
+        assert items[2].booking_window_opens_at > self.now
+
+    def test_started_classes_skipped(self):
+        # 07:30 in Rome, on the 2nd day.
+        now = datetime(2024, 10, 29, 6, 30, tzinfo=timezone.utc)
+        items = scan_availability(
+            self.palinsesto, after=START_DAY + timedelta(days=1), now=now
+        )
+        assert [(i.day_date, i.start_time) for i in items] == [
+            (date(2024, 10, 29), time(8, 0)),
+            (date(2024, 10, 30), time(7, 0)),
+            (date(2024, 10, 30), time(8, 0)),
+        ]
+
+    def test_to_dict(self):
+        (item, *_) = scan_availability(
+            self.palinsesto, after=START_DAY + timedelta(days=1), now=self.now
+        )
+        data = item.to_dict()
+        assert data["day_date"] == "2024-10-29"
+        assert data["start_time"] == "07:00:00"
+        assert data["booking_window_opens_at"] == "2024-10-27T06:00:00+00:00"
+
+
+class TestSeatAvailabilityDomain:
+    @pytest.fixture(autouse=True)
+    def server(self, tmp_cache):
+        with FakeRebornServer() as self.server:
+            with override_settings(settings, REBORN_BASE_URL=self.server.base_url):
+                yield
+
+    def test_cached(self):
+        domain = SeatAvailabilityDomain(username="rossi@gmail.com", password="pass")
+        data = domain.get_availability()
+        tomorrow = datetime_utils.now().date() + timedelta(days=1)
+        assert data["classes"][0]["day_date"] == tomorrow.isoformat()
+        # A week of 8 classes per day.
+        assert len(data["classes"]) == 7 * 8
+
+        assert (
+            SeatAvailabilityDomain(
+                username="rossi@gmail.com", password="pass"
+            ).get_availability()
+            == data
+        )
+        assert self.server.n_requests_by_endpoint["palinsesti"] == 1
+
+        domain.get_availability(do_refresh=True)
+        assert self.server.n_requests_by_endpoint["palinsesti"] == 2
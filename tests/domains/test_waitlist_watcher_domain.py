@@ -0,0 +1,152 @@
+import threading
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+
+from reborn_automator.conf import settings
+from reborn_automator.domains.book_class_domain import BookClassDomain, ClassTarget
+from reborn_automator.domains.waitlist_watcher_domain import (
+    AlreadyBooked,
+    NoSeatFreedUp,
+    WaitlistWatcher,
+    _Watched,
+)
+from reborn_automator.utils import datetime_utils
+from reborn_automator.utils.testutils.fake_reborn_server import FakeRebornServer
+from reborn_automator.utils.testutils.reborn_testfactories.palinsesto_factory import (
+    PalinsestoFactory,
+)
+from reborn_automator.utils.testutils.settings_testutils import override_settings
+
+CLASS_ID = "700000"
+
+
+class TestWaitlistWatcher:
+    @pytest.fixture(autouse=True)
+    def server(self):
+        self.day = (datetime_utils.now().date() + timedelta(days=1)).isoformat()
+        # A single Calisthenics class, with a single seat taken by someone else.
+        palinsesto = PalinsestoFactory.make(
+            datetime_utils.now().date() + timedelta(days=1),
+            n_days=1,
+            n_classes_per_day=1,
+            n_seats=1,
+        )
+        with FakeRebornServer(palinsesto=palinsesto) as self.server:
+            self.server.bookings[(CLASS_ID, self.day)] = ["bianchi@gmail.com"]
+            with override_settings(
+                settings,
+                REBORN_BASE_URL=self.server.base_url,
+                WAITLIST_MIN_INTERVAL_SECS=0.01,
+                WAITLIST_MAX_INTERVAL_SECS=0.05,
+            ):
+                yield
+
+    def make_watcher(self, **kwargs) -> WaitlistWatcher:
+        domain = BookClassDomain(username="rossi@gmail.com", password="pass")
+        return WaitlistWatcher(domain, **kwargs)
+
+    def test_happy_flow(self):
+        # The seat frees up while watching.
+        timer = threading.Timer(
+            0.1,
+            self.server.cancel_booking,
+            args=(CLASS_ID, self.day, "bianchi@gmail.com"),
+        )
+        timer.start()
+        watcher = self.make_watcher(max_requests=100)
+        (result,) = watcher.watch([ClassTarget("Calisthenics")])
+        timer.join()
+
+        assert result.is_booked
+        assert result.class_id == CLASS_ID
+        assert self.server.bookings[(CLASS_ID, self.day)] == ["rossi@gmail.com"]
+        assert watcher.n_polls > 1
+        assert self.server.n_requests_by_endpoint["prenotazione_new"] == 1
+
+    def test_budget(self):
+        watcher = self.make_watcher(max_requests=5)
+        (result,) = watcher.watch([ClassTarget("Calisthenics")])
+
+        assert isinstance(result.exception, NoSeatFreedUp)
+        assert watcher.n_requests <= 5
+        # The login counts too.
+        assert watcher.n_requests == sum(self.server.n_requests_by_endpoint.values())
+        assert self.server.n_requests_by_endpoint["palinsesti"] == watcher.n_polls
+        assert self.server.n_requests_by_endpoint["prenotazione_new"] == 0
+
+    def test_max_duration(self):
+        watcher = self.make_watcher(max_requests=1000, max_duration_secs=0.2)
+        (result,) = watcher.watch([ClassTarget("Calisthenics")])
+        assert isinstance(result.exception, NoSeatFreedUp)
+
+    def test_already_booked(self):
+        self.server.bookings[(CLASS_ID, self.day)] = ["rossi@gmail.com"]
+        watcher = self.make_watcher()
+        (result,) = watcher.watch([ClassTarget("Calisthenics")])
+        assert isinstance(result.exception, AlreadyBooked)
+        assert watcher.n_polls == 1
+
+
+class TestWaitlistWatcher_DefaultSettings:
+    @pytest.fixture(autouse=True)
+    def server(self):
+        palinsesto = PalinsestoFactory.make(
+            datetime_utils.now().date() + timedelta(days=1),
+            n_days=1,
+            n_classes_per_day=1,
+            n_seats=1,
+        )
+        day = (datetime_utils.now().date() + timedelta(days=1)).isoformat()
+        with FakeRebornServer(palinsesto=palinsesto) as self.server:
+            self.server.bookings[(CLASS_ID, day)] = ["bianchi@gmail.com"]
+            with override_settings(settings, REBORN_BASE_URL=self.server.base_url):
+                yield
+
+    def test_polls_several_times(self):
+        # A fake clock: the sleeps only move it forward.
+        clock = [0.0]
+
+        def sleep(secs):
+            clock[0] += secs
+
+        domain = BookClassDomain(username="rossi@gmail.com", password="pass")
+        watcher = WaitlistWatcher(domain)
+        with mock.patch(
+            "reborn_automator.domains.waitlist_watcher_domain.time",
+            mock.Mock(monotonic=lambda: clock[0], sleep=sleep),
+        ):
+            (result,) = watcher.watch([ClassTarget("Calisthenics")])
+
+        assert isinstance(result.exception, NoSeatFreedUp)
+        # The default watch, like in the Lambda (90 secs timeout, 30 secs margin).
+        assert watcher.max_duration_secs == settings.WAITLIST_MAX_DURATION_SECS == 60
+        assert watcher.n_polls > 5
+        assert clock[0] == pytest.approx(settings.WAITLIST_MAX_DURATION_SECS)
+
+
+class TestGetInterval:
+    def make_watched(self, secs_to_class: float) -> list[_Watched]:
+        watched = _Watched(result=None)
+        watched.starts_at = datetime_utils.now_utc() + timedelta(seconds=secs_to_class)
+        return [watched]
+
+    def test_tightens_as_class_approaches(self):
+        watcher = WaitlistWatcher(domain=None)
+        far = watcher.get_interval(self.make_watched(60 * 60 * 24), n_unchanged=0)
+        near = watcher.get_interval(self.make_watched(60 * 10), n_unchanged=0)
+        started = watcher.get_interval(self.make_watched(-60), n_unchanged=0)
+        assert far == settings.WAITLIST_MAX_INTERVAL_SECS
+        assert settings.WAITLIST_MIN_INTERVAL_SECS < near < far
+        assert started == settings.WAITLIST_MIN_INTERVAL_SECS
+
+    def test_backs_off_when_unchanged(self):
+        watcher = WaitlistWatcher(domain=None)
+        watched = self.make_watched(60 * 10)
+        intervals = [watcher.get_interval(watched, n) for n in range(20)]
+        assert intervals == sorted(intervals)
+        assert intervals[1] == pytest.approx(
+            intervals[0] * settings.WAITLIST_BACKOFF_FACTOR
+        )
+        assert intervals[-1] == settings.WAITLIST_MAX_INTERVAL_SECS
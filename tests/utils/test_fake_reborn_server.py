@@ -0,0 +1,98 @@
+from datetime import date, timedelta
+
+import pytest
+import requests
+
+from reborn_automator.clients.reborn_api_client import (
+    AuthError,
+    InvalidSession,
+    RebornApiClient,
+    make_http_session,
+)
+from reborn_automator.conf import settings
+from reborn_automator.domains.book_class_domain import BookClassDomain, FailedBooking
+from reborn_automator.utils import datetime_utils
+from reborn_automator.utils.testutils.fake_reborn_server import (
+    ALREADY_BOOKED_MESSAGE,
+    NO_SEATS_MESSAGE,
+    WINDOW_NOT_OPEN_MESSAGE,
+    FakeRebornServer,
+)
+from reborn_automator.utils.testutils.reborn_testfactories.palinsesto_factory import (
+    PalinsestoFactory,
+)
+from reborn_automator.utils.testutils.settings_testutils import override_settings
+
+START_DAY = date(2024, 10, 28)
+
+
+class TestFakeRebornServer:
+    @pytest.fixture(autouse=True)
+    def server(self):
+        palinsesto = PalinsestoFactory.make(START_DAY, n_days=2, n_seats=1)
+        with FakeRebornServer(palinsesto=palinsesto) as self.server:
+            with override_settings(settings, REBORN_BASE_URL=self.server.base_url):
+                yield
+
+    def make_client(self, username: str = "rossi@gmail.com") -> RebornApiClient:
+        client = RebornApiClient(http_session=make_http_session())
+        client.login(username, "pass")
+        return client
+
+    def test_happy_flow(self):
+        client = self.make_client()
+        data = client.get_palinsesto()
+        klass = data["parametri"]["lista_risultati"][0]["giorni"][0]["orari_giorno"][0]
+        response = client.book_class(klass["id_orario_palinsesto"], START_DAY)
+        assert response["status"] == 2
+
+        # The booking is in the palinsesto.
+        data = client.get_palinsesto()
+        klass = data["parametri"]["lista_risultati"][0]["giorni"][0]["orari_giorno"][0]
+        assert klass["prenotazioni"]["utente_prenotato"] != "0"
+        assert klass["prenotazioni"]["numero_posti_disponibili"] == "0"
+        response = client.book_class(klass["id_orario_palinsesto"], START_DAY)
+        assert response["messaggio"] == ALREADY_BOOKED_MESSAGE
+
+        # No seats left for others.
+        response = self.make_client("bianchi@gmail.com").book_class(
+            klass["id_orario_palinsesto"], START_DAY
+        )
+        assert response["messaggio"] == NO_SEATS_MESSAGE
+        assert self.server.n_requests_by_endpoint["prenotazione_new"] == 3
+
+    def test_wrong_password(self):
+        self.server.passwords = {"rossi@gmail.com": "pass"}
+        with pytest.raises(AuthError):
+            RebornApiClient().login("rossi@gmail.com", "XXX")
+
+    def test_invalid_session(self):
+        client = RebornApiClient()
+        client.session_id = "XXX"
+        with pytest.raises(InvalidSession):
+            client.get_palinsesto()
+
+    def test_window_not_open(self):
+        self.server.window_opens_at = datetime_utils.now_utc() + timedelta(hours=1)
+        response = self.make_client().book_class("700000", START_DAY)
+        assert response["messaggio"] == WINDOW_NOT_OPEN_MESSAGE
+
+    def test_error_rate(self):
+        self.server.error_rate = 1
+        with pytest.raises(requests.HTTPError):
+            self.make_client()
+
+
+class TestFakeRebornServer_BookClassDomain:
+    def test_book_next_calisthenics_class(self):
+        with FakeRebornServer(latency_secs=0.01, jitter_secs=0.005, seed=1) as server:
+            with override_settings(settings, REBORN_BASE_URL=server.base_url):
+                domain = BookClassDomain(http_session=make_http_session())
+                response, day_date = domain.book_next_calisthenics_class()
+                assert response["status"] == 2
+                assert day_date > datetime_utils.now().date()
+
+                # Same class, again.
+                with pytest.raises(FailedBooking) as exc:
+                    domain.book_next_calisthenics_class()
+                assert exc.value.response["messaggio"] == ALREADY_BOOKED_MESSAGE
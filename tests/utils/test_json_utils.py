@@ -0,0 +1,94 @@
+import json
+import math
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from uuid import UUID
+
+import pytest
+
+from reborn_automator.conf import settings
+from reborn_automator.utils import json_utils
+from reborn_automator.utils.testutils.settings_testutils import override_settings
+
+NOW = datetime(2024, 10, 26, 18, 0, 0, 123456, tzinfo=timezone.utc)
+ID = UUID("5f2b8a4e-8f1c-4b8e-9a3e-2d6f1b7c9e01")
+
+
+class Url:
+    def __init__(self, url: str):
+        self.url = url
+
+    def __str__(self):
+        return self.url
+
+
+@dataclass
+class Item:
+    name: str
+
+    def to_dict(self):
+        return dict(name=self.name.upper())
+
+
+def make_data() -> dict:
+    return dict(
+        now=NOW,
+        price=Decimal("9.5"),
+        url=Url("https://www.youreborn.it/"),
+        item=Item("cali"),
+        id=ID,
+        nested=[dict(b=1, a="è")],
+    )
+
+
+class TestToJson:
+    def test_types(self):
+        assert json.loads(json_utils.to_json(make_data())) == dict(
+            now="2024-10-26T18:00:00.123456+00:00",
+            price=9.5,
+            url="https://www.youreborn.it/",
+            item=dict(name="CALI"),
+            id=str(ID),
+            nested=[dict(b=1, a="è")],
+        )
+
+    def test_same_output_as_json_dumps(self):
+        data = make_data()
+        for kwargs in (dict(), dict(sort_keys=True), dict(indent=2)):
+            assert json_utils.to_json(data, **kwargs) == json.dumps(
+                data, cls=json_utils.CustomJsonEncoder, **kwargs
+            )
+
+    def test_to_dict_on_instance(self):
+        class Obj:
+            pass
+
+        obj = Obj()
+        obj.to_dict = lambda: dict(a=1)
+        assert json_utils.to_json(obj) == '{"a": 1}'
+
+    def test_unsupported_type(self):
+        with pytest.raises(TypeError):
+            json_utils.to_json(dict(day=date(2024, 10, 26)))
+
+    def test_encoder_reused(self):
+        json_utils.to_json([1], indent=2)
+        n_hits = json_utils._get_encoder.cache_info().hits
+        json_utils.to_json([2], indent=2)
+        assert json_utils._get_encoder.cache_info().hits == n_hits + 1
+
+    def test_same_as_stdlib_by_default(self):
+        data = dict(name="Città", ratio=math.nan, items=[1, 2])
+        assert json_utils.to_json(data) == json.dumps(data)
+
+    def test_fast_backend(self):
+        pytest.importorskip("orjson")
+        data = make_data()
+        with override_settings(settings, IS_JSON_FAST_BACKEND_ENABLED=True):
+            fast = json_utils.to_json(data, sort_keys=True)
+            # Ints larger than 64 bits fall back to the stdlib.
+            assert json_utils.to_json(2**70) == str(2**70)
+            assert json_utils.to_json(math.nan) == "null"
+        assert json.loads(fast) == json.loads(json_utils.to_json(data))
+        assert fast.startswith('{"id":')
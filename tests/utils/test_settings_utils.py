@@ -0,0 +1,115 @@
+import os
+import subprocess
+import sys
+from unittest import mock
+
+import pytest
+
+from reborn_automator.clients.aws_parameter_store_client.aws_parameter_store_client import (
+    ParameterNotFound,
+    ParameterStoreClient,
+)
+from reborn_automator.utils.settings_utils import LazyEnvOrAwsParameterStoreSetting
+
+
+class TestLazyEnvOrAwsParameterStoreSetting:
+    def setup_method(self):
+        class settings:
+            FOO = LazyEnvOrAwsParameterStoreSetting("TEST_FOO", "/test/foo")
+            BAR = LazyEnvOrAwsParameterStoreSetting("TEST_BAR", "/test/bar")
+            BAZ = LazyEnvOrAwsParameterStoreSetting("TEST_BAZ", "/test/baz")
+            QUX = LazyEnvOrAwsParameterStoreSetting("TEST_QUX", default="qux-default")
+
+        self.settings = settings
+        self.lazy_settings = [
+            settings.__dict__[k] for k in ("FOO", "BAR", "BAZ", "QUX")
+        ]
+
+    def teardown_method(self):
+        for lazy_setting in self.lazy_settings:
+            LazyEnvOrAwsParameterStoreSetting._instances.remove(lazy_setting)
+
+    def test_env(self, monkeypatch):
+        monkeypatch.setenv("TEST_FOO", "foo-env")
+        with mock.patch.object(ParameterStoreClient, "get_secrets") as get_secrets:
+            assert self.settings.FOO == "foo-env"
+        get_secrets.assert_not_called()
+
+    def test_batched(self, monkeypatch):
+        monkeypatch.setenv("TEST_BAR", "bar-env")
+        monkeypatch.delenv("TEST_FOO", raising=False)
+        monkeypatch.delenv("TEST_BAZ", raising=False)
+        with (
+            mock.patch.object(ParameterStoreClient, "__init__", return_value=None),
+            mock.patch.object(
+                ParameterStoreClient,
+                "get_secrets",
+                return_value={"/test/foo": "foo-ssm", "/test/baz": "baz-ssm"},
+            ) as get_secrets,
+        ):
+            assert self.settings.FOO == "foo-ssm"
+            assert self.settings.BAZ == "baz-ssm"
+            assert self.settings.BAR == "bar-env"
+            # Memoized.
+            assert self.settings.FOO == "foo-ssm"
+        get_secrets.assert_called_once()
+        paths = get_secrets.call_args.args[0]
+        assert "/test/foo" in paths
+        assert "/test/baz" in paths
+        assert "/test/bar" not in paths
+
+    def test_missing(self, monkeypatch):
+        monkeypatch.delenv("TEST_FOO", raising=False)
+        monkeypatch.delenv("TEST_BAR", raising=False)
+        with (
+            mock.patch.object(ParameterStoreClient, "__init__", return_value=None),
+            mock.patch.object(
+                ParameterStoreClient,
+                "get_secrets",
+                return_value={"/test/foo": "foo-ssm"},
+            ),
+        ):
+            with pytest.raises(ParameterNotFound) as exc:
+                self.settings.BAR
+            assert exc.value.path == "/test/bar"
+            # The others in the batch are resolved.
+            assert self.settings.FOO == "foo-ssm"
+
+    def test_env_only(self, monkeypatch):
+        monkeypatch.delenv("TEST_QUX", raising=False)
+        with mock.patch.object(ParameterStoreClient, "get_secrets") as get_secrets:
+            assert self.settings.QUX == "qux-default"
+        get_secrets.assert_not_called()
+
+
+VIEWS = [
+    "endpoint_introspection_view",
+    "endpoint_seat_availability_view",
+    "authorizer_view",
+    "cron_book_classes_view",
+]
+
+
+class TestImportTime:
+    @pytest.mark.parametrize("view", VIEWS)
+    def test_no_boto3_on_import(self, view):
+        code = (
+            f"import sys, reborn_automator.views.{view};"
+            " assert 'boto3' not in sys.modules"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True, capture_output=True)
+
+    @pytest.mark.parametrize("view", VIEWS)
+    def test_no_network_io_on_import(self, view):
+        # Outside the Lambda runtime, with the production settings.
+        env = {k: v for k, v in os.environ.items() if k != "AWS_LAMBDA_FUNCTION_NAME"}
+        code = (
+            "import socket\n"
+            "def fail(*args, **kwargs):\n"
+            "    raise SystemExit('network I/O')\n"
+            "socket.getaddrinfo = socket.create_connection = fail\n"
+            f"import reborn_automator.views.{view}"
+        )
+        subprocess.run(
+            [sys.executable, "-c", code], check=True, capture_output=True, env=env
+        )
@@ -0,0 +1,48 @@
+import time
+
+from reborn_automator.conf import settings
+from reborn_automator.utils.testutils.settings_testutils import override_settings
+from reborn_automator.utils.tmp_cache_utils import TmpCache
+
+
+class TestTmpCache:
+    def setup_method(self):
+        self.cache = TmpCache("test")
+
+    def test_happy_flow(self, tmp_path):
+        with override_settings(
+            settings, IS_TMP_CACHE_ENABLED=True, TMP_CACHE_DIR=str(tmp_path)
+        ):
+            assert self.cache.get("key") is None
+            self.cache.set("key", {"foo": "bar"})
+            assert self.cache.get("key") == {"foo": "bar"}
+            self.cache.delete("key")
+            assert self.cache.get("key", "default") == "default"
+
+    def test_file_tier(self, tmp_path):
+        with override_settings(
+            settings, IS_TMP_CACHE_ENABLED=True, TMP_CACHE_DIR=str(tmp_path)
+        ):
+            self.cache.set("key", "value")
+            # A new instance simulates a new process in the same execution environment.
+            assert TmpCache("test").get("key") == "value"
+            assert TmpCache("other").get("key") is None
+
+    def test_ttl(self, tmp_path):
+        cache = TmpCache("test", ttl_secs=60)
+        with override_settings(
+            settings, IS_TMP_CACHE_ENABLED=True, TMP_CACHE_DIR=str(tmp_path)
+        ):
+            cache.set("key", "value")
+            assert cache.get("key") == "value"
+            cache._memory["key"] = (time.time() - 61, "value")
+            assert cache.get("key") is None
+            assert TmpCache("test").get("key") is None
+
+    def test_disabled(self, tmp_path):
+        with override_settings(
+            settings, IS_TMP_CACHE_ENABLED=False, TMP_CACHE_DIR=str(tmp_path)
+        ):
+            self.cache.set("key", "value")
+            assert self.cache.get("key") is None
+            assert not list(tmp_path.iterdir())
@@ -0,0 +1,42 @@
+import pytest
+
+from reborn_automator.conf import settings
+from reborn_automator.utils.testutils.aws_testfactories.api_gateway_event_factory import (
+    ApiGatewayEventV2Factory,
+)
+from reborn_automator.utils.testutils.aws_testfactories.lambda_context_factory import (
+    LambdaContextFactory,
+)
+from reborn_automator.utils.testutils.settings_testutils import override_settings
+from reborn_automator.views.authorizer_view import lambda_handler
+
+
+class TestAuthorizerView:
+    @pytest.fixture(autouse=True)
+    def token(self):
+        self.context = LambdaContextFactory().make()
+        with override_settings(settings, API_AUTHORIZER_TOKEN="s3cr3t"):
+            yield
+
+    def make_event(self, token: str | None = None) -> dict:
+        event = ApiGatewayEventV2Factory.make_for_get_request("/availability")
+        if token is not None:
+            event["headers"]["authorization"] = token
+        return event
+
+    def test_happy_flow(self):
+        response = lambda_handler(self.make_event("s3cr3t"), self.context)
+        assert response == {"isAuthorized": True}
+
+    def test_wrong_token(self):
+        response = lambda_handler(self.make_event("XXX"), self.context)
+        assert response == {"isAuthorized": False}
+
+    def test_no_token(self):
+        response = lambda_handler(self.make_event(), self.context)
+        assert response == {"isAuthorized": False}
+
+    def test_token_not_configured(self):
+        with override_settings(settings, API_AUTHORIZER_TOKEN="XXX"):
+            response = lambda_handler(self.make_event("XXX"), self.context)
+        assert response == {"isAuthorized": False}
@@ -0,0 +1,111 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+
+from reborn_automator.conf import settings
+from reborn_automator.domains.book_class_domain import NoClassFoundInPalinsesto
+from reborn_automator.domains.waitlist_watcher_domain import WaitlistWatcher
+from reborn_automator.utils import datetime_utils, emoji_utils
+from reborn_automator.utils.testutils.aws_testfactories.lambda_context_factory import (
+    LambdaContextFactory,
+)
+from reborn_automator.utils.testutils.fake_reborn_server import FakeRebornServer
+from reborn_automator.utils.testutils.settings_testutils import override_settings
+from reborn_automator.views.cron_book_classes_view import InvalidEvent, lambda_handler
+
+
+class TestCronBookClassesView:
+    @pytest.fixture(autouse=True)
+    def server(self):
+        self.context = LambdaContextFactory().make()
+        self.tomorrow = datetime_utils.now().date() + timedelta(days=1)
+        with FakeRebornServer() as self.server:
+            with override_settings(
+                settings,
+                REBORN_BASE_URL=self.server.base_url,
+                BOOKING_RULES={
+                    "cali": dict(course_name="Calisthenics"),
+                    "power": dict(course_name="Powerlifting"),
+                    "zumba": dict(course_name="Zumba"),
+                },
+            ):
+                with mock.patch(
+                    "reborn_automator.views.cron_book_classes_view.BotteOutbox"
+                ) as self.outbox_mock:
+                    yield
+
+    def get_messages(self) -> list[str]:
+        outbox = self.outbox_mock.return_value
+        outbox.flush.assert_called_once()
+        return [c.args[0] for c in outbox.add.call_args_list]
+
+    def test_happy_flow(self):
+        lambda_handler({"rule_ids": ["cali", "power"]}, self.context)
+        day = self.tomorrow.strftime("%Y-%m-%d")
+        assert self.get_messages() == [
+            emoji_utils.MUSCLE
+            + emoji_utils.GREEN_CIRCLE
+            + f"Calisthenics class booked for {day}",
+            emoji_utils.MUSCLE
+            + emoji_utils.GREEN_CIRCLE
+            + f"Powerlifting class booked for {day}",
+        ]
+        assert self.server.n_requests_by_endpoint["loginApp"] == 1
+        assert self.server.n_requests_by_endpoint["palinsesti"] == 1
+
+    def test_one_rule_failed(self):
+        with pytest.raises(NoClassFoundInPalinsesto):
+            lambda_handler({"rule_ids": ["cali", "zumba"]}, self.context)
+        messages = self.get_messages()
+        assert len(messages) == 2
+        assert messages[1] == (
+            emoji_utils.MUSCLE
+            + emoji_utils.RED_CIRCLE
+            + "Zumba class NOT found in palinsesto"
+        )
+        assert self.server.n_requests_by_endpoint["prenotazione_new"] == 1
+
+    def test_unknown_rule(self):
+        with pytest.raises(InvalidEvent) as exc_info:
+            lambda_handler({"rule_ids": ["cali", "XXX"]}, self.context)
+        assert exc_info.value.known_rule_ids == ["cali", "power", "zumba"]
+        assert str(exc_info.value) == (
+            "rule_ids=['cali', 'XXX']: expected a list of cali, power, zumba"
+        )
+        assert not self.server.n_requests_by_endpoint
+
+    @pytest.mark.parametrize("event", [dict(), {"rule_ids": "cali"}, {"rule_ids": []}])
+    def test_invalid_event(self, event):
+        with pytest.raises(InvalidEvent):
+            lambda_handler(event, self.context)
+        assert not self.server.n_requests_by_endpoint
+
+    def test_watcher(self):
+        lambda_handler({"rule_ids": ["cali"], "is_watcher": True}, self.context)
+        day = self.tomorrow.strftime("%Y-%m-%d")
+        assert self.get_messages() == [
+            emoji_utils.MUSCLE
+            + emoji_utils.GREEN_CIRCLE
+            + f"Calisthenics class booked for {day}",
+        ]
+
+        # Already booked: not an error.
+        self.outbox_mock.reset_mock()
+        lambda_handler({"rule_ids": ["cali"], "is_watcher": True}, self.context)
+        assert self.get_messages() == [
+            emoji_utils.MUSCLE
+            + emoji_utils.GREEN_CIRCLE
+            + f"Calisthenics class already booked for {day}",
+        ]
+
+    def test_watcher_stops_before_timeout(self):
+        context = LambdaContextFactory().make(remaining_time_in_millis=40_000)
+        with mock.patch(
+            "reborn_automator.domains.booking_rules_domain.WaitlistWatcher",
+            wraps=WaitlistWatcher,
+        ) as watcher_mock:
+            lambda_handler({"rule_ids": ["cali"], "is_watcher": True}, context)
+        assert watcher_mock.call_args.kwargs["max_duration_secs"] == (
+            40 - settings.WAITLIST_LAMBDA_TIMEOUT_MARGIN_SECS
+        )
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from reborn_automator.conf import settings
+from reborn_automator.utils.testutils.aws_testfactories.api_gateway_event_factory import (
+    ApiGatewayEventV2Factory,
+)
+from reborn_automator.utils.testutils.aws_testfactories.lambda_context_factory import (
+    LambdaContextFactory,
+)
+from reborn_automator.utils.testutils.fake_reborn_server import FakeRebornServer
+from reborn_automator.utils.testutils.settings_testutils import override_settings
+from reborn_automator.views.endpoint_seat_availability_view import lambda_handler
+
+
+class TestEndpointSeatAvailabilityView:
+    @pytest.fixture(autouse=True)
+    def server(self):
+        self.context = LambdaContextFactory().make()
+        with FakeRebornServer() as self.server:
+            with override_settings(settings, REBORN_BASE_URL=self.server.base_url):
+                yield
+
+    def test_happy_flow(self):
+        response = lambda_handler(
+            ApiGatewayEventV2Factory.make_for_get_request("/availability"),
+            self.context,
+        )
+        assert response["statusCode"] == 200
+        data = json.loads(response["body"])
+        assert len(data["classes"]) == 7 * 8
+        assert data["classes"][0]["n_free_seats"] == 16
+
+    def test_course(self):
+        response = lambda_handler(
+            ApiGatewayEventV2Factory.make_for_get_request(
+                "/availability", raw_query_string="course=Calisthenics"
+            ),
+            self.context,
+        )
+        data = json.loads(response["body"])
+        assert data["classes"]
+        assert {c["course_name"] for c in data["classes"]} == {"Calisthenics"}